@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from typing import List
 from app.ml.enhanced_pipeline import EnhancedMLPipeline
-from app.core.rules import get_eligible_trains
+from app.core.fleet_state import fleet_state
 from app.schemas.ai_response import EnhancedPredictionResponse
 import logging
 import asyncio
@@ -72,7 +72,7 @@ async def generate_ai_enhanced_schedule():
     
     try:
         # Get eligible trains
-        eligible_trains, ineligible_trains = await get_eligible_trains()
+        eligible_trains, ineligible_trains = await fleet_state.get_eligible_trains()
         
         # Combine both eligible and ineligible trains to show all 25
         all_trains = eligible_trains + ineligible_trains
@@ -134,9 +134,8 @@ async def analyze_single_train(asset_id: str):
     
     try:
         # Get train data
-        eligible_trains, _ = await get_eligible_trains()
-        
-        train_data = next((train for train in eligible_trains if train['asset_id'] == asset_id), None)
+        entry = await fleet_state.get_asset(asset_id)
+        train_data = entry[1] if entry and entry[0] else None
         
         if not train_data:
             raise HTTPException(status_code=404, detail=f"Train {asset_id} not found or not eligible")
@@ -1,60 +1,358 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
 from app.schemas.schedule import (
-    ScheduleRequest, ScheduleResponse, ModelEvaluationResponse, 
-    TaskResponse, TaskStatus, EvaluationSummary, AllEvaluationsResponse
+    ScheduleRequest, ScheduleResponse, TrainDetail, ModelEvaluationResponse, 
+    TaskResponse, TaskStatus, EvaluationSummary, AllEvaluationsResponse, RuleSetStats,
+    EligibilityForecastResponse, ParetoRequest, ParetoResponse, ScenarioRequest, ScenarioResponse,
+    HorizonRequest, HorizonResponse, BrandingPlanResponse, ScheduleCacheStats, ExplainMode,
+    CounterfactualResponse, ModelRegistryStatus
 )
-from app.core.rules import get_eligible_trains
-from app.core.optimizer import get_optimized_schedule
+from app.core import rules
+from app.core.rules import reload_risk_rules
+from app.core.fleet_state import fleet_state
+from app.core.forecast import forecast_eligibility
+from app.core.streaming import stream_schedule, DEFAULT_CHUNK_SIZE
+from app.core.optimizer import get_optimized_schedule, maintenance_items
+from app.core.pareto import pareto_front
+from app.core.depot_layout import depot_layout
+from app.core.stabling import assign_stabling
+from app.core.sequencing import sequence_departures
+from app.core.scenarios import evaluate_scenarios
+from app.core.horizon import build_inputs, horizon_planner
+from app.core.branding import PLANNING_NIGHTS, plan_branding
+from app.core.counterfactuals import standby_counterfactuals
+from app.core.schedule_cache import schedule_cache
+from app.core.induction_solver import InductionConstraints, depot_capacities
+from app.db.queries import fetch_locations, fetch_first_certificate_expiries
 from app.ml.pipeline import risk_predictor
+from app.ml.model_registry import model_registry
+from app.ml.training import TrainingBusy, training_jobs
 from app.core.task_manager import get_task_status, get_latest_evaluation, get_all_completed_tasks
 import traceback
+import time
+from datetime import datetime
 import uuid
+import json
 
 router = APIRouter()
 
+def scored_rows(snapshot, layout, branding) -> list:
+    """Eligible assets merged with their risk, shunting-cost and branding stage columns."""
+    risk_columns = risk_predictor.score_snapshot(snapshot) if snapshot.eligible else {}
+    return list(snapshot.rows(
+        risk_columns,
+        layout.shunting_columns(snapshot.column("location")),
+        branding.branding_columns(snapshot.column("asset_id"))
+    ))
+
+async def branding_plan(snapshot, service_slots: int):
+    """Branding hour allocation over the eligible fleet for the given nightly service slots."""
+    return await plan_branding(list(snapshot.column("asset_id")), service_slots)
+
+async def induction_constraints(request: ScheduleRequest):
+    """Solver constraints for an 'exact' request, or None for the greedy planner."""
+    if request.solver != "exact":
+        return None
+    return InductionConstraints(
+        depot_capacity=depot_capacities(await fetch_locations()) if request.enforce_depot_capacity else {},
+        min_trains_per_advertiser=request.min_trains_per_advertiser,
+        max_high_mileage=request.max_high_mileage_in_service,
+        time_budget_s=request.time_budget_ms / 1000
+    )
+
+async def build_schedule(request: ScheduleRequest, explain: str = "full") -> dict:
+    """Full induction plan for a request: scoring, selection, stabling and departure order."""
+    snapshot = await fleet_state.get_snapshot()
+    ineligible_assets = [asset.to_dict() for asset in snapshot.ineligible]
+    
+    if not snapshot.eligible:
+        return get_optimized_schedule([], ineligible_assets, 0)
+
+    # Each stage returns new columns; the shared snapshot is never mutated
+    layout = await depot_layout.get()
+    rows = scored_rows(snapshot, layout, await branding_plan(snapshot, request.num_trains_for_service))
+    constraints = await induction_constraints(request)
+    if constraints is None:
+        schedule = get_optimized_schedule(rows, ineligible_assets, request.num_trains_for_service, None, explain)
+    else:
+        # The exact solver may run for the whole time budget; keep it off the event loop
+        schedule = await run_in_threadpool(
+            get_optimized_schedule, rows, ineligible_assets, request.num_trains_for_service, constraints, explain
+        )
+    schedule["stabling"] = assign_stabling(layout, schedule["service"], schedule["standby"])
+    schedule["departure_sequence"] = sequence_departures(schedule["service"], schedule["stabling"])
+    return schedule
+
 @router.post(
     "/v1/generate-schedule", 
     response_model=ScheduleResponse, 
     tags=["Scheduling"]
 )
-async def generate_schedule(request: ScheduleRequest):
+async def generate_schedule(request: ScheduleRequest, explain: ExplainMode = Query("full")):
     """
     This endpoint runs the full train induction planning pipeline.
+    Results are memoized on the fleet fingerprint (see schedule_cache), so
+    repeated calls over unchanged data are served from memory.
+
+    `explain`: "full" (reason text plus structured codes), "summary"
+    (structured codes only) or "none" (no explanations; smallest payload).
     """
     try:
-        eligible_assets, ineligible_assets = await get_eligible_trains()
-        
-        if not eligible_assets:
-            return get_optimized_schedule([], ineligible_assets, 0)
-
-        eligible_assets_with_risk = risk_predictor.predict_risk(eligible_assets)
-        
-        schedule = get_optimized_schedule(
-            eligible_assets_with_risk, 
-            ineligible_assets, 
-            request.num_trains_for_service
-        )
-        return schedule
+        key = (await schedule_cache.fingerprint(), request.model_dump_json(), explain)
+        body = schedule_cache.get(key)
+        if body is None:
+            body = ScheduleResponse.model_validate(await build_schedule(request, explain)).model_dump_json()
+            schedule_cache.put(key, body)
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         print(f"An error occurred in generate_schedule: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
+@router.get(
+    "/v1/schedule-cache/stats",
+    tags=["Scheduling"],
+    response_model=ScheduleCacheStats
+)
+async def get_schedule_cache_stats():
+    """
+    Hit ratio, size and evictions of the generate-schedule result cache.
+    """
+    return schedule_cache.report()
+
+@router.post(
+    "/v1/generate-schedule/stream",
+    tags=["Scheduling"]
+)
+async def generate_schedule_stream(
+    request: ScheduleRequest,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+    explain: ExplainMode = Query("full")
+):
+    """
+    Streaming variant of generate-schedule for large fleets. Returns NDJSON:
+    maintenance items as they are found, a progress line per chunk, and a final
+    "schedule" line identical to the generate-schedule response (including
+    the stabling plan and departure sequence).
+    """
+    async def events():
+        try:
+            constraints = await induction_constraints(request)
+            async for event in stream_schedule(request.num_trains_for_service, chunk_size, constraints, explain):
+                # Shape items and the final schedule as the generate-schedule response does
+                if event["type"] == "maintenance":
+                    event["item"] = TrainDetail.model_validate(event["item"]).model_dump(mode="json")
+                elif event["type"] == "schedule":
+                    event["schedule"] = ScheduleResponse.model_validate(event["schedule"]).model_dump(mode="json")
+                yield json.dumps(jsonable_encoder(event)) + "\n"
+        except Exception as e:
+            print(f"An error occurred in generate_schedule_stream: {e}")
+            traceback.print_exc()
+            yield json.dumps({"type": "error", "detail": "An unexpected error occurred."}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post(
+    "/v1/generate-schedule/pareto",
+    response_model=ParetoResponse,
+    tags=["Scheduling"]
+)
+async def generate_pareto_schedule(request: ParetoRequest):
+    """
+    Returns the Pareto front of induction plans over reliability, risk,
+    branding and efficiency (NSGA-II within the time budget), so planners can
+    pick a trade-off instead of fixing the weights up front.
+    """
+    try:
+        snapshot = await fleet_state.get_snapshot()
+        maintenance_list = maintenance_items([asset.to_dict() for asset in snapshot.ineligible])
+        if not snapshot.eligible:
+            return {
+                "plans": [],
+                "maintenance": maintenance_list,
+                "optimization_summary": {"total_evaluated": 0, "optimization_method": "N/A - No eligible assets"}
+            }
+
+        # NSGA-II runs for up to time_budget_ms; keep it off the event loop
+        front = await run_in_threadpool(
+            pareto_front,
+            scored_rows(snapshot, await depot_layout.get(), await branding_plan(snapshot, request.num_trains_for_service)),
+            request.num_trains_for_service,
+            time_budget_s=request.time_budget_ms / 1000,
+            population_size=request.population_size,
+            max_plans=request.max_plans,
+            seed=request.seed
+        )
+        return {**front, "maintenance": maintenance_list}
+    except Exception as e:
+        print(f"An error occurred in generate_pareto_schedule: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+@router.post(
+    "/v1/generate-schedule/scenarios",
+    response_model=ScenarioResponse,
+    tags=["Scheduling"]
+)
+async def generate_scenario_schedules(request: ScenarioRequest):
+    """
+    What-if sweep: plans for several (num_trains_for_service, weights) scenarios
+    in one reply. Eligibility, risk and objective scores are computed once and
+    shared by every scenario.
+    """
+    try:
+        start = time.perf_counter()
+        snapshot = await fleet_state.get_snapshot()
+        maintenance_list = maintenance_items([asset.to_dict() for asset in snapshot.ineligible])
+        scenarios = [
+            (scenario.num_trains_for_service, scenario.weights.model_dump(exclude_none=True) if scenario.weights else None)
+            for scenario in request.scenarios
+        ]
+
+        # Branding hours are planned for the largest service set in the sweep
+        branding = await branding_plan(snapshot, max(num for num, _ in scenarios))
+        plans = evaluate_scenarios(scored_rows(snapshot, await depot_layout.get(), branding), scenarios)
+
+        return {
+            "scenarios": plans,
+            "maintenance": maintenance_list,
+            "optimization_summary": {
+                "total_evaluated": len(snapshot.eligible),
+                "scenarios_evaluated": len(plans),
+                "optimization_method": "KMRL Multi-Objective Weighted Scoring (shared score matrix)",
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+            }
+        }
+    except Exception as e:
+        print(f"An error occurred in generate_scenario_schedules: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+@router.post(
+    "/v1/plan-horizon",
+    response_model=HorizonResponse,
+    tags=["Scheduling"]
+)
+async def plan_horizon(request: HorizonRequest):
+    """
+    Rolling-horizon plan: which trains run on each of the next `days` days,
+    balancing projected end-of-horizon mileage and branding exposure across
+    the fleet. Re-planning warm-starts from the previous plan, shifted to today.
+    """
+    try:
+        start = datetime.now().date()
+        snapshot = await fleet_state.get_snapshot()
+        maintenance_list = maintenance_items([asset.to_dict() for asset in snapshot.ineligible])
+        if not snapshot.eligible:
+            return {
+                "start_date": start.isoformat(),
+                "days": [],
+                "trains": [],
+                "maintenance": maintenance_list,
+                "summary": {"optimization_method": "N/A - No eligible assets"}
+            }
+
+        inputs = build_inputs(
+            scored_rows(snapshot, await depot_layout.get(), await branding_plan(snapshot, request.num_trains_for_service)),
+            start,
+            request.days,
+            request.num_trains_for_service,
+            await fetch_first_certificate_expiries(start, request.days)
+        )
+        plan = horizon_planner.plan(inputs, start, warm_start=request.warm_start)
+        return {**plan, "maintenance": maintenance_list}
+    except Exception as e:
+        print(f"An error occurred in plan_horizon: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+@router.get(
+    "/v1/branding-plan",
+    response_model=BrandingPlanResponse,
+    tags=["Scheduling"]
+)
+async def get_branding_plan(
+    num_trains_for_service: int = Query(..., gt=0),
+    nights: int = Query(PLANNING_NIGHTS, ge=1, le=180)
+):
+    """
+    Allocates service hours to branding campaigns over the next `nights`
+    nights to minimize the expected SLA penalty. The same plan sets each
+    train's branding urgency in generate-schedule.
+    """
+    try:
+        snapshot = await fleet_state.get_snapshot()
+        plan = await plan_branding(list(snapshot.column("asset_id")), num_trains_for_service, nights)
+        return plan.summary()
+    except Exception as e:
+        print(f"An error occurred in get_branding_plan: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="Failed to build branding plan.")
+
+@router.get(
+    "/v1/counterfactuals",
+    response_model=CounterfactualResponse,
+    tags=["Scheduling"]
+)
+async def get_counterfactuals(num_trains_for_service: int = Query(..., gt=0)):
+    """
+    For every standby train, the smallest change to each scoring input
+    (closing work orders, clearing warnings, fresher maintenance, lower
+    mileage, shunting cost or risk, higher branding urgency) that alone would
+    lift it above the service cutoff of the greedy plan. All standby trains
+    are answered in one batched pass.
+    """
+    try:
+        snapshot = await fleet_state.get_snapshot()
+        if not snapshot.eligible:
+            return {"standby": [], "summary": {"standby_count": 0}}
+        rows = scored_rows(
+            snapshot, await depot_layout.get(), await branding_plan(snapshot, num_trains_for_service)
+        )
+        return standby_counterfactuals(rows, num_trains_for_service)
+    except Exception as e:
+        print(f"An error occurred in get_counterfactuals: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="Failed to compute counterfactuals.")
+
+@router.get(
+    "/v1/eligibility-forecast",
+    response_model=EligibilityForecastResponse,
+    tags=["Scheduling"]
+)
+async def get_eligibility_forecast(nights: int = Query(30, ge=1, le=365)):
+    """
+    Forecasts the eligible fleet for each of the next `nights` nights,
+    listing trains that drop out on certificate expiry and campaigns that end.
+    """
+    try:
+        return await forecast_eligibility(nights)
+    except Exception as e:
+        print(f"An error occurred in get_eligibility_forecast: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="Failed to build eligibility forecast.")
+
 @router.post(
     "/v1/evaluate-model", 
     response_model=TaskResponse, 
     tags=["ML Admin"]
 )
-async def evaluate_model_endpoint(background_tasks: BackgroundTasks):
+async def evaluate_model_endpoint():
     """
     Evaluates the current model's performance on a held-out test set
     and returns key performance metrics. This also retrains the production
-    model on all available data.
+    model on all available data. Runs in the training worker process; a
+    request while an evaluation is running returns that evaluation's task.
     """
     try:
-        task_id = str(uuid.uuid4())
-        background_tasks.add_task(risk_predictor.train_and_evaluate, task_id)
+        task_id, attached = training_jobs.start("evaluate", risk_predictor.train_and_evaluate)
+        if attached:
+            return {"task_id": task_id, "message": "Model evaluation already running; attached to it"}
         return {"task_id": task_id, "message": "Model evaluation started in background"}
+    except TrainingBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"An error occurred during evaluation: {e}")
         traceback.print_exc()
@@ -65,15 +363,20 @@ async def evaluate_model_endpoint(background_tasks: BackgroundTasks):
     response_model=TaskResponse,
     tags=["ML Admin"]
 )
-async def train_model_endpoint(background_tasks: BackgroundTasks):
+async def train_model_endpoint():
     """
     Trains the model on all available data without evaluation.
     This is useful when you want to quickly update the model with new data.
+    Runs in the training worker process; a request while training is running
+    returns that training's task.
     """
     try:
-        task_id = str(uuid.uuid4())
-        background_tasks.add_task(risk_predictor.train_model, task_id)
+        task_id, attached = training_jobs.start("train", risk_predictor.train_model)
+        if attached:
+            return {"task_id": task_id, "message": "Model training already running; attached to it"}
         return {"task_id": task_id, "message": "Model training started in background"}
+    except TrainingBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"An error occurred during training: {e}")
         traceback.print_exc()
@@ -94,6 +397,20 @@ async def get_model_training_status(task_id: str):
     
     return status
 
+@router.post(
+    "/v1/model-status/{task_id}/cancel",
+    tags=["ML Admin"],
+    response_model=TaskStatus
+)
+async def cancel_model_training(task_id: str):
+    """
+    Ask a running training/evaluation task to stop. It ends with status
+    "Cancelled" at its next checkpoint, and the served model is unchanged.
+    """
+    if not training_jobs.cancel(task_id):
+        raise HTTPException(status_code=404, detail="No running training task with this id")
+    return get_task_status(task_id)
+
 @router.get(
     "/v1/model-evaluation/latest",
     tags=["ML Admin"],
@@ -124,4 +441,102 @@ async def get_all_model_evaluations():
     return {
         "latest_evaluation": latest,
         "completed_tasks": completed
-    }
\ No newline at end of file
+    }
+
+@router.get(
+    "/v1/models",
+    tags=["ML Admin"],
+    response_model=ModelRegistryStatus
+)
+async def get_model_versions():
+    """
+    Published model versions, the one being served and the one a rollback would restore.
+    """
+    return model_registry.status()
+
+@router.post(
+    "/v1/models/{version}/promote",
+    tags=["ML Admin"],
+    response_model=ModelRegistryStatus
+)
+async def promote_model_version(version: str):
+    """
+    Serve a published version. It is verified and loaded before the switch,
+    which is atomic; every worker picks it up within a second or so.
+    """
+    try:
+        await run_in_threadpool(model_registry.load, version)
+        await run_in_threadpool(model_registry.promote, version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Model version {version} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"An error occurred promoting model version {version}: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="Failed to promote model version.")
+    return model_registry.status()
+
+@router.post(
+    "/v1/models/rollback",
+    tags=["ML Admin"],
+    response_model=ModelRegistryStatus
+)
+async def rollback_model_version():
+    """
+    Serve the version the current one replaced again, without retraining.
+    """
+    try:
+        previous = (model_registry.current() or {}).get("previous")
+        if previous is not None:
+            await run_in_threadpool(model_registry.load, previous)
+        await run_in_threadpool(model_registry.rollback)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Model version {e} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"An error occurred rolling back the model: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="Failed to roll back model version.")
+    return model_registry.status()
+
+@router.get(
+    "/v1/rules/stats",
+    tags=["Rules Admin"],
+    response_model=RuleSetStats
+)
+async def get_rule_stats():
+    """
+    Per-rule hit counts and cumulative evaluation time for the active rule set.
+    """
+    return rules.risk_rules.stats()
+
+@router.post(
+    "/v1/rules/stats/reset",
+    tags=["Rules Admin"],
+    response_model=RuleSetStats
+)
+async def reset_rule_stats():
+    """
+    Reset hit counters and timings, e.g. before a nightly run.
+    """
+    rules.risk_rules.reset_stats()
+    return rules.risk_rules.stats()
+
+@router.post(
+    "/v1/rules/reload",
+    tags=["Rules Admin"],
+    response_model=RuleSetStats
+)
+async def reload_rules():
+    """
+    Recompile the rule definition file and swap it in without redeploying.
+    The previous rule set stays active if the new definitions are invalid.
+    """
+    try:
+        ruleset = reload_risk_rules()
+    except (OSError, ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rule definitions: {e}")
+    schedule_cache.invalidate()
+    return ruleset.stats()
@@ -0,0 +1,265 @@
+"""
+Branding exposure planning.
+
+Allocates service hours to branding campaigns over the coming nights as a
+min-cost flow:
+
+    source -> night d            capacity service_slots * DAILY_SERVICE_HOURS
+    night d -> train i on d      capacity DAILY_SERVICE_HOURS, if i is available on d
+    train i on d -> campaign c   if c is on train i and active on d
+    campaign c -> sink           capacity: hours c still owes within the horizon
+
+An hour served on night d for campaign c is worth
+
+    penalty_rate_c * DELIVERY_PROBABILITY ** d
+
+where penalty_rate_c = penalty_amount / deficit_hours spreads the penalty
+evenly over the missing hours. Hours planned further ahead are less likely to
+be delivered. Minimizing the negated value minimizes the expected penalty.
+Campaigns ending after the horizon owe a pro-rata share of their deficit
+within it. The flow is solved as a linear program with HiGHS dual simplex.
+Flow matrices are totally unimodular, so the plan is integral.
+
+Feedback to the nightly scoring: a train's branding_urgency_score is the
+expected penalty lost if it stays out of service tonight. Its hours for
+tonight are moved to the earliest later nights where the train and the fleet
+still have room. Hours with nowhere to go cost their full rate. The loss is
+scaled by a full night at the highest penalty rate, so slack campaigns score
+near 0 and campaigns with no room left score near 1.
+"""
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+from app.core.dates import to_date
+from app.core.horizon import DAILY_SERVICE_HOURS
+from app.db.queries import fetch_campaign_deficits, fetch_first_certificate_expiries
+
+PLANNING_NIGHTS = 30
+DELIVERY_PROBABILITY = 0.98  # Chance an hour planned one night further ahead is actually served
+UNPRICED_HOUR_VALUE = 0.01   # Campaigns without a penalty still take spare hours
+
+class Campaign(NamedTuple):
+    campaign_id: str
+    asset_id: str
+    advertiser: str
+    first_night: int        # first night offset the campaign is active in the horizon
+    last_night: int         # last night offset, inclusive
+    deficit_hours: float
+    due_hours: float        # share of the deficit owed within the horizon
+    penalty_rate: float     # penalty per missing hour
+
+def campaigns_from_rows(rows: Sequence[Dict], start: date, nights: int) -> List[Campaign]:
+    """Campaign deficits clipped to the horizon, with a pro-rata due share for campaigns ending after it."""
+    campaigns = []
+    for row in rows:
+        deficit = float(row["deficit_hours"])
+        first = max(0, (to_date(row["start_date"]) - start).days)
+        end = (to_date(row["end_date"]) - start).days
+        last = min(end, nights - 1)
+        if deficit <= 0 or last < first:
+            continue
+        # Nights left to serve the whole deficit, and the share of them inside the horizon
+        due = deficit * (last - first + 1) / (end - first + 1)
+        campaigns.append(Campaign(
+            campaign_id=row["campaign_id"],
+            asset_id=row["asset_id"],
+            advertiser=row.get("advertiser_name") or "Unknown",
+            first_night=first,
+            last_night=last,
+            deficit_hours=deficit,
+            due_hours=due,
+            penalty_rate=float(row["penalty_amount"] or 0) / deficit
+        ))
+    return campaigns
+
+class BrandingPlan:
+    """Hours per (campaign, night) and the per-train feedback for tonight's scoring."""
+
+    def __init__(self, campaigns: List[Campaign], hours: np.ndarray, nights: int, service_slots: int,
+                 start: Optional[date] = None):
+        self.start = start
+        self.campaigns = campaigns
+        self.hours = hours  # campaigns x nights
+        self.nights = nights
+        self.service_slots = service_slots
+        self.solve_time_ms = 0.0
+        self.urgency = self._withholding_urgency()
+
+    def _withholding_urgency(self) -> Dict[str, float]:
+        """Expected penalty lost if each train skips tonight, scaled to [0, 1]."""
+        if not self.campaigns:
+            return {}
+        discount = DELIVERY_PROBABILITY ** np.arange(self.nights)
+        fleet_room = self.service_slots * DAILY_SERVICE_HOURS - self.hours.sum(axis=0)
+        highest_rate = max(campaign.penalty_rate for campaign in self.campaigns)
+
+        by_train: Dict[str, List[int]] = {}
+        for index, campaign in enumerate(self.campaigns):
+            by_train.setdefault(campaign.asset_id, []).append(index)
+
+        urgency = {}
+        for asset_id, indices in by_train.items():
+            train_room = DAILY_SERVICE_HOURS - self.hours[indices].sum(axis=0)
+            room = np.minimum(train_room, fleet_room)
+            loss = 0.0
+            for index in sorted(indices, key=lambda i: -self.campaigns[i].penalty_rate):
+                campaign = self.campaigns[index]
+                moving = self.hours[index, 0]
+                for night in range(max(1, campaign.first_night), campaign.last_night + 1):
+                    if moving <= 0:
+                        break
+                    moved = min(moving, room[night])
+                    if moved > 0:
+                        room[night] -= moved
+                        moving -= moved
+                        loss += campaign.penalty_rate * (1 - discount[night]) * moved
+                loss += campaign.penalty_rate * moving
+            urgency[asset_id] = min(1.0, loss / (DAILY_SERVICE_HOURS * highest_rate)) if highest_rate > 0 else 0.0
+        return urgency
+
+    def expected_penalty(self) -> float:
+        """Expected penalty over the horizon if the plan is followed."""
+        discount = DELIVERY_PROBABILITY ** np.arange(self.nights)
+        delivered = self.hours @ discount if self.campaigns else np.zeros(0)
+        return float(sum(
+            campaign.penalty_rate * max(0.0, campaign.due_hours - delivered[index])
+            for index, campaign in enumerate(self.campaigns)
+        ))
+
+    def branding_columns(self, asset_ids: Sequence[str]) -> Dict[str, List]:
+        """Stage columns for FleetSnapshot.rows: the branding inputs of the nightly scoring."""
+        deficit: Dict[str, float] = {}
+        for campaign in self.campaigns:
+            deficit[campaign.asset_id] = deficit.get(campaign.asset_id, 0.0) + campaign.deficit_hours
+        urgency = [self.urgency.get(asset_id, 0.0) for asset_id in asset_ids]
+        return {
+            "branding_urgency_score": urgency,
+            "branding_hours_deficit": [int(round(deficit.get(asset_id, 0.0))) for asset_id in asset_ids],
+            "branding_sla_risk": [
+                "None" if asset_id not in deficit else
+                "High" if score >= 0.5 else
+                "Medium" if score >= 0.1 else
+                "Low"
+                for asset_id, score in zip(asset_ids, urgency)
+            ]
+        }
+
+    def summary(self) -> Dict:
+        discount = DELIVERY_PROBABILITY ** np.arange(self.nights)
+        return {
+            "start_date": self.start.isoformat() if self.start else None,
+            "nights": self.nights,
+            "campaigns": [
+                {
+                    "campaign_id": campaign.campaign_id,
+                    "asset_id": campaign.asset_id,
+                    "advertiser": campaign.advertiser,
+                    "deficit_hours": campaign.deficit_hours,
+                    "due_hours": round(campaign.due_hours, 2),
+                    "planned_hours": round(float(self.hours[index].sum()), 2),
+                    "tonight_hours": round(float(self.hours[index, 0]), 2),
+                    "expected_penalty": round(
+                        campaign.penalty_rate * max(0.0, campaign.due_hours - float(self.hours[index] @ discount)), 2
+                    )
+                }
+                for index, campaign in enumerate(self.campaigns)
+            ],
+            "summary": {
+                "expected_penalty": round(self.expected_penalty(), 2),
+                "penalty_if_unserved": round(sum(c.penalty_rate * c.due_hours for c in self.campaigns), 2),
+                "planned_hours": round(float(self.hours.sum()), 2),
+                "method": "Min-cost flow over nights, trains and campaigns (HiGHS dual simplex)",
+                "solve_time_ms": round(self.solve_time_ms, 3)
+            }
+        }
+
+def allocate_branding_hours(
+    campaigns: List[Campaign],
+    available_nights: Dict[str, int],
+    service_slots: int,
+    nights: int = PLANNING_NIGHTS,
+    start: Optional[date] = None
+) -> BrandingPlan:
+    """
+    Min-expected-penalty allocation of service hours to campaigns.
+
+    available_nights maps each eligible train to the number of nights it can
+    run from tonight; trains missing from it cannot serve any campaign.
+    """
+    began = time.perf_counter()
+    campaigns = [campaign for campaign in campaigns if available_nights.get(campaign.asset_id, 0) > 0]
+    if not campaigns:
+        plan = BrandingPlan([], np.zeros((0, nights)), nights, service_slots, start)
+        plan.solve_time_ms = (time.perf_counter() - began) * 1000
+        return plan
+
+    # Nodes: nights, then train-nights, then campaigns (source and sink are left free)
+    train_nights: Dict[tuple, int] = {}
+    for campaign in campaigns:
+        last = min(campaign.last_night, available_nights[campaign.asset_id] - 1)
+        for night in range(campaign.first_night, last + 1):
+            train_nights.setdefault((campaign.asset_id, night), nights + len(train_nights))
+    campaign_node = nights + len(train_nights)
+
+    rows, cols, values = [], [], []
+    costs, upper = [], []
+    served = []  # (campaign index, night, arc index)
+
+    def arc(tail: Optional[int], head: Optional[int], capacity: float, cost: float = 0.0) -> int:
+        index = len(costs)
+        for node, sign in ((tail, -1.0), (head, 1.0)):
+            if node is not None:
+                rows.append(node)
+                cols.append(index)
+                values.append(sign)
+        costs.append(cost)
+        upper.append(capacity)
+        return index
+
+    for night in range(nights):
+        arc(None, night, service_slots * DAILY_SERVICE_HOURS)
+    for (_, night), node in train_nights.items():
+        arc(night, node, DAILY_SERVICE_HOURS)
+    for index, campaign in enumerate(campaigns):
+        rate = campaign.penalty_rate + UNPRICED_HOUR_VALUE
+        for night in range(campaign.first_night, campaign.last_night + 1):
+            node = train_nights.get((campaign.asset_id, night))
+            if node is not None:
+                served.append((index, night, arc(node, campaign_node + index, DAILY_SERVICE_HOURS,
+                                                 -rate * DELIVERY_PROBABILITY ** night)))
+        arc(campaign_node + index, None, campaign.due_hours)
+
+    balance = coo_matrix((values, (rows, cols)), shape=(campaign_node + len(campaigns), len(costs))).tocsr()
+    result = linprog(
+        costs, A_eq=balance, b_eq=np.zeros(balance.shape[0]),
+        bounds=np.column_stack([np.zeros(len(upper)), upper]), method="highs-ds"
+    )
+    if result.status != 0:
+        raise RuntimeError(f"Branding flow did not solve: {result.message}")
+
+    hours = np.zeros((len(campaigns), nights))
+    for index, night, arc_index in served:
+        hours[index, night] = result.x[arc_index]
+    plan = BrandingPlan(campaigns, hours, nights, service_slots, start)
+    plan.solve_time_ms = (time.perf_counter() - began) * 1000
+    return plan
+
+def available_nights(asset_ids: Sequence[str], first_expiries: Sequence[Dict], start: date, nights: int) -> Dict[str, int]:
+    """Nights each eligible train can run from tonight; it stays eligible through its certificate's expiry date."""
+    expiry_offset = {row["asset_id"]: (to_date(row["expiry_date"]) - start).days for row in first_expiries}
+    return {
+        asset_id: min(nights, max(0, expiry_offset[asset_id] + 1)) if asset_id in expiry_offset else nights
+        for asset_id in asset_ids
+    }
+
+async def plan_branding(asset_ids: Sequence[str], service_slots: int, nights: int = PLANNING_NIGHTS) -> BrandingPlan:
+    """Branding plan from tonight for the given eligible trains and nightly service slots."""
+    start = datetime.now().date()
+    campaigns = campaigns_from_rows(
+        await fetch_campaign_deficits(start, start + timedelta(days=nights - 1)), start, nights
+    )
+    availability = available_nights(asset_ids, await fetch_first_certificate_expiries(start, nights), start, nights)
+    return allocate_branding_hours(campaigns, availability, service_slots, nights, start)
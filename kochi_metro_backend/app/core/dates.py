@@ -0,0 +1,18 @@
+"""
+Date helpers shared by the planning modules.
+
+Raw SQL rows carry dates as date, datetime or ISO strings depending on the
+column type and driver; planners work on plain dates.
+"""
+from datetime import date, datetime
+from typing import Optional
+
+def to_date(value) -> Optional[date]:
+    """The calendar date of a date, datetime or ISO-8601 string (None stays None)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
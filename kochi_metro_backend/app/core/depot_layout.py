@@ -0,0 +1,166 @@
+"""
+Depot track model and shunting costs.
+
+The layout is read from the locations table:
+- nodes are the locations under each depot (ALUVA_DEPOT, MUTTOM_DEPOT, ...),
+  where a depot is a location of type DEPOT or any root location with children;
+- edges link each location to its parent_location, weighted by move_cost
+  (1.0 when unset);
+- blocking: sibling locations with a track_sequence lie on the same dead-end
+  track, exit end first, so a position is blocked by every sibling with a
+  lower track_sequence;
+- stabling tracks are the non-depot locations with a depot_capacity (the
+  number of trains the track holds).
+
+All-pairs shortest paths are computed once per layout. A train's shunting
+cost is its path cost to the depot throat (the depot node) plus the path
+costs of the positions blocking it, scaled to the 0-5 range the efficiency
+objective expects. The layout is cached and rebuilt only when the locations
+fingerprint changes, so per-asset lookups are O(1) dict reads. The
+fingerprint itself is re-read at most every LAYOUT_TTL_S seconds, and
+whenever the schedule cache re-reads the fleet fingerprint (expire()).
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
+from app.db.queries import fetch_locations, fetch_layout_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MAX_SHUNTING_COST = 5  # Cost of an unknown location; matches the efficiency objective's scale
+DEFAULT_MOVE_COST = 1.0
+LAYOUT_TTL_S = float(os.getenv("KMRL_LAYOUT_TTL_S", "5.0"))
+
+class DepotLayout:
+    """Immutable track graph with precomputed shortest paths and shunting costs."""
+
+    def __init__(self, locations: List[Dict]):
+        by_id = {location["location_id"]: location for location in locations}
+        children: Dict[str, List[str]] = {}
+        for location in locations:
+            parent = location.get("parent_location")
+            if parent in by_id:
+                children.setdefault(parent, []).append(location["location_id"])
+
+        self.depot_of: Dict[str, str] = {}
+        for location_id in by_id:
+            self.depot_of[location_id] = self._find_depot(location_id, by_id, children)
+
+        self.nodes: List[str] = sorted(location_id for location_id in by_id if self.depot_of[location_id])
+        self.index: Dict[str, int] = {location_id: i for i, location_id in enumerate(self.nodes)}
+
+        rows, cols, weights = [], [], []
+        for location_id in self.nodes:
+            parent = by_id[location_id].get("parent_location")
+            if parent in self.index:
+                move_cost = by_id[location_id].get("move_cost")
+                rows.append(self.index[location_id])
+                cols.append(self.index[parent])
+                weights.append(float(move_cost) if move_cost is not None else DEFAULT_MOVE_COST)
+        n = len(self.nodes)
+        graph = csr_matrix((weights, (rows, cols)), shape=(n, n))
+        self.distances = shortest_path(graph, method="D", directed=False) if n else np.zeros((0, 0))
+
+        # Dead-end tracks: lower track_sequence positions sit between a position and the exit
+        self.blockers: Dict[str, Tuple[str, ...]] = {}
+        for parent, siblings in children.items():
+            sequenced = sorted(
+                (by_id[s]["track_sequence"], s) for s in siblings if by_id[s].get("track_sequence") is not None
+            )
+            for position, (_, location_id) in enumerate(sequenced):
+                self.blockers[location_id] = tuple(s for _, s in sequenced[:position])
+
+        # Stabling tracks: non-depot locations with their own depot_capacity
+        self.stabling_tracks: List[Tuple[str, str, int]] = [
+            (location_id, self.depot_of[location_id], int(by_id[location_id]["depot_capacity"]))
+            for location_id in self.nodes
+            if location_id != self.depot_of[location_id] and by_id[location_id].get("depot_capacity")
+        ]
+
+        raw = {}
+        for location_id in self.nodes:
+            exit_cost = self.distance(location_id, self.depot_of[location_id])
+            if np.isfinite(exit_cost):
+                raw[location_id] = exit_cost + sum(
+                    self.distance(blocker, self.depot_of[blocker]) for blocker in self.blockers.get(location_id, ())
+                )
+        highest = max(raw.values(), default=0.0)
+        # Without any track structure every train costs the same; keep the default
+        self.shunting_costs: Dict[str, float] = (
+            {location_id: MAX_SHUNTING_COST * cost / highest for location_id, cost in raw.items()}
+            if highest > 0 else {}
+        )
+
+    @staticmethod
+    def _find_depot(location_id: str, by_id: Dict[str, Dict], children: Dict[str, List[str]]) -> Optional[str]:
+        seen = set()
+        current = location_id
+        while current in by_id and current not in seen:
+            seen.add(current)
+            location = by_id[current]
+            parent = location.get("parent_location")
+            if (location.get("location_type") or "").upper() == "DEPOT" or (parent not in by_id and current in children):
+                return current
+            current = parent
+        return None
+
+    def distance(self, source: str, target: str) -> float:
+        """Shortest move cost between two locations (inf if unconnected or unknown)."""
+        i, j = self.index.get(source), self.index.get(target)
+        if i is None or j is None:
+            return float("inf")
+        return float(self.distances[i, j])
+
+    def shunting_cost(self, location: Optional[str]) -> float:
+        """Scaled shunting cost to get a train at `location` out of its depot."""
+        return self.shunting_costs.get(location, MAX_SHUNTING_COST)
+
+    def shunting_columns(self, locations: Sequence[Optional[str]]) -> Dict[str, List[float]]:
+        """Stage columns for FleetSnapshot.rows: shunting_cost per asset."""
+        return {"shunting_cost": [self.shunting_cost(location) for location in locations]}
+
+class DepotLayoutCache:
+    """Holds the current DepotLayout and rebuilds it when the locations table changes."""
+
+    def __init__(self, ttl_s: float = LAYOUT_TTL_S):
+        self.ttl_s = ttl_s
+        self._layout: Optional[DepotLayout] = None
+        self._fingerprint: Optional[str] = None
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.stats = {"rebuilds": 0, "fingerprint_checks": 0}
+
+    def _fresh(self) -> bool:
+        return self._layout is not None and time.monotonic() - self._checked_at < self.ttl_s
+
+    async def get(self) -> DepotLayout:
+        """Current layout; the locations fingerprint is re-read at most every ttl_s."""
+        if self._fresh():
+            return self._layout
+        async with self._lock:
+            if not self._fresh():
+                fingerprint = await fetch_layout_fingerprint()
+                if self._layout is None or fingerprint != self._fingerprint:
+                    self._layout = DepotLayout(await fetch_locations())
+                    self._fingerprint = fingerprint
+                    self.stats["rebuilds"] += 1
+                    logger.info(f"Depot layout rebuilt: {len(self._layout.nodes)} track nodes")
+                self._checked_at = time.monotonic()
+                self.stats["fingerprint_checks"] += 1
+            return self._layout
+
+    def expire(self):
+        """Re-read the fingerprint on the next get(); the layout is kept if it is unchanged."""
+        self._checked_at = float("-inf")
+
+    def invalidate(self):
+        """Force a rebuild on the next get()."""
+        self._layout = None
+
+# Create a single, reusable instance
+depot_layout = DepotLayoutCache()
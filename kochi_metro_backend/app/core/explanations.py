@@ -0,0 +1,115 @@
+"""
+Structured decision explanations.
+
+A decision explanation is a list of {"code", "params"} entries, one per
+objective. Codes are stable identifiers that programmatic callers can match
+on. Text is rendered from them only when a caller asks for it, via
+render_reasons(). Levels and factors are computed for the whole fleet at once
+(ExplanationBuilder), so bulk callers that never read the text no longer pay
+for string building.
+
+    reliability.<level>    {"score"}                       level from RELIABILITY_LEVELS
+    risk.assessment        {"category", "detail"}
+    branding.<sla_risk>    {"hours_deficit"}               only when the branding score > 0.1
+    efficiency             {"factors": [...]}              fleet_balancing, minimal_shunting
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+# (lower bound, level, text), checked in order
+RELIABILITY_LEVELS = (
+    (0.8, "excellent", "Excellent operational condition"),
+    (0.6, "good", "Good condition with minor considerations"),
+    (0.4, "acceptable", "Acceptable with some maintenance needs"),
+    (float("-inf"), "attention", "Requires attention before service"),
+)
+
+BRANDING_TEXT = {
+    "high": "Critical: {hours_deficit}h needed to avoid SLA breach",
+    "medium": "Important: {hours_deficit}h deficit approaching SLA limit",
+    "low": "On track with branding requirements",
+    "none": "No active branding requirements",
+}
+
+BRANDING_CODES = {level.capitalize(): f"branding.{level}" for level in BRANDING_TEXT}
+
+RELIABILITY_CODES = tuple(f"reliability.{level}" for _, level, _ in RELIABILITY_LEVELS)
+RELIABILITY_TEXT = {level: text for _, level, text in RELIABILITY_LEVELS}
+
+EFFICIENCY_TEXT = {
+    "fleet_balancing": "lower mileage helps fleet balancing",
+    "minimal_shunting": "minimal shunting required",
+}
+
+# Efficiency factor sets, indexed by (mileage balance > 0.7) + 2 * (shunting efficiency > 0.7)
+EFFICIENCY_FACTOR_SETS = ((), ("fleet_balancing",), ("minimal_shunting",), ("fleet_balancing", "minimal_shunting"))
+
+def reliability_level(score: float) -> Tuple[str, str]:
+    """(level, text) for a reliability score."""
+    for bound, level, text in RELIABILITY_LEVELS:
+        if score > bound:
+            return level, text
+    return RELIABILITY_LEVELS[-1][1:]
+
+def branding_level(asset: Dict) -> str:
+    sla_risk = str(asset.get('branding_sla_risk', 'None')).lower()
+    return sla_risk if sla_risk in BRANDING_TEXT else "none"
+
+def efficiency_factors(mileage_balance_score: float, shunting_efficiency: float) -> Tuple[str, ...]:
+    return EFFICIENCY_FACTOR_SETS[(mileage_balance_score > 0.7) + 2 * (shunting_efficiency > 0.7)]
+
+def efficiency_text(factors: Sequence[str]) -> str:
+    return "; ".join(EFFICIENCY_TEXT[factor] for factor in factors) if factors else "standard efficiency"
+
+class ExplanationBuilder:
+    """
+    Structured explanations for a whole score_batch output.
+
+    Levels and factors are computed for the fleet at once. Efficiency and risk
+    entries repeat across the fleet and are shared between assets, so the
+    returned explanations must be treated as read-only.
+    """
+
+    def __init__(self, scores: Dict[str, Sequence[float]]):
+        reliability = np.asarray(scores['reliability'], dtype=float)
+        bounds = [bound for bound, _, _ in RELIABILITY_LEVELS[:-1]]
+        self.reliability_level = np.select(
+            [reliability > bound for bound in bounds], range(len(bounds)), len(bounds)
+        ).tolist()
+        self.reliability = np.round(reliability, 3).tolist()
+        self.efficiency_factors = (
+            (np.asarray(scores['mileage_balance']) > 0.7) + 2 * (np.asarray(scores['shunting_efficiency']) > 0.7)
+        ).tolist()
+        self.branding_shown = (np.asarray(scores['branding']) > 0.1).tolist()
+        self._efficiency = [{"code": "efficiency", "params": {"factors": factors}} for factors in EFFICIENCY_FACTOR_SETS]
+        self._risk: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def reasons(self, asset: Dict, index: int) -> List[Dict[str, Any]]:
+        """Structured explanation for the asset in row `index` of the scores."""
+        key = (asset.get('risk_category', 'Unknown'), asset.get('risk_explanation', 'Standard assessment'))
+        risk = self._risk.get(key)
+        if risk is None:
+            risk = self._risk[key] = {"code": "risk.assessment", "params": {"category": key[0], "detail": key[1]}}
+        reasons = [
+            {"code": RELIABILITY_CODES[self.reliability_level[index]], "params": {"score": self.reliability[index]}},
+            risk
+        ]
+        if self.branding_shown[index]:
+            code = BRANDING_CODES.get(asset.get('branding_sla_risk', 'None')) or "branding." + branding_level(asset)
+            reasons.append({"code": code, "params": {"hours_deficit": asset.get('branding_hours_deficit', 0)}})
+        reasons.append(self._efficiency[self.efficiency_factors[index]])
+        return reasons
+
+def render_reason(reason: Dict[str, Any]) -> str:
+    family, _, level = reason["code"].partition(".")
+    if family == "reliability":
+        return "Reliability: " + RELIABILITY_TEXT[level]
+    if family == "risk":
+        return f"Risk: {reason['params']['detail']}"
+    if family == "branding":
+        return "Branding: " + BRANDING_TEXT[level].format(**reason["params"])
+    return "Efficiency: " + efficiency_text(reason["params"]["factors"])
+
+def render_reasons(reasons: Sequence[Dict[str, Any]]) -> str:
+    """The decision explanation text for a structured explanation."""
+    return " | ".join(render_reason(reason) for reason in reasons)
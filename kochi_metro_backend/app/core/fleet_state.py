@@ -0,0 +1,176 @@
+"""
+In-process fleet state with change-driven recomputation.
+
+Keeps the per-asset eligibility and hard-rules result from the last run and,
+on each refresh, recomputes only the assets that appear in the trigger-fed
+fleet_changes log (work orders, certificates, meter readings, campaigns and
+the asset row itself). Steady-state refreshes therefore cost O(changed assets).
+
+change_id comes from a sequence, so ids are handed out at insert time, not at
+commit: a slow transaction can commit id 41 after 42 has been read. Each
+refresh therefore re-reads the last CHANGE_LOG_WINDOW ids below the
+watermark and recomputes the assets of any id it has not applied yet. A
+transaction that stays open while more than CHANGE_LOG_WINDOW other changes
+are logged can still be missed until the next full rebuild.
+
+Every full rebuild (at least one a day) also prunes fleet_changes entries
+older than CHANGE_LOG_RETENTION_DAYS, keeping the last CHANGE_LOG_WINDOW ids.
+A store whose watermark is older than that rebuilds anyway on the date change.
+
+A full rebuild still happens when:
+- the store is empty,
+- the calendar date changes (certificate expiry, campaign windows and days
+  since maintenance are all relative to today),
+- the risk rule set has been reloaded, or
+- change tracking is not installed (see prisma/fleet_change_tracking.sql).
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple, Union
+from app.core import rules
+from app.core.rules import assess_eligibility_rows
+from app.core.snapshot import (
+    AssetRecord, IneligibleRecord, FleetSnapshot, asset_record_from_dict, ineligible_record_from_dict
+)
+from app.db.queries import fetch_eligibility_rows, fetch_latest_change_id, fetch_fleet_changes, prune_fleet_changes
+
+logger = logging.getLogger(__name__)
+
+CHANGE_LOG_WINDOW = int(os.getenv("KMRL_CHANGE_LOG_WINDOW", "1000"))
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv("KMRL_CHANGE_LOG_RETENTION_DAYS", "7"))
+
+class FleetStateStore:
+    def __init__(self):
+        # asset_id -> immutable eligible or ineligible record
+        self._assets: Dict[str, Union[AssetRecord, IneligibleRecord]] = {}
+        self._snapshot: Optional[FleetSnapshot] = None
+        self._last_change_id = 0
+        # Change ids within CHANGE_LOG_WINDOW of the watermark that are already applied
+        self._seen_change_ids: Set[int] = set()
+        self._as_of = None
+        self._ruleset = None
+        self._tracking_available: Optional[bool] = None
+        self._lock = asyncio.Lock()
+        self.stats = {"full_rebuilds": 0, "incremental_refreshes": 0, "assets_recomputed": 0}
+
+    def _store_rows(self, rows: List[Dict]):
+        eligible, ineligible = assess_eligibility_rows(rows)
+        for asset in eligible:
+            self._assets[asset["asset_id"]] = asset_record_from_dict(asset)
+        for asset in ineligible:
+            self._assets[asset["asset_id"]] = ineligible_record_from_dict(asset)
+        self._snapshot = None
+        self.stats["assets_recomputed"] += len(rows)
+
+    async def _change_watermark(self) -> Optional[int]:
+        try:
+            change_id = await fetch_latest_change_id()
+            if self._tracking_available is not True:
+                logger.info("Fleet change tracking detected - using incremental refresh")
+            self._tracking_available = True
+            return change_id
+        except Exception as e:
+            if self._tracking_available is not False:
+                logger.warning(f"Fleet change tracking unavailable ({e}); recomputing the full fleet on every refresh")
+            self._tracking_available = False
+            return None
+
+    async def _prune_change_log(self):
+        try:
+            deleted = await prune_fleet_changes(CHANGE_LOG_RETENTION_DAYS, CHANGE_LOG_WINDOW)
+            if deleted:
+                logger.info(f"Pruned {deleted} fleet_changes entries older than {CHANGE_LOG_RETENTION_DAYS} days")
+        except Exception as e:
+            logger.warning(f"Pruning fleet_changes failed ({e}); retrying on the next rebuild")
+
+    async def _full_rebuild(self, today):
+        # Read the watermark first so changes committed during the rebuild are replayed next time
+        change_id = await self._change_watermark()
+        seen = set()
+        if change_id is not None:
+            # Everything committed so far is covered by the rows read below
+            seen = {cid for cid, _ in await fetch_fleet_changes(change_id - CHANGE_LOG_WINDOW)}
+        rows = await fetch_eligibility_rows(today)
+        self._assets = {}
+        self._store_rows(rows)
+        self._last_change_id = max(seen, default=change_id or 0)
+        self._seen_change_ids = seen
+        if change_id is not None:
+            await self._prune_change_log()
+        self._as_of = today
+        self._ruleset = rules.risk_rules
+        self.stats["full_rebuilds"] += 1
+
+    async def _incremental_refresh(self, today):
+        changes = [
+            (cid, asset_id) for cid, asset_id in await fetch_fleet_changes(self._last_change_id - CHANGE_LOG_WINDOW)
+            if cid not in self._seen_change_ids
+        ]
+        changed_ids = sorted({asset_id for _, asset_id in changes})
+        if changed_ids:
+            rows = await fetch_eligibility_rows(today, asset_ids=changed_ids)
+            # Assets that no longer come back were deleted or are no longer trainsets
+            for asset_id in set(changed_ids) - {row["asset_id"] for row in rows}:
+                self._assets.pop(asset_id, None)
+            self._store_rows(rows)
+            logger.info(f"Fleet state: recomputed {len(rows)} changed assets")
+        self._last_change_id = max([self._last_change_id] + [cid for cid, _ in changes])
+        floor = self._last_change_id - CHANGE_LOG_WINDOW
+        self._seen_change_ids = {cid for cid in self._seen_change_ids if cid > floor}
+        self._seen_change_ids.update(cid for cid, _ in changes if cid > floor)
+        self.stats["incremental_refreshes"] += 1
+
+    async def refresh(self):
+        """Bring the store up to date with the database."""
+        async with self._lock:
+            today = datetime.now().date()
+            needs_rebuild = (
+                not self._assets
+                or self._as_of != today
+                or self._ruleset is not rules.risk_rules
+                or not self._tracking_available
+            )
+            if needs_rebuild:
+                await self._full_rebuild(today)
+            else:
+                await self._incremental_refresh(today)
+
+    def invalidate(self):
+        """Force a full rebuild on the next refresh."""
+        self._assets = {}
+        self._snapshot = None
+
+    async def get_snapshot(self) -> FleetSnapshot:
+        """
+        Current immutable FleetSnapshot. Unchanged fleets return the same
+        snapshot object, so its cached columns are reused across requests.
+        """
+        await self.refresh()
+        if self._snapshot is None:
+            eligible, ineligible = [], []
+            for asset_id in sorted(self._assets):
+                record = self._assets[asset_id]
+                (eligible if isinstance(record, AssetRecord) else ineligible).append(record)
+            self._snapshot = FleetSnapshot(eligible, ineligible, as_of=self._as_of)
+        return self._snapshot
+
+    async def get_eligible_trains(self) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Drop-in replacement for get_eligible_trains_aggregated.
+        Returns fresh dicts, so callers may annotate entries without touching the store.
+        """
+        snapshot = await self.get_snapshot()
+        return snapshot.to_dicts()
+
+    async def get_asset(self, asset_id: str) -> Optional[Tuple[bool, Dict]]:
+        """Current (is_eligible, data) for one asset, or None if it is not a known trainset."""
+        await self.refresh()
+        record = self._assets.get(asset_id)
+        if record is None:
+            return None
+        return isinstance(record, AssetRecord), record.to_dict()
+
+# Create a single, reusable instance
+fleet_state = FleetStateStore()
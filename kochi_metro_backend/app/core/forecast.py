@@ -0,0 +1,112 @@
+"""
+Multi-night eligibility forecasting.
+
+Certificate validity and branding campaigns are both closed date intervals, so
+"who is eligible / which campaigns are active on night D" for every D in a
+horizon is answered with one sorted sweep over interval start/end events
+instead of re-running the eligibility rules per night.
+
+Forecast assumptions: assets ineligible tonight (critical work orders or
+expired certificates) stay ineligible; eligible assets drop out the night
+after their first certificate expires.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Hashable, Iterator, List, Optional, Set, Tuple
+from app.core.dates import to_date
+from app.core.fleet_state import fleet_state
+from app.db.queries import fetch_first_certificate_expiries, fetch_campaign_windows
+
+class IntervalSweep:
+    """
+    Interval index over closed date intervals, bucketed by night offset.
+
+    Building is O(intervals + nights); sweeping yields, for each night, the keys
+    entering and leaving plus the active set, in O(nights + events) overall.
+    """
+
+    def __init__(self, origin: date, nights: int):
+        self.origin = origin
+        self.nights = nights
+        self._starts: List[List[Hashable]] = [[] for _ in range(nights)]
+        self._ends: List[List[Hashable]] = [[] for _ in range(nights)]
+
+    def add(self, key: Hashable, start: Optional[date] = None, end: Optional[date] = None):
+        """Add key active on [start, end]; None means open-ended on that side."""
+        start_offset = max(0, (start - self.origin).days) if start else 0
+        end_offset = (end - self.origin).days if end else self.nights
+        if end_offset < 0 or start_offset >= self.nights or end_offset < start_offset:
+            return
+        self._starts[start_offset].append(key)
+        if end_offset + 1 < self.nights:
+            self._ends[end_offset + 1].append(key)
+
+    def sweep(self) -> Iterator[Tuple[date, List[Hashable], List[Hashable], Set[Hashable]]]:
+        """Yield (night, entered, left, active) for each night in the horizon."""
+        active: Set[Hashable] = set()
+        for offset in range(self.nights):
+            left = self._ends[offset]
+            entered = self._starts[offset]
+            active.difference_update(left)
+            active.update(entered)
+            yield self.origin + timedelta(days=offset), entered, left, active
+
+def build_forecast(
+    eligible_assets: List[Dict],
+    ineligible_assets: List[Dict],
+    first_expiries: List[Dict],
+    campaigns: List[Dict],
+    start: date,
+    nights: int
+) -> List[Dict]:
+    """Sweep certificate and campaign intervals to produce a per-night forecast."""
+    asset_nums = {asset["asset_id"]: asset["asset_num"] for asset in eligible_assets + ineligible_assets}
+    expiry_by_asset = {row["asset_id"]: row for row in first_expiries}
+
+    eligibility = IntervalSweep(start, nights)
+    for asset in eligible_assets:
+        expiry = expiry_by_asset.get(asset["asset_id"])
+        eligibility.add(asset["asset_id"], end=to_date(expiry["expiry_date"]) if expiry else None)
+
+    branding = IntervalSweep(start, nights)
+    campaign_info = {}
+    for campaign in campaigns:
+        if campaign["asset_id"] not in asset_nums:
+            continue
+        campaign_info[campaign["campaign_id"]] = campaign
+        branding.add(campaign["campaign_id"], to_date(campaign["start_date"]), to_date(campaign["end_date"]))
+
+    forecast = []
+    for (night, _, dropped, eligible), (_, started, ended, active_campaigns) in zip(eligibility.sweep(), branding.sweep()):
+        forecast.append({
+            "date": night.isoformat(),
+            "eligible_count": len(eligible),
+            "eligible": sorted(asset_nums[asset_id] for asset_id in eligible),
+            "dropped": [
+                {
+                    "asset_num": asset_nums[asset_id],
+                    "reason": f"{expiry_by_asset[asset_id]['certificate_type']} certificate expired "
+                              f"{to_date(expiry_by_asset[asset_id]['expiry_date']).isoformat()}"
+                }
+                for asset_id in dropped
+            ],
+            "active_campaigns": len(active_campaigns),
+            "campaigns_ended": [
+                {
+                    "asset_num": asset_nums[campaign_info[campaign_id]["asset_id"]],
+                    "advertiser": campaign_info[campaign_id]["advertiser_name"] or "Unknown"
+                }
+                for campaign_id in ended
+            ]
+        })
+    return forecast
+
+async def forecast_eligibility(nights: int = 30) -> Dict:
+    """Eligible set and campaign changes for each of the next `nights` nights."""
+    start = datetime.now().date()
+    eligible_assets, ineligible_assets = await fleet_state.get_eligible_trains()
+    first_expiries = await fetch_first_certificate_expiries(start, nights)
+    campaigns = await fetch_campaign_windows(start, start + timedelta(days=nights - 1))
+    return {
+        "start_date": start.isoformat(),
+        "nights": build_forecast(eligible_assets, ineligible_assets, first_expiries, campaigns, start, nights)
+    }
@@ -0,0 +1,302 @@
+"""
+Rolling-horizon induction planning.
+
+Plans service for the next HORIZON_DAYS nights at once, so mileage balance
+and branding exposure are optimized over the whole horizon rather than one
+night at a time.
+
+Each service day a train accrues DAILY_SERVICE_KM and DAILY_SERVICE_HOURS of
+branding exposure. The value of a train's j-th service day in the horizon is
+
+    base_i                                        reliability and risk (WEIGHTS)
+  - WEIGHTS['efficiency'] * balance penalty       growth of its squared deviation
+                                                  from the fleet's target end mileage
+  + WEIGHTS['branding'] * hours covered / h       capped at its remaining deficit
+
+which falls as j grows. The trains a day can use are limited by availability
+(a certificate expiring inside the horizon ends availability after that
+date), and each day needs a fixed number of trains. Under these limits the
+feasible sets of train-days form a matroid, so:
+- a cold solve is greedy in descending marginal value, with alternating-path
+  augmentation across days (exact);
+- a warm start keeps the previous plan, shifted to the new start date and
+  trimmed to the new availability and demand. It refills missing train-days
+  greedily, then applies single exchanges until none improves. By the matroid
+  basis-exchange property the result is again optimal, and after a small
+  input change only a few exchanges are needed.
+"""
+import heapq
+import time
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence
+import numpy as np
+from app.core.dates import to_date
+from app.core.optimizer import WEIGHTS, KMRLOptimizer, objective_columns
+
+HORIZON_DAYS = 7
+DAILY_SERVICE_KM = 400.0     # Typical revenue km per trainset per service day
+DAILY_SERVICE_HOURS = 16.0   # Branding exposure per service day
+EPSILON = 1e-9
+
+class HorizonInputs(NamedTuple):
+    asset_nums: Sequence[str]
+    base: np.ndarray              # per-train daily value from reliability and risk
+    mileage: np.ndarray           # current mileage
+    branding_deficit: np.ndarray  # branding hours still owed across active campaigns
+    available: np.ndarray         # trains x days, bool
+    demand: np.ndarray            # trains needed per day
+
+def _deficit_hours(campaign) -> float:
+    """Branding hours still owed on a campaign (dict or CampaignHours entry)."""
+    if isinstance(campaign, dict):
+        return max(0, campaign["required_hours"] - campaign["achieved_hours"])
+    return max(0, campaign.required_hours - campaign.achieved_hours)
+
+def build_inputs(
+    eligible_assets: List[Dict],
+    start: date,
+    days: int,
+    demand: int,
+    first_expiries: Sequence[Dict] = ()
+) -> HorizonInputs:
+    """Horizon inputs from scored eligible assets and the first certificate expiry per asset."""
+    columns = objective_columns(eligible_assets)
+    scores = KMRLOptimizer.score_batch(columns)
+    # Efficiency and branding are re-scored per day by marginal_values, so only these carry over
+    base = WEIGHTS['reliability'] * scores['reliability'] + WEIGHTS['risk'] * scores['risk']
+
+    expiry_offset = {row["asset_id"]: (to_date(row["expiry_date"]) - start).days for row in first_expiries}
+    available = np.ones((len(eligible_assets), days), dtype=bool)
+    for i, asset in enumerate(eligible_assets):
+        offset = expiry_offset.get(asset.get("asset_id"))
+        if offset is not None:
+            # Still eligible on the expiry date itself, as in the eligibility forecast
+            available[i, max(offset + 1, 0):] = False
+
+    return HorizonInputs(
+        asset_nums=[asset["asset_num"] for asset in eligible_assets],
+        base=base,
+        mileage=columns['current_mileage'],
+        branding_deficit=np.array([
+            sum(_deficit_hours(campaign) for campaign in asset.get("branding_campaigns", ()))
+            for asset in eligible_assets
+        ], dtype=float),
+        available=available,
+        demand=np.full(days, demand, dtype=int)
+    )
+
+def marginal_values(inputs: HorizonInputs) -> np.ndarray:
+    """trains x days: value of each train's 1st, 2nd, ... service day (non-increasing)."""
+    n, days = inputs.available.shape
+    j = np.arange(1, days + 1)
+    target = (inputs.mileage.sum() + DAILY_SERVICE_KM * inputs.demand.sum()) / max(n, 1)
+    spread = max(float(inputs.mileage.std()) if n else 0.0, DAILY_SERVICE_KM)
+
+    # Squared deviation from the target end mileage, in fleet-spread units, after j days
+    deviation = (inputs.mileage[:, None] + DAILY_SERVICE_KM * j - target) / spread
+    previous = deviation - DAILY_SERVICE_KM / spread
+    delta = DAILY_SERVICE_KM / spread
+    balance = (deviation ** 2 - previous ** 2) / (2 * delta)
+
+    covered = np.clip(inputs.branding_deficit[:, None] - DAILY_SERVICE_HOURS * (j - 1), 0, DAILY_SERVICE_HOURS)
+    branding = covered / DAILY_SERVICE_HOURS
+
+    return inputs.base[:, None] - WEIGHTS['efficiency'] * balance + WEIGHTS['branding'] * branding
+
+class HorizonSolver:
+    """Train-day assignment with greedy augmentation and exchange improvement."""
+
+    def __init__(self, inputs: HorizonInputs, x: Optional[np.ndarray] = None):
+        self.inputs = inputs
+        self.values = marginal_values(inputs)
+        self.available = inputs.available
+        self.demand = inputs.demand
+        self.x = np.zeros(self.available.shape, dtype=bool) if x is None else (x & self.available)
+        self.stats = {"augmentations": 0, "exchanges": 0, "removed": 0}
+        self._trim_excess()
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self.x.sum(axis=1)
+
+    def _value_of(self, i: int, count: int) -> float:
+        """Value of train i's `count`-th service day (1-based)."""
+        return self.values[i, count - 1]
+
+    def _trim_excess(self):
+        """Drop the least valuable train-days on days over demand."""
+        for day in range(self.x.shape[1]):
+            while self.x[:, day].sum() > self.demand[day]:
+                serving = np.flatnonzero(self.x[:, day])
+                counts = self.counts
+                worst = min(serving, key=lambda i: self._value_of(i, counts[i]))
+                self.x[worst, day] = False
+                self.stats["removed"] += 1
+
+    def _augment(self, train: int) -> bool:
+        """Give `train` one more service day, shifting other trains between days if needed."""
+        x, available = self.x, self.available
+        load = x.sum(axis=0)
+        days = x.shape[1]
+        start_days = np.flatnonzero(available[train] & ~x[train])
+        # Fast path: a day the train can take directly
+        for day in start_days:
+            if load[day] < self.demand[day]:
+                x[train, day] = True
+                self.stats["augmentations"] += 1
+                return True
+
+        # Alternating BFS over days: parent[day] = (train moving into day, day it leaves or None)
+        parent = {day: (train, None) for day in start_days}
+        queue = list(start_days)
+        while queue:
+            day = queue.pop(0)
+            if load[day] < self.demand[day]:
+                while True:
+                    mover, left = parent[day]
+                    x[mover, day] = True
+                    if left is None:
+                        break
+                    x[mover, left] = False
+                    day = left
+                self.stats["augmentations"] += 1
+                return True
+            for target in range(days):
+                if target in parent:
+                    continue
+                movers = np.flatnonzero(x[:, day] & available[:, target] & ~x[:, target])
+                if len(movers):
+                    parent[target] = (movers[0], day)
+                    queue.append(target)
+        return False
+
+    def fill(self):
+        """Greedily add train-days in descending marginal value until demand is met."""
+        counts = self.counts
+        heap = [
+            (-self._value_of(i, counts[i] + 1), i)
+            for i in range(self.x.shape[0]) if counts[i] < self.available[i].sum()
+        ]
+        heapq.heapify(heap)
+        missing = int(self.demand.sum() - self.x.sum())
+        while heap and missing > 0:
+            _, i = heapq.heappop(heap)
+            if self._augment(i):
+                missing -= 1
+                count = self.x[i].sum()
+                if count < self.available[i].sum():
+                    heapq.heappush(heap, (-self._value_of(i, count + 1), i))
+
+    def improve(self):
+        """Apply improving single exchanges (one train-day out, one in) until none is left."""
+        while True:
+            counts = self.counts
+            outside = sorted(
+                (i for i in range(len(counts)) if counts[i] < self.available[i].sum()),
+                key=lambda i: -self._value_of(i, counts[i] + 1)
+            )
+            inside = sorted((j for j in range(len(counts)) if counts[j] > 0), key=lambda j: self._value_of(j, counts[j]))
+            if not self._exchange(outside, inside, counts):
+                return
+
+    def _exchange(self, outside, inside, counts) -> bool:
+        for i in outside:
+            gain = self._value_of(i, counts[i] + 1)
+            for j in inside:
+                if gain <= self._value_of(j, counts[j]) + EPSILON:
+                    break
+                if i == j:
+                    continue
+                for day in np.flatnonzero(self.x[j]):
+                    self.x[j, day] = False
+                    if self._augment(i):
+                        self.stats["exchanges"] += 1
+                        return True
+                    self.x[j, day] = True
+        return False
+
+    def objective(self) -> float:
+        counts = self.counts
+        return float(sum(self.values[i, :counts[i]].sum() for i in range(len(counts))))
+
+def solve_horizon(inputs: HorizonInputs, warm_start: Optional[np.ndarray] = None) -> HorizonSolver:
+    solver = HorizonSolver(inputs, warm_start)
+    solver.fill()
+    if warm_start is not None:
+        solver.improve()
+    return solver
+
+def plan_summary(inputs: HorizonInputs, solver: HorizonSolver, start: date) -> Dict:
+    """Per-day service lists, per-train projections and horizon statistics."""
+    x = solver.x
+    counts = solver.counts
+    projected = inputs.mileage[:, None] + DAILY_SERVICE_KM * np.cumsum(x, axis=1)
+    end = projected[:, -1] if x.shape[1] else inputs.mileage
+    return {
+        "start_date": start.isoformat(),
+        "days": [
+            {
+                "date": (start + timedelta(days=day)).isoformat(),
+                "service": [inputs.asset_nums[i] for i in np.flatnonzero(x[:, day])],
+                "shortfall": int(inputs.demand[day] - x[:, day].sum())
+            }
+            for day in range(x.shape[1])
+        ],
+        "trains": [
+            {
+                "asset_num": inputs.asset_nums[i],
+                "service_days": int(counts[i]),
+                "projected_mileage": [round(float(value), 1) for value in projected[i]],
+                "branding_hours_planned": float(min(counts[i] * DAILY_SERVICE_HOURS, inputs.branding_deficit[i])),
+                "branding_deficit_hours": float(inputs.branding_deficit[i])
+            }
+            for i in range(len(inputs.asset_nums))
+        ],
+        "summary": {
+            "objective": round(solver.objective(), 6),
+            "end_mileage_spread_km": round(float(end.max() - end.min()), 1) if len(end) else 0.0,
+            "end_mileage_std_km": round(float(end.std()), 1) if len(end) else 0.0,
+            **solver.stats
+        }
+    }
+
+class RollingHorizonPlanner:
+    """Keeps the last plan so the next request can warm-start from it."""
+
+    def __init__(self):
+        self._start: Optional[date] = None
+        self._plan: Dict[str, np.ndarray] = {}  # asset_num -> service days from _start
+
+    def warm_start_for(self, inputs: HorizonInputs, start: date) -> Optional[np.ndarray]:
+        """Previous plan shifted to `start` and aligned to the current trains, or None."""
+        if self._start is None or start < self._start:
+            return None
+        shift = (start - self._start).days
+        days = inputs.available.shape[1]
+        x = np.zeros(inputs.available.shape, dtype=bool)
+        matched = False
+        for i, asset_num in enumerate(inputs.asset_nums):
+            previous = self._plan.get(asset_num)
+            if previous is not None and shift < len(previous):
+                carried = previous[shift:shift + days]
+                x[i, :len(carried)] = carried
+                matched = True
+        return x if matched else None
+
+    def plan(self, inputs: HorizonInputs, start: date, warm_start: bool = True) -> Dict:
+        began = time.perf_counter()
+        initial = self.warm_start_for(inputs, start) if warm_start else None
+        solver = solve_horizon(inputs, initial)
+        self._start = start
+        self._plan = {asset_num: solver.x[i].copy() for i, asset_num in enumerate(inputs.asset_nums)}
+        result = plan_summary(inputs, solver, start)
+        result["summary"]["optimization_method"] = (
+            "Rolling horizon: exchange re-plan from previous plan" if initial is not None
+            else "Rolling horizon: greedy with augmenting paths"
+        )
+        result["summary"]["warm_start"] = initial is not None
+        result["summary"]["solve_time_ms"] = round((time.perf_counter() - began) * 1000, 3)
+        return result
+
+# Create a single, reusable instance
+horizon_planner = RollingHorizonPlanner()
@@ -0,0 +1,210 @@
+"""
+Exact constrained induction solver.
+
+The greedy planner takes the top `num_for_service` trains by composite score.
+This module selects the service set that maximizes the same composite score
+subject to operational constraints, as a 0/1 integer program solved with
+SciPy's milp (HiGHS branch-and-bound):
+
+    maximize    sum(composite_i * x_i)
+    subject to  sum(x_i) = num_for_service
+                standby trains stabled at depot d <= depot_capacity(d)
+                in-service trains carrying advertiser a >= min_trains_per_advertiser
+                in-service trains over the mileage threshold <= max_high_mileage
+
+If the greedy top-N already satisfies every constraint it is optimal and no
+solve is needed. If the time budget expires, the best incumbent is used; with
+no incumbent (or an infeasible model) the greedy answer is returned, and the
+report carries the optimality gap against the relaxation bound together with
+the constraints the greedy answer violates. The relaxation only gets what is
+left of the budget, so a request overruns it by at most MIN_RELAXATION_TIME_S.
+"""
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+from app.core.rules import KMRLRules
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_BUDGET_S = 2.0
+MIN_RELAXATION_TIME_S = 0.05  # Floor for the LP relaxation bound while some budget is left
+
+class InductionConstraints(NamedTuple):
+    # Stabling location -> (depot id, standby capacity); see depot_capacities()
+    depot_capacity: Dict[str, Tuple[str, int]] = {}
+    min_trains_per_advertiser: int = 0
+    high_mileage_threshold: float = KMRLRules.MAX_MILEAGE_WITHOUT_MAINT
+    max_high_mileage: Optional[int] = None
+    time_budget_s: float = DEFAULT_TIME_BUDGET_S
+
+def depot_capacities(locations: List[Dict]) -> Dict[str, Tuple[str, int]]:
+    """
+    Map every location to the nearest enclosing location that has a
+    depot_capacity (itself or an ancestor via parent_location), so trains
+    stabled on a depot's sub-tracks count against that depot.
+    """
+    by_id = {location["location_id"]: location for location in locations}
+    mapping = {}
+    for location_id in by_id:
+        current, seen = by_id.get(location_id), set()
+        while current is not None and current["location_id"] not in seen:
+            seen.add(current["location_id"])
+            if current.get("depot_capacity") is not None:
+                mapping[location_id] = (current["location_id"], int(current["depot_capacity"]))
+                break
+            current = by_id.get(current.get("parent_location"))
+    return mapping
+
+def _advertisers(asset: Dict) -> set:
+    """Advertisers with an active campaign on the asset (dict or CampaignHours entries)."""
+    return {
+        campaign["advertiser"] if isinstance(campaign, dict) else campaign.advertiser
+        for campaign in asset.get("branding_campaigns", ())
+    }
+
+class _Model:
+    """Constraint rows over the eligible assets, with a human-readable name per row."""
+
+    def __init__(self, assets: Sequence[Dict], num_for_service: int, constraints: InductionConstraints):
+        n = len(assets)
+        rows, lower, upper, self.names = [], [], [], []
+
+        def add(name, members, lo, hi):
+            row = np.zeros(n)
+            row[members] = 1.0
+            rows.append(row)
+            lower.append(lo)
+            upper.append(hi)
+            self.names.append(name)
+
+        add("service count", np.arange(n), num_for_service, num_for_service)
+
+        depots: Dict[str, List[int]] = {}
+        capacity: Dict[str, int] = {}
+        for i, asset in enumerate(assets):
+            depot = constraints.depot_capacity.get(asset.get("location"))
+            if depot:
+                depots.setdefault(depot[0], []).append(i)
+                capacity[depot[0]] = depot[1]
+        for depot_id, members in sorted(depots.items()):
+            # Trains not sent into service stay stabled at the depot overnight
+            if len(members) > capacity[depot_id]:
+                add(f"depot {depot_id} capacity {capacity[depot_id]}", members,
+                    len(members) - capacity[depot_id], np.inf)
+
+        if constraints.min_trains_per_advertiser > 0:
+            carriers: Dict[str, List[int]] = {}
+            for i, asset in enumerate(assets):
+                for advertiser in _advertisers(asset):
+                    carriers.setdefault(advertiser, []).append(i)
+            for advertiser, members in sorted(carriers.items()):
+                # Cannot demand more exposure than there are branded trains
+                required = min(constraints.min_trains_per_advertiser, len(members))
+                add(f"advertiser {advertiser} exposure {required}", members, required, np.inf)
+
+        if constraints.max_high_mileage is not None:
+            members = [
+                i for i, asset in enumerate(assets)
+                if asset.get("current_mileage", 0) > constraints.high_mileage_threshold
+            ]
+            if len(members) > constraints.max_high_mileage:
+                add(f"high mileage cap {constraints.max_high_mileage}", members, -np.inf,
+                    constraints.max_high_mileage)
+
+        self.matrix = np.array(rows)
+        self.lower = np.array(lower, dtype=float)
+        self.upper = np.array(upper, dtype=float)
+
+    def violations(self, x: np.ndarray) -> List[str]:
+        activity = self.matrix @ x
+        return [
+            name for name, value, lo, hi in zip(self.names, activity, self.lower, self.upper)
+            if value < lo - 1e-9 or value > hi + 1e-9
+        ]
+
+    def solve(self, objective: np.ndarray, time_limit: float, relax: bool = False):
+        n = len(objective)
+        return milp(
+            -objective,
+            constraints=LinearConstraint(self.matrix, self.lower, self.upper),
+            integrality=np.zeros(n) if relax else np.ones(n),
+            bounds=Bounds(0, 1),
+            options={"time_limit": max(time_limit, 1e-3), "mip_rel_gap": 0}
+        )
+
+def _gap(objective: float, bound: Optional[float]) -> Optional[float]:
+    """
+    Relative gap (bound - objective) / |bound|. Negative for a greedy fallback
+    that scores above the constrained bound by breaking constraints.
+    """
+    if bound is None or not np.isfinite(bound):
+        return None
+    return round((bound - objective) / max(abs(bound), 1e-9), 6)
+
+def solve_induction(
+    assets: Sequence[Dict],
+    composite: np.ndarray,
+    num_for_service: int,
+    constraints: InductionConstraints
+) -> Tuple[np.ndarray, Dict]:
+    """
+    Select the service set. `assets` and `composite` must be in greedy
+    (descending composite) order. Returns (boolean service mask, solver report).
+    """
+    start = time.perf_counter()
+    n = len(assets)
+    num_for_service = min(num_for_service, n)
+    model = _Model(assets, num_for_service, constraints)
+
+    greedy = np.zeros(n)
+    greedy[:num_for_service] = 1.0
+    greedy_objective = float(composite @ greedy)
+    greedy_violations = model.violations(greedy)
+
+    report = {
+        "solver": "milp",
+        "constraints": model.names,
+        "time_budget_s": constraints.time_budget_s,
+        "greedy_objective": round(greedy_objective, 6),
+    }
+
+    def finish(x, status, objective, bound, violations):
+        report.update({
+            "status": status,
+            "objective": round(objective, 6),
+            "upper_bound": None if bound is None else round(bound, 6),
+            "optimality_gap": _gap(objective, bound),
+            "constraint_violations": violations,
+            "solve_time_ms": round((time.perf_counter() - start) * 1000, 3),
+        })
+        return x > 0.5, report
+
+    # The greedy top-N is the unconstrained optimum, so if it is feasible it is optimal
+    if not greedy_violations:
+        return finish(greedy, "optimal", greedy_objective, greedy_objective, [])
+
+    result = model.solve(composite, constraints.time_budget_s)
+    bound = getattr(result, "mip_dual_bound", None)
+    bound = -bound if bound is not None and np.isfinite(bound) else None
+
+    if result.x is not None and result.status in (0, 1):
+        x = np.round(result.x)
+        status = "optimal" if result.status == 0 else "time_limit"
+        objective = float(composite @ x)
+        return finish(x, status, objective, objective if result.status == 0 else bound, [])
+
+    if result.status == 2:
+        logger.warning("Induction constraints are infeasible; falling back to greedy selection")
+        return finish(greedy, "infeasible_greedy_fallback", greedy_objective, None, greedy_violations)
+
+    # Budget expired without an incumbent: bound the gap with the LP relaxation,
+    # within what is left of the budget (no bound when nothing is left)
+    logger.warning(f"Induction solver stopped without a solution ({result.message}); falling back to greedy selection")
+    remaining = constraints.time_budget_s - (time.perf_counter() - start)
+    if bound is None and remaining > 0:
+        relaxation = model.solve(composite, max(remaining, MIN_RELAXATION_TIME_S), relax=True)
+        if relaxation.status == 0:
+            bound = -relaxation.fun
+    return finish(greedy, "time_limit_greedy_fallback", greedy_objective, bound, greedy_violations)
@@ -1,7 +1,12 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 import logging
+from app.core.induction_solver import InductionConstraints, solve_induction
+from app.core.explanations import (
+    BRANDING_TEXT, ExplanationBuilder, branding_level, efficiency_factors, efficiency_text,
+    reliability_level, render_reasons
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,11 +21,41 @@ WEIGHTS = {
     "efficiency": 0.20     # Operational: Mileage balance + shunting cost
 }
 
+# Objective columns, in score-matrix order
+OBJECTIVES = tuple(WEIGHTS)
+
+# Every asset field read by get_optimized_schedule and the KMRLOptimizer scores
+SCORING_FIELDS = (
+    'asset_num', 'asset_id', 'current_mileage', 'days_since_maint', 'warnings', 'open_work_orders',
+    'shunting_cost', 'branding_urgency_score', 'branding_hours_deficit', 'branding_sla_risk',
+    'combined_risk_score', 'risk_category', 'risk_explanation', 'location', 'branding_campaigns'
+)
+
+def scoring_view(asset: Dict) -> Dict:
+    """Slim copy of an asset holding only the fields the optimizer reads."""
+    return {field: asset[field] for field in SCORING_FIELDS if field in asset}
+
 class KMRLOptimizer:
     """
     Enhanced optimizer implementing KMRL's multi-objective decision framework.
     Addresses: service readiness, reliability, cost optimization, and branding exposure.
+
+    score_batch computes every objective for the whole fleet as NumPy columns;
+    the per-asset methods remain for single-asset callers and share the same
+    formulas and explanation text.
     """
+
+    @staticmethod
+    def reliability_reason(reliability_score: float) -> str:
+        return reliability_level(reliability_score)[1]
+
+    @staticmethod
+    def efficiency_reason(mileage_balance_score: float, shunting_efficiency: float) -> str:
+        return efficiency_text(efficiency_factors(mileage_balance_score, shunting_efficiency))
+
+    @staticmethod
+    def branding_reason(asset: Dict) -> str:
+        return BRANDING_TEXT[branding_level(asset)].format(hours_deficit=asset.get('branding_hours_deficit', 0))
     
     @staticmethod
     def calculate_reliability_score(asset: Dict) -> Tuple[float, str]:
@@ -47,18 +82,7 @@ class KMRLOptimizer:
         penalty += open_wos * 0.15
         
         reliability_score = max(0, base_reliability - penalty)
-        
-        # Generate explanation
-        if reliability_score > 0.8:
-            explanation = "Excellent operational condition"
-        elif reliability_score > 0.6:
-            explanation = "Good condition with minor considerations"
-        elif reliability_score > 0.4:
-            explanation = "Acceptable with some maintenance needs"
-        else:
-            explanation = "Requires attention before service"
-            
-        return reliability_score, explanation
+        return reliability_score, KMRLOptimizer.reliability_reason(reliability_score)
     
     @staticmethod
     def calculate_efficiency_score(asset: Dict, fleet_stats: Dict) -> Tuple[float, str]:
@@ -80,64 +104,122 @@ class KMRLOptimizer:
         
         # Combine with weights
         efficiency_score = (mileage_balance_score * 0.7) + (shunting_efficiency * 0.3)
-        
-        # Generate explanation
-        explanations = []
-        if mileage_balance_score > 0.7:
-            explanations.append("lower mileage helps fleet balancing")
-        if shunting_efficiency > 0.7:
-            explanations.append("minimal shunting required")
-        
-        explanation = "; ".join(explanations) if explanations else "standard efficiency"
-        
-        return efficiency_score, explanation
+        return efficiency_score, KMRLOptimizer.efficiency_reason(mileage_balance_score, shunting_efficiency)
     
     @staticmethod
     def calculate_branding_priority(asset: Dict) -> Tuple[float, str]:
         """
         Calculate branding priority based on SLA requirements and risk of penalties.
         """
-        urgency_score = asset.get('branding_urgency_score', 0.0)
-        hours_deficit = asset.get('branding_hours_deficit', 0)
-        sla_risk = asset.get('branding_sla_risk', 'None')
-        
         # Convert to priority score
-        branding_score = urgency_score
-        
-        # Generate explanation
-        if sla_risk == 'High':
-            explanation = f"Critical: {hours_deficit}h needed to avoid SLA breach"
-        elif sla_risk == 'Medium':
-            explanation = f"Important: {hours_deficit}h deficit approaching SLA limit"
-        elif sla_risk == 'Low':
-            explanation = "On track with branding requirements"
+        branding_score = asset.get('branding_urgency_score', 0.0)
+        return branding_score, KMRLOptimizer.branding_reason(asset)
+
+    @staticmethod
+    def score_batch(columns: Dict[str, np.ndarray], max_mileage=None) -> Dict[str, np.ndarray]:
+        """
+        Score the whole fleet at once from objective_columns() inputs.
+        Returns one array per objective plus 'composite' and the two
+        efficiency components used by efficiency_reason.
+        Element-for-element identical to the per-asset methods.
+        `max_mileage` fixes the fleet maximum for mileage balancing instead
+        of taking it from the columns (for rows that are not the whole fleet);
+        it may be a scalar or one value per row.
+        """
+        mileage = columns['current_mileage']
+        if max_mileage is None:
+            max_mileage = mileage.max() if len(mileage) else 0
+
+        time_factor = np.maximum(0, 1 - columns['days_since_maint'] / 365)
+        mileage_factor = np.maximum(0, 1 - mileage / 200000)
+        base_reliability = time_factor * 0.6 + mileage_factor * 0.4
+        penalty = columns['warnings'] * 0.1 + columns['open_work_orders'] * 0.15
+        reliability = np.maximum(0, base_reliability - penalty)
+
+        risk = 1 - columns['combined_risk_score']  # Invert risk (lower risk = higher score)
+        branding = columns['branding_urgency_score']
+
+        if np.ndim(max_mileage) == 0:
+            if max_mileage > 0:
+                mileage_balance = 1 - mileage / max_mileage
+            else:
+                mileage_balance = np.full(len(mileage), 0.5)
         else:
-            explanation = "No active branding requirements"
-            
-        return branding_score, explanation
-
-def calculate_shunting_cost(location: str) -> int:
-    """Enhanced shunting cost calculation."""
-    if not location: 
-        return 5  # Default high cost if no location
-    
-    location_upper = location.upper()
-    
-    if 'STAB-A' in location_upper: 
-        return 1
-    elif 'STAB-B' in location_upper: 
-        return 2
-    elif 'STAB-C' in location_upper: 
-        return 3
-    elif 'DEPOT' in location_upper:
-        return 4
-    else:
-        return 5  # Farthest/unknown locations
+            positive = max_mileage > 0
+            mileage_balance = np.where(positive, 1 - mileage / np.where(positive, max_mileage, 1.0), 0.5)
+        shunting_efficiency = 1 - columns['shunting_cost'] / 5
+        efficiency = mileage_balance * 0.7 + shunting_efficiency * 0.3
+
+        composite = (
+            WEIGHTS['reliability'] * reliability +
+            WEIGHTS['risk'] * risk +
+            WEIGHTS['branding'] * branding +
+            WEIGHTS['efficiency'] * efficiency
+        )
+        return {
+            'reliability': reliability,
+            'risk': risk,
+            'branding': branding,
+            'efficiency': efficiency,
+            'composite': composite,
+            'mileage_balance': mileage_balance,
+            'shunting_efficiency': shunting_efficiency
+        }
+
+    @staticmethod
+    def explain(asset: Dict, scores: Dict[str, Sequence[float]], index: int) -> str:
+        """Decision explanation text for one row of score_batch output (arrays or lists)."""
+        row = ExplanationBuilder({name: [scores[name][index]] for name in scores})
+        return render_reasons(row.reasons(asset, 0))
+
+def maintenance_items(ineligible_assets: List[Dict]) -> List[Dict]:
+    """Maintenance list entries for ineligible assets."""
+    maintenance_list = []
+    for asset in ineligible_assets:
+        maintenance_item = {
+            "asset_num": asset.get('asset_num'),
+            "reason": asset.get('reason', 'Ineligible'),
+            "risk_score": asset.get('risk_score', 1.0),
+            "category": asset.get('category', 'Maintenance Required'),
+            "priority": "High" if asset.get('risk_score', 0) > 0.8 else "Medium"
+        }
+        maintenance_list.append(maintenance_item)
+    return maintenance_list
+
+def objective_columns(eligible_assets: List[Dict]) -> Dict[str, np.ndarray]:
+    """Gather the scoring inputs of every asset into NumPy columns in one pass."""
+    defaults = (
+        ('days_since_maint', 0), ('current_mileage', 0), ('open_work_orders', 0),
+        ('shunting_cost', 5), ('branding_urgency_score', 0.0), ('combined_risk_score', 0.5)
+    )
+    columns = {
+        field: np.fromiter((asset.get(field, default) for asset in eligible_assets), float, len(eligible_assets))
+        for field, default in defaults
+    }
+    columns['warnings'] = np.fromiter(
+        (len(asset.get('warnings', [])) for asset in eligible_assets), float, len(eligible_assets)
+    )
+    return columns
+
+def fleet_statistics(mileage: np.ndarray) -> Dict:
+    """Fleet statistics the relative (efficiency) scores are computed against."""
+    return {
+        'max_mileage': float(mileage.max()),
+        'avg_mileage': float(mileage.mean()),
+        'total_assets': len(mileage)
+    }
+
+def objective_matrix(eligible_assets: List[Dict]) -> np.ndarray:
+    """Unweighted objective scores, one row per asset and one column per OBJECTIVES entry."""
+    scores = KMRLOptimizer.score_batch(objective_columns(eligible_assets))
+    return np.column_stack([scores[name] for name in OBJECTIVES])
 
 def get_optimized_schedule(
     eligible_assets: List[Dict],
     ineligible_assets: List[Dict],
-    num_for_service: int
+    num_for_service: int,
+    constraints: Optional[InductionConstraints] = None,
+    explain: str = "full"
 ) -> Dict:
     """
     Enhanced KMRL multi-objective optimization for train induction planning.
@@ -148,19 +230,18 @@ def get_optimized_schedule(
     - Branding SLA compliance
     - Operational efficiency (mileage balancing + shunting costs)
     - Explainable decision reasoning
+
+    With `constraints`, the service set is chosen by the exact constrained
+    solver (see induction_solver) instead of taking the top N.
+
+    `explain` controls the per-train explanations (see explanations):
+    "full" renders the reason text and includes the structured codes,
+    "summary" gives the codes and a one-phrase reason, and "none" skips
+    explanations altogether.
     """
     
     # 1. Handle ineligible assets with enhanced categorization
-    maintenance_list = []
-    for asset in ineligible_assets:
-        maintenance_item = {
-            "asset_num": asset.get('asset_num'),
-            "reason": asset.get('reason', 'Ineligible'),
-            "risk_score": asset.get('risk_score', 1.0),
-            "category": asset.get('category', 'Maintenance Required'),
-            "priority": "High" if asset.get('risk_score', 0) > 0.8 else "Medium"
-        }
-        maintenance_list.append(maintenance_item)
+    maintenance_list = maintenance_items(ineligible_assets)
 
     if not eligible_assets:
         logger.warning("No eligible assets available for optimization")
@@ -175,81 +256,72 @@ def get_optimized_schedule(
             }
         }
 
-    # 2. Calculate fleet statistics for relative scoring
-    fleet_stats = {
-        'max_mileage': max(asset.get('current_mileage', 0) for asset in eligible_assets),
-        'avg_mileage': np.mean([asset.get('current_mileage', 0) for asset in eligible_assets]),
-        'total_assets': len(eligible_assets)
-    }
+    # 2. Gather scoring inputs and fleet statistics for relative scoring
+    columns = objective_columns(eligible_assets)
+    fleet_stats = fleet_statistics(columns['current_mileage'])
     
     logger.info(f"Optimizing {fleet_stats['total_assets']} eligible assets")
 
-    # 3. Multi-objective scoring for each asset
-    optimizer = KMRLOptimizer()
-    
-    for asset in eligible_assets:
-        # Calculate individual objective scores
-        reliability_score, reliability_reason = optimizer.calculate_reliability_score(asset)
-        risk_score = 1 - asset.get('combined_risk_score', 0.5)  # Invert risk (lower risk = higher score)
-        branding_score, branding_reason = optimizer.calculate_branding_priority(asset)
-        efficiency_score, efficiency_reason = optimizer.calculate_efficiency_score(asset, fleet_stats)
-        
-        # Calculate weighted composite score
-        composite_score = (
-            WEIGHTS['reliability'] * reliability_score +
-            WEIGHTS['risk'] * risk_score +
-            WEIGHTS['branding'] * branding_score +
-            WEIGHTS['efficiency'] * efficiency_score
-        )
-        
-        # Store scores and explanations
-        asset['scores'] = {
-            'reliability': round(reliability_score, 3),
-            'risk': round(risk_score, 3),
-            'branding': round(branding_score, 3),
-            'efficiency': round(efficiency_score, 3),
-            'composite': round(composite_score, 3)
-        }
-        
-        # Generate comprehensive decision explanation
-        explanations = []
-        explanations.append(f"Reliability: {reliability_reason}")
-        explanations.append(f"Risk: {asset.get('risk_explanation', 'Standard assessment')}")
-        if branding_score > 0.1:
-            explanations.append(f"Branding: {branding_reason}")
-        explanations.append(f"Efficiency: {efficiency_reason}")
-        
-        asset['decision_explanation'] = " | ".join(explanations)
-        asset['composite_score'] = composite_score
+    # 3. Multi-objective scoring for the whole fleet (input assets are not modified)
+    scores = KMRLOptimizer.score_batch(columns)
+
+    # 4. Sort by composite score (stable, highest first); structured explanations
+    #    are built only when requested, and rendered to text only for "full"
+    order = np.argsort(-scores['composite'], kind='stable').tolist()
+    values = {name: column.tolist() for name, column in scores.items()}
+    explanations = ExplanationBuilder(scores) if explain != "none" else None
+
+    def scored(index):
+        asset = eligible_assets[index]
+        reasons = explanations.reasons(asset, index) if explanations else None
+        return asset, index, reasons, values['composite'][index]
 
-    # 4. Sort by composite score and select trains
-    sorted_assets = sorted(eligible_assets, key=lambda x: x['composite_score'], reverse=True)
+    def breakdown(index):
+        return {name: round(values[name][index], 3) for name in OBJECTIVES + ('composite',)}
+
+    sorted_assets = [scored(index) for index in order]
     
     # 5. Generate final recommendations
-    service_trains = sorted_assets[:num_for_service]
-    standby_trains = sorted_assets[num_for_service:]
+    solver_report = None
+    if constraints is None:
+        service_trains = sorted_assets[:num_for_service]
+        standby_trains = sorted_assets[num_for_service:]
+    else:
+        in_service, solver_report = solve_induction(
+            [entry[0] for entry in sorted_assets],
+            np.array([entry[3] for entry in sorted_assets]),
+            num_for_service,
+            constraints
+        )
+        service_trains = [entry for entry, selected in zip(sorted_assets, in_service) if selected]
+        standby_trains = [entry for entry, selected in zip(sorted_assets, in_service) if not selected]
     
     # 6. Format output with enhanced information
-    service_list = []
-    for asset in service_trains:
-        service_list.append({
+    def entry(asset, reasons, composite_score, decision):
+        item = {
             "asset_num": asset['asset_num'],
-            "reason": f"Selected for service - {asset['decision_explanation']}",
             "risk_score": asset.get('combined_risk_score', 0.0),
             "risk_category": asset.get('risk_category', 'Unknown'),
-            "composite_score": asset['composite_score'],
-            "scores_breakdown": asset['scores']
-        })
+            "composite_score": composite_score
+        }
+        if explain == "full":
+            item["reason"] = f"{decision} - {render_reasons(reasons)}"
+        elif explain == "summary":
+            item["reason"] = decision
+        if reasons is not None:
+            item["explanation"] = reasons
+        return item
+
+    service_list = []
+    for asset, index, reasons, composite_score in service_trains:
+        item = entry(asset, reasons, composite_score, "Selected for service")
+        item["scores_breakdown"] = breakdown(index)
+        service_list.append(item)
     
-    standby_list = []
-    for asset in standby_trains:
-        standby_list.append({
-            "asset_num": asset['asset_num'],
-            "reason": f"Standby - {asset['decision_explanation']}",
-            "risk_score": asset.get('combined_risk_score', 0.0),
-            "risk_category": asset.get('risk_category', 'Unknown'),
-            "composite_score": asset['composite_score']
-        })
+    standby_list = [
+        entry(asset, reasons, composite_score, "Standby")
+        for asset, _, reasons, composite_score in standby_trains
+    ]
     
     # 7. Generate optimization summary
     optimization_summary = {
@@ -257,8 +329,12 @@ def get_optimized_schedule(
         "selected_for_service": len(service_list),
         "standby_count": len(standby_list),
         "maintenance_required": len(maintenance_list),
-        "optimization_method": "KMRL Multi-Objective Weighted Scoring",
+        "optimization_method": (
+            "KMRL Multi-Objective Weighted Scoring" if solver_report is None
+            else "KMRL Multi-Objective Weighted Scoring with Constrained ILP Selection"
+        ),
         "weights_used": WEIGHTS,
+        "explain": explain,
         "fleet_statistics": fleet_stats,
         "decision_criteria": [
             "Service readiness and reliability",
@@ -267,6 +343,8 @@ def get_optimized_schedule(
             "Operational efficiency and cost"
         ]
     }
+    if solver_report is not None:
+        optimization_summary["solver"] = solver_report
 
     return {
         "service": service_list,
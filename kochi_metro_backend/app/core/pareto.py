@@ -0,0 +1,163 @@
+"""
+Pareto-front induction planning with NSGA-II (pymoo).
+
+Instead of collapsing reliability, risk, branding and efficiency into one
+scalar with WEIGHTS, this searches for service sets that are non-dominated on
+all four objectives, so planners can choose a trade-off without re-running a
+request for every weight combination.
+
+A candidate plan is a boolean row over the eligible fleet with exactly
+`num_for_service` trains selected. A whole population is evaluated at once as
+one product with the fleet's objective score matrix (population x assets @
+assets x objectives). The cardinality is restored after crossover and mutation
+by a vectorized repair, and the search stops when the wall-clock budget runs out.
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from pymoo.algorithms.moo.nsga2 import NSGA2
+from pymoo.core.problem import Problem
+from pymoo.core.repair import Repair
+from pymoo.operators.crossover.pntx import TwoPointCrossover
+from pymoo.operators.mutation.bitflip import BitflipMutation
+from pymoo.optimize import minimize
+from pymoo.termination import get_termination
+from pymoo.util.nds.non_dominated_sorting import NonDominatedSorting
+from app.core.optimizer import OBJECTIVES, WEIGHTS, objective_matrix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_BUDGET_S = 2.0
+DEFAULT_POPULATION_SIZE = 60
+DEFAULT_MAX_PLANS = 20
+
+class InductionProblem(Problem):
+    """Maximize every objective total of the selected trains (pymoo minimizes, so F is negated)."""
+
+    def __init__(self, scores: np.ndarray):
+        super().__init__(n_var=scores.shape[0], n_obj=scores.shape[1], xl=0, xu=1, vtype=bool)
+        self.scores = scores
+
+    def _evaluate(self, X, out, *args, **kwargs):
+        out["F"] = -(X.astype(float) @ self.scores)
+
+class CardinalityRepair(Repair):
+    """
+    Force exactly k trains per plan: keep selected trains first, breaking
+    ties at random, so over-full plans drop a random subset and under-full
+    plans gain a random subset.
+    """
+
+    def __init__(self, k: int, seed: Optional[int] = None):
+        super().__init__()
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+
+    def _do(self, problem, X, **kwargs):
+        priority = X.astype(float) * 2.0 + self.rng.random(X.shape)
+        keep = np.argpartition(-priority, self.k - 1, axis=1)[:, :self.k]
+        repaired = np.zeros(X.shape, dtype=bool)
+        np.put_along_axis(repaired, keep, True, axis=1)
+        return repaired
+
+def _top_k(values: np.ndarray, k: int) -> np.ndarray:
+    plan = np.zeros(len(values), dtype=bool)
+    plan[np.argsort(-values, kind="stable")[:k]] = True
+    return plan
+
+def seed_plans(scores: np.ndarray, k: int) -> np.ndarray:
+    """The weighted-composite plan and each single-objective extreme; all are Pareto-optimal."""
+    weights = np.array([WEIGHTS[name] for name in OBJECTIVES])
+    return np.array([_top_k(scores @ weights, k)] + [_top_k(scores[:, j], k) for j in range(scores.shape[1])])
+
+def initial_population(scores: np.ndarray, k: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Seed plans, filled up with random k-subsets."""
+    seeds = seed_plans(scores, k)
+    population = np.zeros((max(size, len(seeds)), scores.shape[0]), dtype=bool)
+    population[:len(seeds)] = seeds
+    for row in population[len(seeds):]:
+        row[rng.choice(scores.shape[0], k, replace=False)] = True
+    return population
+
+def _spread(order: np.ndarray, max_plans: int) -> np.ndarray:
+    """Evenly spaced picks along `order`, always including both ends."""
+    if len(order) <= max_plans:
+        return order
+    return order[np.unique(np.linspace(0, len(order) - 1, max_plans).round().astype(int))]
+
+def pareto_front(
+    eligible_assets: List[Dict],
+    num_for_service: int,
+    time_budget_s: float = DEFAULT_TIME_BUDGET_S,
+    population_size: int = DEFAULT_POPULATION_SIZE,
+    max_plans: int = DEFAULT_MAX_PLANS,
+    seed: Optional[int] = None
+) -> Dict:
+    """
+    Non-dominated induction plans. Objectives are reported as the mean
+    per-train score of the selected trains; plans are ordered by their
+    composite score under the default WEIGHTS.
+    """
+    start = time.perf_counter()
+    scores = objective_matrix(eligible_assets)
+    n = len(eligible_assets)
+    k = min(num_for_service, n)
+    weights = np.array([WEIGHTS[name] for name in OBJECTIVES])
+    summary = {
+        "total_evaluated": n,
+        "optimization_method": "NSGA-II Pareto Front",
+        "objectives": list(OBJECTIVES),
+        "time_budget_s": time_budget_s,
+    }
+
+    if k == 0 or k == n:
+        # Only one possible service set
+        plans = np.ones((1, n), dtype=bool) if k else np.zeros((1, n), dtype=bool)
+        summary.update({"generations": 0, "evaluations": 0})
+    else:
+        rng = np.random.default_rng(seed)
+        algorithm = NSGA2(
+            pop_size=population_size,
+            sampling=initial_population(scores, k, population_size, rng),
+            crossover=TwoPointCrossover(),
+            mutation=BitflipMutation(prob=1.0, prob_var=min(0.5, 2.0 / n)),
+            repair=CardinalityRepair(k, seed),
+            eliminate_duplicates=True
+        )
+        result = minimize(
+            InductionProblem(scores),
+            algorithm,
+            get_termination("time", time_budget_s),
+            seed=seed,
+            verbose=False
+        )
+        # Crowding truncation can drop seed plans from the final population;
+        # re-sort them together with it so they are never lost
+        candidates = np.unique(np.vstack([result.pop.get("X").astype(bool), seed_plans(scores, k)]), axis=0)
+        non_dominated = NonDominatedSorting().do(-(candidates.astype(float) @ scores), only_non_dominated_front=True)
+        plans = candidates[non_dominated]
+        summary.update({"generations": result.algorithm.n_gen, "evaluations": result.algorithm.evaluator.n_eval})
+        logger.info(f"NSGA-II: {len(plans)} non-dominated plans after {result.algorithm.n_gen} generations")
+
+    totals = plans.astype(float) @ scores / max(k, 1)
+    composite = totals @ weights
+    order = _spread(np.argsort(-composite, kind="stable"), max_plans)
+
+    front = []
+    for index in order:
+        selected = np.flatnonzero(plans[index])
+        # Within a plan, list trains by their weighted score
+        selected = selected[np.argsort(-(scores[selected] @ weights), kind="stable")]
+        front.append({
+            "service": [eligible_assets[i]["asset_num"] for i in selected],
+            "objectives": {name: round(float(value), 4) for name, value in zip(OBJECTIVES, totals[index])},
+            "composite_score": round(float(composite[index]), 4)
+        })
+
+    summary.update({
+        "front_size": len(plans),
+        "plans_returned": len(front),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+    })
+    return {"plans": front, "optimization_summary": summary}
@@ -0,0 +1,214 @@
+"""
+Declarative rule engine.
+
+Rules are defined as data (see kmrl_rules.json) and compiled once into a
+RuleSet. Each rule has AND-ed conditions, a score contribution and an
+explanation. Rules that share a "group" form an if/elif chain: only the first
+matching rule in a group fires. Condition values are numbers or the name of a
+parameter (optionally multiplied by "scale"), so thresholds can be tuned in
+the definition file without touching code.
+
+Every compiled rule keeps hit counts and cumulative evaluation time.
+"""
+import json
+import operator
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Bits 0..60 of the int64 fired-rule mask; higher bits are left for callers' own flags
+MAX_RULES = 61
+
+class CompiledRule:
+    """A single rule with its conditions resolved to (field, operator function, threshold) tuples."""
+    __slots__ = ("rule_id", "group", "score", "explanation", "conditions",
+                 "hits", "evaluations", "total_ns")
+
+    def __init__(self, rule_id: str, group: Optional[str], score: float, explanation: str,
+                 conditions: List[Tuple[str, Callable, float]]):
+        self.rule_id = rule_id
+        self.group = group
+        self.score = score
+        self.explanation = explanation
+        self.conditions = conditions
+        self.hits = 0
+        self.evaluations = 0
+        self.total_ns = 0
+
+    def matches(self, facts: Dict[str, float]) -> bool:
+        for field, op, threshold in self.conditions:
+            if not op(facts[field], threshold):
+                return False
+        return True
+
+    def mask(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        result = None
+        for field, op, threshold in self.conditions:
+            condition = op(columns[field], threshold)
+            result = condition if result is None else result & condition
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "id": self.rule_id,
+            "group": self.group,
+            "score": self.score,
+            "explanation": self.explanation,
+            "hits": self.hits,
+            "evaluations": self.evaluations,
+            "total_time_ms": round(self.total_ns / 1e6, 3),
+            "avg_time_us": round(self.total_ns / self.evaluations / 1e3, 3) if self.evaluations else 0.0
+        }
+
+class RuleSet:
+    """Compiled, ordered collection of rules with scalar and batch evaluators."""
+
+    def __init__(self, rules: List[CompiledRule], source: str = "<memory>"):
+        self.rules = rules
+        self.source = source
+        self.loaded_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def evaluate(self, facts: Dict[str, float]) -> Tuple[float, List[str], int]:
+        """
+        Evaluate all rules for one asset.
+        Returns (summed score, fired explanations, fired-rule bitmask).
+        """
+        score = 0.0
+        explanations = []
+        flags = 0
+        fired_groups = set()
+        for bit, rule in enumerate(self.rules):
+            if rule.group is not None and rule.group in fired_groups:
+                continue
+            start = time.perf_counter_ns()
+            matched = rule.matches(facts)
+            rule.total_ns += time.perf_counter_ns() - start
+            rule.evaluations += 1
+            if matched:
+                rule.hits += 1
+                score += rule.score
+                explanations.append(rule.explanation)
+                flags |= 1 << bit
+                if rule.group is not None:
+                    fired_groups.add(rule.group)
+        return score, explanations, flags
+
+    def evaluate_batch(self, columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate all rules over columnar inputs.
+        Scores, hit counts and evaluation counts match evaluate() exactly.
+        Returns (score array, fired-rule bitmask array).
+        """
+        size = len(next(iter(columns.values())))
+        score = np.zeros(size, dtype=np.float64)
+        flags = np.zeros(size, dtype=np.int64)
+        fired_groups: Dict[str, np.ndarray] = {}
+        for bit, rule in enumerate(self.rules):
+            start = time.perf_counter_ns()
+            fired = rule.mask(columns)
+            # Like evaluate(), assets whose group already fired do not count as evaluated
+            evaluated = size
+            if rule.group is not None:
+                taken = fired_groups.get(rule.group)
+                if taken is not None:
+                    fired = fired & ~taken
+                    evaluated -= int(np.count_nonzero(taken))
+                fired_groups[rule.group] = fired if taken is None else taken | fired
+            score += np.where(fired, rule.score, 0.0)
+            flags |= fired.astype(np.int64) << bit
+            rule.total_ns += time.perf_counter_ns() - start
+            rule.evaluations += evaluated
+            rule.hits += int(np.count_nonzero(fired))
+        return score, flags
+
+    def bit(self, rule_id: str) -> int:
+        """Bitmask value for a rule id."""
+        for index, rule in enumerate(self.rules):
+            if rule.rule_id == rule_id:
+                return 1 << index
+        raise KeyError(rule_id)
+
+    def explanations_for(self, flags: int) -> List[str]:
+        """Decode a fired-rule bitmask into explanations, in rule order."""
+        return [rule.explanation for index, rule in enumerate(self.rules) if flags & (1 << index)]
+
+    def reset_stats(self):
+        for rule in self.rules:
+            rule.hits = 0
+            rule.evaluations = 0
+            rule.total_ns = 0
+
+    def stats(self) -> Dict:
+        return {
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "rules": [rule.stats() for rule in self.rules]
+        }
+
+def _compile_rule(definition: Dict, params: Dict[str, float]) -> CompiledRule:
+    rule_id = definition["id"]
+    conditions = []
+    for condition in definition.get("when", []):
+        op = condition["op"]
+        if op not in OPERATORS:
+            raise ValueError(f"Rule '{rule_id}': unsupported operator '{op}'")
+        value = condition["value"]
+        if isinstance(value, str):
+            if value not in params:
+                raise ValueError(f"Rule '{rule_id}': unknown parameter '{value}'")
+            value = params[value]
+        if "scale" in condition:
+            value = value * condition["scale"]
+        conditions.append((condition["field"], OPERATORS[op], float(value)))
+    if not conditions:
+        raise ValueError(f"Rule '{rule_id}' has no conditions")
+
+    return CompiledRule(
+        rule_id=rule_id,
+        group=definition.get("group"),
+        score=float(definition["score"]),
+        explanation=definition.get("explanation", rule_id),
+        conditions=conditions
+    )
+
+def compile_ruleset(definitions: Dict, params: Optional[Dict[str, float]] = None,
+                    source: str = "<memory>") -> RuleSet:
+    """
+    Compile rule definitions into a RuleSet.
+    `params` supplies named thresholds; a "params" block in the definitions overrides them.
+    Malformed definitions (missing or wrong-typed fields) raise ValueError.
+    """
+    try:
+        resolved_params = dict(params or {})
+        resolved_params.update(definitions.get("params", {}))
+
+        rules = []
+        seen_ids = set()
+        for definition in definitions.get("rules", []):
+            rule = _compile_rule(definition, resolved_params)
+            if rule.rule_id in seen_ids:
+                raise ValueError(f"Duplicate rule id '{rule.rule_id}'")
+            seen_ids.add(rule.rule_id)
+            rules.append(rule)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Malformed rule definitions ({type(e).__name__}: {e})") from e
+
+    if len(rules) > MAX_RULES:
+        raise ValueError(f"At most {MAX_RULES} rules are supported (bitmask width)")
+    return RuleSet(rules, source=source)
+
+def load_ruleset(path: str, params: Optional[Dict[str, float]] = None) -> RuleSet:
+    """Load and compile a rule definition file."""
+    with open(path) as f:
+        definitions = json.load(f)
+    return compile_ruleset(definitions, params=params, source=path)
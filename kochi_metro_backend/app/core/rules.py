@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta
 from app.db.client import db
-from typing import List, Dict, Tuple
+from app.db.queries import fetch_eligibility_rows, fetch_latest_distance_readings
+from typing import List, Dict, Optional, Tuple
+from app.core.rule_engine import RuleSet, load_ruleset
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,17 +17,20 @@ class KMRLRules:
     MAX_DAYS_WITHOUT_MAINT = 180        # days
     CRITICAL_MILEAGE_THRESHOLD = 150000  # km
     
-    # Branding SLA thresholds
-    BRANDING_SLA_BUFFER_HOURS = 48      # hours buffer before SLA breach
-    
-    # Location-based shunting costs (energy + time)
-    SHUNTING_COSTS = {
-        'STAB-A': 1,    # Lowest cost - ready position
-        'STAB-B': 2,    # Medium cost
-        'STAB-C': 3,    # Higher cost
-        'DEPOT': 4,     # Highest cost - needs full shunting
-        'MAIN_LINE': 5  # Emergency retrieval needed
-    }
+    # Shunting costs come from the depot track graph (see depot_layout)
+    # Branding urgency comes from the branding hour allocation (see branding)
+
+DEFAULT_DAYS_SINCE_MAINT = 30  # Used when no completed maintenance is on record
+
+def days_since(event_date) -> int:
+    """Whole days elapsed since a date/datetime (or ISO string), never negative."""
+    if event_date is None:
+        return DEFAULT_DAYS_SINCE_MAINT
+    if isinstance(event_date, str):
+        event_date = datetime.fromisoformat(event_date.replace('Z', '+00:00'))
+    if not isinstance(event_date, datetime):
+        event_date = datetime.combine(event_date, datetime.min.time())
+    return max(0, (datetime.now() - event_date.replace(tzinfo=None)).days)
 
 def calculate_days_since_maintenance(asset) -> int:
     """Calculate days since last maintenance based on work orders."""
@@ -33,115 +39,50 @@ def calculate_days_since_maintenance(asset) -> int:
         work_orders = asset.work_orders if hasattr(asset, 'work_orders') else asset.get('work_orders', [])
         
         if not work_orders:
-            return 30  # Default to 30 days if no maintenance records
+            return DEFAULT_DAYS_SINCE_MAINT  # Default to 30 days if no maintenance records
         
-        # Find the most recent completed work order (status = 'COMP' or 'CLOSE')
-        completed_orders = [wo for wo in work_orders if hasattr(wo, 'status') and wo.status in ['COMP', 'CLOSE']]
+        # Completion date of each completed work order (status = 'COMP' or 'CLOSE')
+        completion_dates = [
+            wo.actual_finish or wo.created_date
+            for wo in work_orders
+            if getattr(wo, 'wo_status', None) in ['COMP', 'CLOSE'] and (wo.actual_finish or wo.created_date)
+        ]
         
-        if not completed_orders:
-            return 30  # No completed maintenance found
+        if not completion_dates:
+            return DEFAULT_DAYS_SINCE_MAINT  # No completed maintenance found
         
-        latest_maintenance = max(
-            completed_orders,
-            key=lambda x: x.reported_date,
-            default=None
-        )
-        
-        if latest_maintenance:
-            from datetime import datetime
-            # Convert to datetime if it's a string
-            reported_date = latest_maintenance.reported_date
-            if isinstance(reported_date, str):
-                reported_date = datetime.fromisoformat(reported_date.replace('Z', '+00:00'))
-            
-            days_diff = (datetime.now() - reported_date.replace(tzinfo=None)).days
-            return max(0, days_diff)
-        
-        return 30  # Default if no valid maintenance found
+        return days_since(max(completion_dates))
         
     except Exception as e:
         print(f"Error calculating maintenance days: {e}")
-        return 30  # Conservative default
+        return DEFAULT_DAYS_SINCE_MAINT  # Conservative default
 
-def calculate_branding_urgency(asset) -> Dict[str, float]:
-    """Calculate branding urgency based on SLA requirements."""
-    # Check for branding campaigns (new schema)
-    branding_campaigns = asset.branding_campaigns if hasattr(asset, 'branding_campaigns') else asset.get('branding_campaigns', [])
-    
-    if not branding_campaigns:
-        return {"urgency_score": 0.0, "hours_deficit": 0, "sla_risk": "None"}
-    
-    # Get active campaigns
-    today_dt = datetime.now().date()
-    active_campaigns = [
-        campaign for campaign in branding_campaigns 
-        if (campaign.start_date.date() if hasattr(campaign.start_date, 'date') else campaign.start_date) <= today_dt <= (campaign.end_date.date() if hasattr(campaign.end_date, 'date') else campaign.end_date)
-    ]
-    
-    if not active_campaigns:
-        return {"urgency_score": 0.0, "hours_deficit": 0, "sla_risk": "None"}
-    
-    campaign = active_campaigns[0]  # Primary active campaign
-    required_hours = campaign.minimum_hours_required or 0
-    achieved_hours = campaign.actual_hours_served or 0
-    hours_deficit = max(0, required_hours - achieved_hours)
-    
-    # Calculate urgency based on remaining time and deficit
-    if hours_deficit <= KMRLRules.BRANDING_SLA_BUFFER_HOURS:
-        urgency_score = 0.2
-        sla_risk = "Low"
-    elif hours_deficit <= KMRLRules.BRANDING_SLA_BUFFER_HOURS * 2:
-        urgency_score = 0.6
-        sla_risk = "Medium"
-    else:
-        urgency_score = 1.0
-        sla_risk = "High"
-    
+# Declarative risk rules; KMRLRules constants are the default thresholds
+RULES_PATH = os.getenv("KMRL_RULES_PATH", os.path.join(os.path.dirname(__file__), "kmrl_rules.json"))
+
+def _rule_params() -> Dict[str, float]:
     return {
-        "urgency_score": urgency_score,
-        "hours_deficit": hours_deficit,
-        "sla_risk": sla_risk
+        name: value for name, value in vars(KMRLRules).items()
+        if name.isupper() and isinstance(value, (int, float))
     }
 
-def apply_hard_rules_risk_assessment(asset) -> Dict[str, any]:
-    """Apply KMRL hard rules for risk assessment."""
-    risk_factors = []
-    risk_score = 0.0
-    
-    # Get current mileage from meter readings or total distance
-    current_mileage = 0
-    if hasattr(asset, 'meter_readings') and asset.meter_readings:
-        # Get latest distance reading
-        for reading in asset.meter_readings:
-            if reading.meter_type == "DISTANCE_KM":
-                current_mileage = float(reading.reading_value)
-                break
-    elif hasattr(asset, 'total_distance_km') and asset.total_distance_km:
-        current_mileage = float(asset.total_distance_km)
-    
-    days_since_maint = calculate_days_since_maintenance(asset)
-    
-    # Rule 1: Critical mileage threshold
-    if current_mileage > KMRLRules.CRITICAL_MILEAGE_THRESHOLD:
-        risk_score += 0.8
-        risk_factors.append("Critical mileage exceeded")
-    elif current_mileage > KMRLRules.MAX_MILEAGE_WITHOUT_MAINT:
-        risk_score += 0.5
-        risk_factors.append("High mileage")
-    
-    # Rule 2: Maintenance overdue
-    if days_since_maint > KMRLRules.MAX_DAYS_WITHOUT_MAINT:
-        risk_score += 0.7
-        risk_factors.append("Maintenance overdue")
-    elif days_since_maint > KMRLRules.MAX_DAYS_WITHOUT_MAINT * 0.8:
-        risk_score += 0.3
-        risk_factors.append("Maintenance due soon")
-    
-    # Rule 3: Combined high-risk scenario
-    if (current_mileage > KMRLRules.MAX_MILEAGE_WITHOUT_MAINT and 
-        days_since_maint > KMRLRules.MAX_DAYS_WITHOUT_MAINT * 0.7):
-        risk_score += 0.4  # Additional penalty for combined factors
-        risk_factors.append("High mileage + overdue maintenance")
+risk_rules: RuleSet = load_ruleset(RULES_PATH, params=_rule_params())
+risk_rules_generation = 0  # Bumped on every reload; a version key for caches
+
+def reload_risk_rules(path: str = None) -> RuleSet:
+    """Recompile the rule definitions and swap them in for subsequent evaluations."""
+    global risk_rules, risk_rules_generation
+    risk_rules = load_ruleset(path or RULES_PATH, params=_rule_params())
+    risk_rules_generation += 1
+    logger.info(f"Loaded {len(risk_rules.rules)} risk rules from {risk_rules.source}")
+    return risk_rules
+
+def evaluate_hard_rules(current_mileage: float, days_since_maint: int) -> Dict[str, any]:
+    """Evaluate the KMRL risk rules for a single asset's mileage and maintenance age."""
+    risk_score, risk_factors, _ = risk_rules.evaluate({
+        "current_mileage": current_mileage,
+        "days_since_maint": days_since_maint
+    })
     
     # Normalize risk score to 0-1 range
     rules_based_risk = min(risk_score, 1.0)
@@ -153,6 +94,28 @@ def apply_hard_rules_risk_assessment(asset) -> Dict[str, any]:
         "days_since_maint": days_since_maint
     }
 
+def apply_hard_rules_risk_assessment(asset, current_mileage: Optional[float] = None) -> Dict[str, any]:
+    """
+    Apply KMRL hard rules for risk assessment.
+    Pass `current_mileage` (e.g. from fetch_latest_distance_readings) to skip
+    scanning the asset's meter readings.
+    """
+    if current_mileage is None:
+        # Get current mileage from meter readings or total distance
+        current_mileage = 0
+        if hasattr(asset, 'meter_readings') and asset.meter_readings:
+            # Get latest distance reading
+            for reading in asset.meter_readings:
+                if reading.meter_type == "DISTANCE_KM":
+                    current_mileage = float(reading.reading_value)
+                    break
+        elif hasattr(asset, 'total_distance_km') and asset.total_distance_km:
+            current_mileage = float(asset.total_distance_km)
+    
+    days_since_maint = calculate_days_since_maintenance(asset)
+    
+    return evaluate_hard_rules(current_mileage, days_since_maint)
+
 async def get_eligible_trains() -> Tuple[List[Dict], List[Dict]]:
     """
     Enhanced eligibility assessment with integrated hard rules and risk calculation.
@@ -172,18 +135,12 @@ async def get_eligible_trains() -> Tuple[List[Dict], List[Dict]]:
                 "work_orders": True,
                 "asset_certificates": True,
                 "branding_campaigns": True,
-                "asset_specifications": True,
-                "meter_readings": {
-                    "where": {
-                        "meter_type": "DISTANCE_KM"
-                    },
-                    "order_by": {
-                        "reading_date": "desc"
-                    },
-                    "take": 1
-                }
+                "asset_specifications": True
             }
         )
+        # Prisma applies a per-parent `take` in memory after loading every
+        # related reading, so fetch the latest readings in one DISTINCT ON query
+        latest_distance = await fetch_latest_distance_readings()
 
         logger.info(f"Processing {len(assets_raw)} assets for eligibility")
 
@@ -226,15 +183,15 @@ async def get_eligible_trains() -> Tuple[List[Dict], List[Dict]]:
 
             # For eligible assets, perform hard rules assessment
             try:
-                hard_rules_assessment = apply_hard_rules_risk_assessment(asset)
-                
                 # Get current mileage from latest meter reading
                 current_mileage = 0
-                if asset.meter_readings:
-                    current_mileage = float(asset.meter_readings[0].reading_value)
+                if asset.asset_id in latest_distance:
+                    current_mileage = latest_distance[asset.asset_id]
                 elif asset.total_distance_km:
                     current_mileage = float(asset.total_distance_km)
 
+                hard_rules_assessment = apply_hard_rules_risk_assessment(asset, current_mileage)
+
                 # Get active campaigns
                 today_dt = datetime.now().date()
                 active_campaigns = []
@@ -299,3 +256,118 @@ async def get_eligible_trains() -> Tuple[List[Dict], List[Dict]]:
 
     return eligible_assets, ineligible_assets
 
+def _assess_eligibility_row(row: Dict) -> Tuple[bool, List[str], Dict]:
+    """Apply the eligibility rules to one compact row from fetch_eligibility_rows."""
+    is_eligible = True
+    reasons = []
+
+    # Rule 1: Asset Certificates - CRITICAL (only expired / expiring-soon rows are returned)
+    for cert in row["certificates"]:
+        days_to_expiry = cert["days_to_expiry"]
+        if days_to_expiry < 0:
+            is_eligible = False
+            reasons.append(f"Expired {cert['certificate_type']} Certificate")
+        else:
+            reasons.append(f"{cert['certificate_type']} expires in {days_to_expiry} days")
+
+    # Rule 2: Work Orders - CRITICAL (APPROVED/INPRG with priority <= 2)
+    for wo in row["critical_work_orders"]:
+        is_eligible = False
+        status_desc = 'Approved' if wo["wo_status"] == 'APPROVED' else 'In Progress'
+        reasons.append(f"Critical Work Order ({status_desc}): {wo['description'] or 'Maintenance Required'}")
+
+    if not is_eligible:
+        return False, reasons, {}
+
+    if row["latest_distance_km"] is not None:
+        current_mileage = float(row["latest_distance_km"])
+    elif row["total_distance_km"]:
+        current_mileage = float(row["total_distance_km"])
+    else:
+        current_mileage = 0
+
+    hard_rules_assessment = evaluate_hard_rules(current_mileage, days_since(row["last_maintenance_date"]))
+    active_campaigns = row["active_campaigns"]
+
+    asset_data = {
+        "asset_num": row["asset_num"],
+        "asset_id": row["asset_id"],
+        "description": row["description"] or "",
+        "location": row["location"] or "UNKNOWN",
+        "current_mileage": current_mileage,
+        "operating_hours": float(row["operating_hours"] or 0),
+        "status": row["status"] or "OPERATING",
+        "manufacturer": row["manufacturer"] or "",
+        "model": row["model"] or "",
+        "installation_date": row["installation_date"],
+        "branding_campaigns": active_campaigns,
+
+        # Risk assessment data
+        "rules_risk_score": hard_rules_assessment["rules_risk_score"],
+        "risk_factors": hard_rules_assessment["risk_factors"],
+        "days_since_maint": hard_rules_assessment["days_since_maint"],
+
+        # Required for branding calculations
+        "required_hours": active_campaigns[0]["required_hours"] if active_campaigns else 0,
+        "achieved_hours": active_campaigns[0]["achieved_hours"] if active_campaigns else 0,
+
+        # Location data for shunting costs
+        "current_location_id": row["location"] or "DEPOT"
+    }
+    return True, reasons, asset_data
+
+def assess_eligibility_rows(rows: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Split compact eligibility rows into eligible asset data and ineligible entries."""
+    eligible_assets = []
+    ineligible_assets = []
+
+    for row in rows:
+        try:
+            is_eligible, reasons, asset_data = _assess_eligibility_row(row)
+        except Exception as e:
+            logger.error(f"Error processing asset {row.get('asset_num')}: {e}")
+            ineligible_assets.append({
+                "asset_num": row.get("asset_num"),
+                "asset_id": row.get("asset_id"),
+                "reason": "Processing Error - Requires Manual Review",
+                "risk_score": 1.0,
+                "category": "System Error"
+            })
+            continue
+
+        if not is_eligible:
+            ineligible_assets.append({
+                "asset_num": row["asset_num"],
+                "asset_id": row["asset_id"],
+                "reason": "; ".join(reasons),
+                "risk_score": 1.0,
+                "category": "Critical Issues"
+            })
+        else:
+            eligible_assets.append(asset_data)
+
+    return eligible_assets, ineligible_assets
+
+async def get_eligible_trains_aggregated() -> Tuple[List[Dict], List[Dict]]:
+    """
+    Eligibility assessment backed by a single aggregated SQL query.
+
+    Produces the same eligible/ineligible split as get_eligible_trains, but
+    expired certificates, critical work orders, last completed maintenance and
+    active campaign hours are computed in Postgres, so only one compact row per
+    asset is transferred. Eligible entries do not carry the raw work order,
+    certificate or specification lists.
+    """
+    try:
+        rows = await fetch_eligibility_rows(datetime.now().date())
+        logger.info(f"Processing {len(rows)} assets for eligibility (aggregated query)")
+
+        eligible_assets, ineligible_assets = assess_eligibility_rows(rows)
+
+        logger.info(f"Assessment complete: {len(eligible_assets)} eligible, {len(ineligible_assets)} ineligible")
+
+    except Exception as e:
+        logger.error(f"Error in get_eligible_trains_aggregated: {e}")
+        raise
+
+    return eligible_assets, ineligible_assets
@@ -0,0 +1,64 @@
+"""
+What-if scenario sweeps.
+
+Eligibility, risk and the four objective scores are computed once per
+request. Each scenario, a (num_for_service, weight overrides) pair, then costs
+one weighted column over the shared score matrix plus a top-k selection, so a
+sweep of many scenarios costs about the same as a single schedule.
+
+Composites are summed in the same order as KMRLOptimizer.score_batch, so a
+scenario with the default weights selects exactly the trains
+get_optimized_schedule would for the same scored assets. (The scenarios
+endpoint plans branding hours once, for the largest service set in the
+sweep, so branding urgency can differ from a single smaller schedule.)
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.optimizer import OBJECTIVES, WEIGHTS, objective_matrix
+
+def scenario_weights(overrides: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """WEIGHTS with the given objectives overridden."""
+    weights = dict(WEIGHTS)
+    for name, value in (overrides or {}).items():
+        if name not in weights:
+            raise ValueError(f"Unknown objective '{name}'; expected one of {', '.join(OBJECTIVES)}")
+        weights[name] = value
+    return weights
+
+def evaluate_scenarios(
+    eligible_assets: List[Dict],
+    scenarios: Sequence[Tuple[int, Optional[Dict[str, float]]]]
+) -> List[Dict]:
+    """Service/standby split for every (num_for_service, weight overrides) scenario."""
+    scores = objective_matrix(eligible_assets)
+    weights = [scenario_weights(overrides) for _, overrides in scenarios]
+    weight_matrix = np.array([[w[name] for w in weights] for name in OBJECTIVES])
+
+    # assets x scenarios, accumulated objective by objective as in score_batch
+    composites = scores[:, :1] * weight_matrix[0]
+    for j in range(1, len(OBJECTIVES)):
+        composites = composites + scores[:, j:j + 1] * weight_matrix[j]
+    # Stable descending order per scenario, ties keep fleet order
+    orders = np.argsort(-composites, axis=0, kind="stable")
+
+    asset_nums = [asset["asset_num"] for asset in eligible_assets]
+    results = []
+    for j, (num_for_service, _) in enumerate(scenarios):
+        order = orders[:, j]
+        k = min(num_for_service, len(order))
+        service, standby = order[:k], order[k:]
+        results.append({
+            "num_trains_for_service": num_for_service,
+            "weights": weights[j],
+            "service": [
+                {"asset_num": asset_nums[i], "composite_score": round(float(composites[i, j]), 4)}
+                for i in service
+            ],
+            "standby": [asset_nums[i] for i in standby],
+            "objective_means": {
+                name: round(float(scores[service, m].mean()), 4) if k else 0.0
+                for m, name in enumerate(OBJECTIVES)
+            },
+            "total_composite": round(float(composites[service, j].sum()), 4)
+        })
+    return results
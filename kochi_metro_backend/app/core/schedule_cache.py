@@ -0,0 +1,134 @@
+"""
+Schedule result memoization.
+
+Dashboards poll generate-schedule far more often than the fleet changes. The
+fleet fingerprint combines:
+- row counts and latest created/modified timestamps of every input table
+  (fetch_fleet_fingerprint);
+- the fleet_changes position when change tracking is installed, which also
+  catches in-place updates that leave no timestamp, such as a work order
+  being closed or re-prioritised. The position is the highest id plus the
+  number of entries among the last CHANGE_LOG_WINDOW ids, which moves even
+  when a slow transaction commits an id below the highest. Both are bounded
+  primary-key reads;
+- today's date, since eligibility and branding windows are relative to it;
+- the risk model version, the rule set generation and the objective weights.
+
+If reading fleet_changes fails, the timestamp fingerprint is used alone (so
+such in-place edits show up only when the date changes) and tracking is
+tried again after TRACKING_RETRY_S.
+
+A bounded LRU cache maps (fingerprint, request) to the serialized response.
+The fingerprint itself is re-read at most every FINGERPRINT_TTL_S seconds, so
+a hit is a dict lookup and costs microseconds. The trade-off is that a data
+change can take up to that long to show up.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Tuple
+from app.core import rules
+from app.core.depot_layout import depot_layout
+from app.core.fleet_state import CHANGE_LOG_WINDOW
+from app.core.optimizer import WEIGHTS
+from app.db.queries import fetch_fleet_fingerprint, fetch_change_log_position
+from app.ml.pipeline import risk_predictor
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_CACHE_SIZE = int(os.getenv("KMRL_SCHEDULE_CACHE_SIZE", "128"))
+FINGERPRINT_TTL_S = float(os.getenv("KMRL_FINGERPRINT_TTL_S", "1.0"))
+TRACKING_RETRY_S = float(os.getenv("KMRL_TRACKING_RETRY_S", "60"))
+
+class ScheduleCache:
+    """LRU cache of serialized schedule responses keyed on the fleet fingerprint."""
+
+    def __init__(self, capacity: int = SCHEDULE_CACHE_SIZE, fingerprint_ttl_s: float = FINGERPRINT_TTL_S):
+        self.capacity = capacity
+        self.fingerprint_ttl_s = fingerprint_ttl_s
+        self._results: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._fingerprint: Optional[str] = None
+        self._fingerprint_at = float("-inf")
+        self._tracking_available: Optional[bool] = None
+        self._tracking_checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "fingerprint_refreshes": 0}
+
+    async def _change_watermark(self) -> Optional[Tuple[int, int]]:
+        if self._tracking_available is False and time.monotonic() - self._tracking_checked_at < TRACKING_RETRY_S:
+            return None
+        try:
+            position = await fetch_change_log_position(CHANGE_LOG_WINDOW)
+            if self._tracking_available is False:
+                logger.info("Fleet change tracking is available again")
+            self._tracking_available = True
+            return position
+        except Exception as e:
+            if self._tracking_available is not False:
+                logger.warning(
+                    f"Fleet change tracking unavailable ({e}); fingerprinting on timestamps only, "
+                    f"retrying in {TRACKING_RETRY_S:g}s"
+                )
+            self._tracking_available = False
+            self._tracking_checked_at = time.monotonic()
+            return None
+
+    async def fingerprint(self) -> str:
+        """Current fleet fingerprint, re-read from the database at most every fingerprint_ttl_s."""
+        if time.monotonic() - self._fingerprint_at < self.fingerprint_ttl_s:
+            return self._fingerprint
+        async with self._lock:
+            if time.monotonic() - self._fingerprint_at >= self.fingerprint_ttl_s:
+                parts = [
+                    await fetch_fleet_fingerprint(),
+                    await self._change_watermark(),
+                    datetime.now().date().isoformat(),
+                    risk_predictor.model_version,
+                    rules.risk_rules_generation,
+                    sorted(WEIGHTS.items())
+                ]
+                self._fingerprint = hashlib.md5(json.dumps(parts, default=str).encode()).hexdigest()
+                self._fingerprint_at = time.monotonic()
+                self.stats["fingerprint_refreshes"] += 1
+                # The key now covers the current layout, so the layout cache must not serve an older one
+                depot_layout.expire()
+            return self._fingerprint
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self._results.get(key)
+        if body is None:
+            self.stats["misses"] += 1
+            return None
+        self._results.move_to_end(key)
+        self.stats["hits"] += 1
+        return body
+
+    def put(self, key: Hashable, body: bytes):
+        self._results[key] = body
+        self._results.move_to_end(key)
+        while len(self._results) > self.capacity:
+            self._results.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self):
+        """Drop every cached result and re-read the fingerprint on the next request."""
+        self._results.clear()
+        self._fingerprint_at = float("-inf")
+
+    def report(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "size": len(self._results),
+            "capacity": self.capacity,
+            "fingerprint_ttl_s": self.fingerprint_ttl_s
+        }
+
+# Create a single, reusable instance
+schedule_cache = ScheduleCache()
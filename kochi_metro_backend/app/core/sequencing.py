@@ -0,0 +1,99 @@
+"""
+Morning departure sequencing.
+
+Given where every train is stabled (track and position, position 1 at the
+exit end) and the service set, order the service departures so the yard crew
+makes as few blocking moves as possible, then follows the schedule's priority.
+
+A departure costs one blocking move for every train still standing between it
+and the exit. Standby trains in front of a service train are unavoidable
+moves; service trains in front of it are not, since they can leave first. So
+the minimum is reached exactly when each track's service trains leave in
+position order, and the problem reduces to merging these per-track chains.
+
+Among the move-minimal orders, the merge minimizes sum(priority_j * slot_j),
+with priority = composite score. This is 1|chains|sum(w_j C_j) with unit
+departure times, solved exactly by Sidney's ratio rule: repeatedly dispatch
+the chain prefix with the highest mean priority. It is O(n^2) at worst, so
+a full depot sequences in well under a millisecond.
+"""
+import time
+from typing import Dict, List, Tuple
+
+def _best_prefix(chain: List[Tuple[str, float]]) -> Tuple[float, int]:
+    """(highest mean priority over the chain's prefixes, length of that prefix)."""
+    best_ratio, best_length, total = float("-inf"), 0, 0.0
+    for length, (_, priority) in enumerate(chain, 1):
+        total += priority
+        # Strictly greater keeps the shortest prefix on ties, so priority order is preserved
+        if total / length > best_ratio + 1e-12:
+            best_ratio, best_length = total / length, length
+    return best_ratio, best_length
+
+def merge_chains(chains: List[List[Tuple[str, float]]]) -> List[str]:
+    """Optimal merge of precedence chains of (key, priority), highest priorities first."""
+    chains = [list(chain) for chain in chains if chain]
+    order = []
+    while chains:
+        # Ties go to the chain listed first
+        index, (_, length) = max(enumerate(_best_prefix(chain) for chain in chains), key=lambda item: item[1][0])
+        order.extend(key for key, _ in chains[index][:length])
+        del chains[index][:length]
+        if not chains[index]:
+            del chains[index]
+    return order
+
+def sequence_departures(service: List[Dict], stabling: Dict) -> Dict:
+    """Departure order for the service trains of a schedule, given its stabling plan."""
+    start = time.perf_counter()
+    positions = {a["asset_num"]: (a["track"], a["position"]) for a in stabling.get("assignments", [])}
+    priority = {entry["asset_num"]: entry.get("composite_score", 0.0) for entry in service}
+
+    # Everything parked on each track, exit end first
+    tracks: Dict[str, List[Tuple[int, str]]] = {}
+    for asset_num, (track, position) in positions.items():
+        tracks.setdefault(track, []).append((position, asset_num))
+    for parked in tracks.values():
+        parked.sort()
+
+    # One chain per track in position order; trains without a position stand alone
+    chains = [
+        [(asset_num, priority[asset_num]) for _, asset_num in parked if asset_num in priority]
+        for _, parked in sorted(tracks.items())
+    ]
+    chains += [[(entry["asset_num"], priority[entry["asset_num"]])] for entry in service
+               if entry["asset_num"] not in positions]
+    # Chains are ordered by their lead train's schedule rank so ties follow the schedule
+    rank = {entry["asset_num"]: i for i, entry in enumerate(service)}
+    chains.sort(key=lambda chain: rank[chain[0][0]] if chain else len(rank))
+    order = merge_chains(chains)
+
+    departed = set()
+    sequence = []
+    blocking_moves = 0
+    for slot, asset_num in enumerate(order, 1):
+        track, position = positions.get(asset_num, (None, None))
+        blockers = [
+            other for other_position, other in tracks.get(track, [])
+            if other_position < position and other not in departed
+        ] if track else []
+        blocking_moves += len(blockers)
+        departed.add(asset_num)
+        sequence.append({
+            "slot": slot,
+            "asset_num": asset_num,
+            "track": track,
+            "position": position,
+            "blocking_moves": len(blockers),
+            "blockers": blockers
+        })
+
+    return {
+        "order": sequence,
+        "summary": {
+            "blocking_moves": blocking_moves,
+            "weighted_completion": round(sum(priority[s["asset_num"]] * s["slot"] for s in sequence), 4),
+            "method": "Per-track exit order merged by Sidney's ratio rule",
+            "solve_time_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+    }
@@ -0,0 +1,136 @@
+"""
+Compact, immutable fleet snapshot.
+
+FleetSnapshot holds only the fields the scoring stages need, as NamedTuple
+records (tuple-backed, no per-instance __dict__). A snapshot is never mutated:
+each stage (risk, optimizer) returns its own columns, aligned with
+snapshot.eligible by position, so concurrent requests can safely share one
+snapshot.
+"""
+import numpy as np
+from datetime import date
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+class CampaignHours(NamedTuple):
+    required_hours: int
+    achieved_hours: int
+    advertiser: str
+
+class AssetRecord(NamedTuple):
+    asset_id: str
+    asset_num: str
+    description: str
+    location: str
+    current_mileage: float
+    operating_hours: float
+    status: str
+    manufacturer: str
+    model: str
+    installation_date: Optional[date]
+    branding_campaigns: Tuple[CampaignHours, ...]
+    rules_risk_score: float
+    risk_factors: Tuple[str, ...]
+    days_since_maint: int
+    required_hours: int
+    achieved_hours: int
+    current_location_id: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Mutable dict in the legacy asset_data shape."""
+        data = self._asdict()
+        data["branding_campaigns"] = [campaign._asdict() for campaign in self.branding_campaigns]
+        data["risk_factors"] = list(self.risk_factors)
+        return data
+
+class IneligibleRecord(NamedTuple):
+    asset_id: str
+    asset_num: str
+    reason: str
+    risk_score: float
+    category: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+def asset_record_from_dict(asset: Dict) -> AssetRecord:
+    return AssetRecord(
+        asset_id=asset["asset_id"],
+        asset_num=asset["asset_num"],
+        description=asset.get("description", ""),
+        location=asset.get("location", "UNKNOWN"),
+        current_mileage=float(asset.get("current_mileage", 0)),
+        operating_hours=float(asset.get("operating_hours", 0)),
+        status=asset.get("status", "OPERATING"),
+        manufacturer=asset.get("manufacturer", ""),
+        model=asset.get("model", ""),
+        installation_date=asset.get("installation_date"),
+        branding_campaigns=tuple(
+            CampaignHours(campaign["required_hours"], campaign["achieved_hours"], campaign["advertiser"])
+            for campaign in asset.get("branding_campaigns", [])
+        ),
+        rules_risk_score=asset.get("rules_risk_score", 0.0),
+        risk_factors=tuple(asset.get("risk_factors", [])),
+        days_since_maint=asset.get("days_since_maint", 0),
+        required_hours=asset.get("required_hours", 0),
+        achieved_hours=asset.get("achieved_hours", 0),
+        current_location_id=asset.get("current_location_id", "DEPOT")
+    )
+
+def ineligible_record_from_dict(asset: Dict) -> IneligibleRecord:
+    return IneligibleRecord(
+        asset_id=asset["asset_id"],
+        asset_num=asset["asset_num"],
+        reason=asset.get("reason", "Ineligible"),
+        risk_score=asset.get("risk_score", 1.0),
+        category=asset.get("category", "Maintenance Required")
+    )
+
+class FleetSnapshot:
+    """Immutable eligible/ineligible split with cached NumPy columns."""
+    __slots__ = ("eligible", "ineligible", "as_of", "_columns")
+
+    def __init__(self, eligible: Sequence[AssetRecord], ineligible: Sequence[IneligibleRecord],
+                 as_of: Optional[date] = None):
+        object.__setattr__(self, "eligible", tuple(eligible))
+        object.__setattr__(self, "ineligible", tuple(ineligible))
+        object.__setattr__(self, "as_of", as_of)
+        object.__setattr__(self, "_columns", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FleetSnapshot is immutable")
+
+    def __len__(self) -> int:
+        return len(self.eligible)
+
+    def column(self, field: str) -> np.ndarray:
+        """Read-only NumPy column of an AssetRecord field over the eligible assets."""
+        values = self._columns.get(field)
+        if values is None:
+            values = np.array([getattr(asset, field) for asset in self.eligible])
+            values.setflags(write=False)
+            self._columns[field] = values
+        return values
+
+    def rows(self, *stage_columns: Dict[str, Sequence]) -> Iterator[Dict[str, Any]]:
+        """
+        Yield a fresh dict per eligible asset merging its record with the
+        given stage outputs (each a mapping of column name -> per-asset values).
+        """
+        for index, asset in enumerate(self.eligible):
+            row = asset._asdict()
+            for columns in stage_columns:
+                for name, values in columns.items():
+                    row[name] = values[index]
+            yield row
+
+    def to_dicts(self) -> Tuple[list, list]:
+        """Legacy (eligible, ineligible) lists of mutable dicts."""
+        return [asset.to_dict() for asset in self.eligible], [asset.to_dict() for asset in self.ineligible]
+
+    @classmethod
+    def from_dicts(cls, eligible_assets, ineligible_assets, as_of: Optional[date] = None) -> "FleetSnapshot":
+        return cls(
+            [asset_record_from_dict(asset) for asset in eligible_assets],
+            [ineligible_record_from_dict(asset) for asset in ineligible_assets],
+            as_of
+        )
@@ -0,0 +1,73 @@
+"""
+Overnight stabling track assignment.
+
+Given tomorrow's departure order (service trains in schedule order, then the
+standby list) and the stabling tracks of the depot layout, decide which track
+and position each train parks on tonight.
+
+Each track of capacity c is expanded into c positions, position 1 at the exit
+end. Placing train i at position j of track t costs
+
+    urgency_i * (exit_cost(t) + REPOSITION_COST * (j - 1))
+
+where urgency falls with departure rank. This is a rectangular assignment
+problem, solved exactly with the Hungarian method (scipy's
+linear_sum_assignment). By the rearrangement inequality, an optimal
+assignment never parks a later departure in front of an earlier one on the
+same track, so the plan needs no blocking moves in the morning. When there are
+more trains than positions, positions go to trains in departure order.
+"""
+import time
+from typing import Dict, List
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from app.core.depot_layout import DepotLayout
+
+REPOSITION_COST = 1.0  # Extra cost per train parked between a position and the exit
+
+def assign_stabling(layout: DepotLayout, service: List[Dict], standby: List[Dict]) -> Dict:
+    """Track assignment for tonight, from the service and standby lists of a schedule."""
+    start = time.perf_counter()
+    departures = [(entry["asset_num"], "service") for entry in service] + \
+                 [(entry["asset_num"], "standby") for entry in standby]
+
+    slots = []
+    for track_id, depot_id, capacity in layout.stabling_tracks:
+        exit_cost = layout.distance(track_id, depot_id)
+        for position in range(1, capacity + 1):
+            slots.append((track_id, depot_id, position, exit_cost + REPOSITION_COST * (position - 1)))
+
+    assigned_count = min(len(departures), len(slots))
+    assignments = []
+    total_cost = 0.0
+    if assigned_count:
+        # Earliest departures weigh most; rank 0 has urgency 1
+        urgency = 1.0 - np.arange(assigned_count) / len(departures)
+        slot_costs = np.array([slot[3] for slot in slots])
+        cost = np.outer(urgency, slot_costs)
+        rows, cols = linear_sum_assignment(cost)
+        total_cost = float(cost[rows, cols].sum())
+        for rank, slot_index in zip(rows.tolist(), cols.tolist()):
+            asset_num, role = departures[rank]
+            track_id, depot_id, position, _ = slots[slot_index]
+            assignments.append({
+                "asset_num": asset_num,
+                "role": role,
+                "departure_rank": rank + 1,
+                "depot": depot_id,
+                "track": track_id,
+                "position": position
+            })
+
+    return {
+        "assignments": assignments,
+        "unassigned": [asset_num for asset_num, _ in departures[assigned_count:]],
+        "summary": {
+            "tracks": len(layout.stabling_tracks),
+            "positions": len(slots),
+            "trains": len(departures),
+            "total_cost": round(total_cost, 4),
+            "method": "Hungarian assignment (linear_sum_assignment)",
+            "solve_time_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+    }
@@ -0,0 +1,120 @@
+"""
+Streaming schedule pipeline.
+
+Assets flow through async generators in chunks:
+
+    cursor-paginated eligibility query -> rules -> batched risk scoring + shunting costs -> ScheduleAccumulator
+                                                                          -> branding plan (whole fleet)
+
+Each chunk's raw rows, records and risk columns are dropped once the chunk is
+scored; the accumulator keeps only a slim scoring view per eligible asset
+(see optimizer.SCORING_FIELDS). Maintenance entries are available as soon as
+their chunk is assessed. The final schedule carries the stabling plan and departure sequence.
+
+Branding urgency depends on how service hours are shared across the whole
+eligible fleet, so the branding plan is solved once the last chunk arrives and
+its columns are added to the scoring views before the final split.
+
+The efficiency objective is relative to the fleet-wide maximum mileage and
+the standby list ranks every remaining train, so the final service/standby
+split is made once the last chunk arrives, by the same get_optimized_schedule
+used in the batch path. The streamed schedule is therefore identical to the
+batch one.
+"""
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.core.induction_solver import InductionConstraints
+from app.core.rules import assess_eligibility_rows
+from app.core.snapshot import FleetSnapshot
+from app.core.depot_layout import DepotLayout, depot_layout
+from app.core.branding import plan_branding
+from app.core.stabling import assign_stabling
+from app.core.sequencing import sequence_departures
+from app.core.optimizer import get_optimized_schedule, maintenance_items, scoring_view
+from app.db.queries import fetch_eligibility_rows
+from app.ml.pipeline import risk_predictor
+
+DEFAULT_CHUNK_SIZE = 500
+
+async def eligibility_chunks(chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[Tuple[List[Dict], List[Dict]]]:
+    """Page through the fleet in asset_id order, yielding (eligible, ineligible) per chunk."""
+    as_of = datetime.now().date()
+    after_asset_id = None
+    while True:
+        rows = await fetch_eligibility_rows(as_of, after_asset_id=after_asset_id, limit=chunk_size)
+        if not rows:
+            return
+        yield assess_eligibility_rows(rows)
+        if len(rows) < chunk_size:
+            return
+        after_asset_id = rows[-1]["asset_id"]
+
+async def risk_chunks(
+    chunks: AsyncIterator[Tuple[List[Dict], List[Dict]]],
+    layout: DepotLayout
+) -> AsyncIterator[Tuple[List[Dict], List[Dict]]]:
+    """Score each chunk's eligible assets in one batch, yielding (scoring views, ineligible)."""
+    async for eligible_assets, ineligible_assets in chunks:
+        snapshot = FleetSnapshot.from_dicts(eligible_assets, [])
+        risk_columns = risk_predictor.score_snapshot(snapshot) if eligible_assets else {}
+        shunting_columns = layout.shunting_columns(snapshot.column("location"))
+        yield [scoring_view(row) for row in snapshot.rows(risk_columns, shunting_columns)], ineligible_assets
+
+class ScheduleAccumulator:
+    """Collects scored chunks and produces the final schedule."""
+
+    def __init__(self, num_for_service: int, constraints: Optional[InductionConstraints] = None,
+                 explain: str = "full"):
+        self.num_for_service = num_for_service
+        self.constraints = constraints
+        self.explain = explain
+        self.scored: List[Dict] = []
+        self.ineligible: List[Dict] = []
+
+    def add(self, scored_assets: List[Dict], ineligible_assets: List[Dict]):
+        self.scored.extend(scored_assets)
+        self.ineligible.extend(ineligible_assets)
+
+    def add_columns(self, columns: Dict[str, List]):
+        """Merge whole-fleet stage columns, aligned with the scored assets."""
+        for name, values in columns.items():
+            for asset, value in zip(self.scored, values):
+                asset[name] = value
+
+    @property
+    def processed(self) -> int:
+        return len(self.scored) + len(self.ineligible)
+
+    def result(self) -> Dict:
+        if not self.scored:
+            return get_optimized_schedule([], self.ineligible, 0)
+        return get_optimized_schedule(self.scored, self.ineligible, self.num_for_service, self.constraints, self.explain)
+
+async def stream_schedule(
+    num_for_service: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    constraints: Optional[InductionConstraints] = None,
+    explain: str = "full"
+) -> AsyncIterator[Dict]:
+    """
+    Run the streaming pipeline, yielding events:
+      {"type": "maintenance", "item": {...}}   as soon as an ineligible asset is found
+      {"type": "progress", "processed": n}     after each chunk
+      {"type": "schedule", "schedule": {...}}  once, at the end
+    """
+    accumulator = ScheduleAccumulator(num_for_service, constraints, explain)
+    layout = await depot_layout.get()
+    async for scored_assets, ineligible_assets in risk_chunks(eligibility_chunks(chunk_size), layout):
+        accumulator.add(scored_assets, ineligible_assets)
+        for item in maintenance_items(ineligible_assets):
+            yield {"type": "maintenance", "item": item}
+        yield {"type": "progress", "processed": accumulator.processed}
+    asset_ids = [asset["asset_id"] for asset in accumulator.scored]
+    branding = await plan_branding(asset_ids, num_for_service)
+    accumulator.add_columns(branding.branding_columns(asset_ids))
+    # The exact solver may run for the whole time budget; keep it off the event loop
+    schedule = accumulator.result() if constraints is None else await asyncio.to_thread(accumulator.result)
+    schedule["stabling"] = assign_stabling(layout, schedule["service"], schedule["standby"])
+    schedule["departure_sequence"] = sequence_departures(schedule["service"], schedule["stabling"])
+    yield {"type": "schedule", "schedule": schedule}
@@ -0,0 +1,288 @@
+# app/db/queries.py
+"""
+Raw SQL fast paths for hot read queries.
+
+These bypass Prisma's relation hydration and let Postgres do the filtering
+and aggregation, returning one compact row per asset.
+"""
+import json
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from app.db.client import db
+
+# One row per TRAINSET with everything the eligibility rules need.
+# - Certificates are range-scanned on idx_certificates_expiry (expiry_date, status):
+#   only expired or expiring-within-7-days certificates are returned.
+# - Work orders are probed per asset through idx_wo_asset_status (asset_id, wo_status).
+# - Active campaigns are probed per asset through idx_branding_dates
+#   (asset_id, start_date, end_date).
+# - The latest distance reading is an index-only probe per asset on
+#   idx_meter_readings_latest (asset_id, meter_type, reading_date DESC, reading_value).
+ELIGIBILITY_SQL = """
+WITH expiring_certificates AS (
+    SELECT asset_id,
+           json_agg(
+               json_build_object(
+                   'certificate_type', certificate_type,
+                   'days_to_expiry', expiry_date - $1::date
+               ) ORDER BY expiry_date, cert_id
+           ) AS certificates
+    FROM asset_certificates
+    WHERE expiry_date < $1::date + 8
+    GROUP BY asset_id
+)
+SELECT a.asset_id,
+       a.asset_num,
+       a.description,
+       a.location,
+       a.status,
+       a.manufacturer,
+       a.model,
+       a.installation_date,
+       a.operating_hours,
+       a.total_distance_km,
+       ec.certificates,
+       cwo.critical_work_orders,
+       lm.last_maintenance_date,
+       mr.latest_distance_km,
+       ac.active_campaigns
+FROM assets a
+LEFT JOIN expiring_certificates ec ON ec.asset_id = a.asset_id
+LEFT JOIN LATERAL (
+    SELECT json_agg(
+               json_build_object('wo_status', wo.wo_status, 'description', wo.description)
+               ORDER BY wo.wo_num
+           ) AS critical_work_orders
+    FROM work_orders wo
+    WHERE wo.asset_id = a.asset_id
+      AND wo.wo_status IN ('APPROVED', 'INPRG')
+      AND wo.priority <= 2
+) cwo ON TRUE
+LEFT JOIN LATERAL (
+    SELECT MAX(COALESCE(wo.actual_finish, wo.created_date)) AS last_maintenance_date
+    FROM work_orders wo
+    WHERE wo.asset_id = a.asset_id
+      AND wo.wo_status IN ('COMP', 'CLOSE')
+) lm ON TRUE
+LEFT JOIN LATERAL (
+    SELECT m.reading_value AS latest_distance_km
+    FROM meter_readings m
+    WHERE m.asset_id = a.asset_id
+      AND m.meter_type = 'DISTANCE_KM'
+    ORDER BY m.reading_date DESC
+    LIMIT 1
+) mr ON TRUE
+LEFT JOIN LATERAL (
+    SELECT json_agg(
+               json_build_object(
+                   'required_hours', COALESCE(bc.minimum_hours_required, 0),
+                   'achieved_hours', COALESCE(bc.actual_hours_served, 0),
+                   'advertiser', COALESCE(bc.advertiser_name, 'Unknown')
+               ) ORDER BY bc.start_date, bc.campaign_id
+           ) AS active_campaigns
+    FROM branding_campaigns bc
+    WHERE bc.asset_id = a.asset_id
+      AND bc.start_date <= $1::date
+      AND bc.end_date >= $1::date
+) ac ON TRUE
+WHERE a.asset_type = 'TRAINSET'{asset_filter}
+ORDER BY a.asset_id
+"""
+
+def _as_list(value) -> List[Dict]:
+    """JSON aggregates come back as text or already-decoded lists depending on the driver."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+async def fetch_eligibility_rows(
+    as_of: date,
+    asset_ids: Optional[List[str]] = None,
+    after_asset_id: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[Dict]:
+    """
+    Fetch one compact eligibility row per trainset, evaluated for the given date.
+    Pass `asset_ids` to restrict the query to a subset of assets, or
+    `after_asset_id`/`limit` to page through the fleet in asset_id order.
+    """
+    if asset_ids is not None and not asset_ids:
+        return []
+
+    params = [as_of.isoformat()]
+    filters = []
+    if asset_ids is not None:
+        placeholders = ", ".join(f"${len(params) + i + 1}" for i in range(len(asset_ids)))
+        filters.append(f"a.asset_id IN ({placeholders})")
+        params.extend(asset_ids)
+    if after_asset_id is not None:
+        params.append(after_asset_id)
+        filters.append(f"a.asset_id > ${len(params)}")
+
+    sql = ELIGIBILITY_SQL.format(asset_filter="".join(f"\n  AND {f}" for f in filters))
+    if limit is not None:
+        params.append(limit)
+        sql += f"LIMIT ${len(params)}\n"
+
+    rows = await db.query_raw(sql, *params)
+    for row in rows:
+        row["certificates"] = _as_list(row.get("certificates"))
+        row["critical_work_orders"] = _as_list(row.get("critical_work_orders"))
+        row["active_campaigns"] = _as_list(row.get("active_campaigns"))
+    return rows
+
+# Latest DISTANCE_KM reading for every trainset in one pass. Served by
+# idx_meter_readings_latest (asset_id, meter_type, reading_date DESC, reading_value),
+# which delivers rows already in DISTINCT ON order and covers reading_value,
+# so no sort and no heap access are needed.
+LATEST_DISTANCE_SQL = """
+SELECT DISTINCT ON (m.asset_id) m.asset_id, m.reading_value
+FROM meter_readings m
+JOIN assets a ON a.asset_id = m.asset_id
+WHERE a.asset_type = 'TRAINSET'
+  AND m.meter_type = 'DISTANCE_KM'
+ORDER BY m.asset_id, m.reading_date DESC
+"""
+
+async def fetch_latest_distance_readings() -> Dict[str, float]:
+    """asset_id -> latest DISTANCE_KM reading for every trainset that has one."""
+    rows = await db.query_raw(LATEST_DISTANCE_SQL)
+    return {row["asset_id"]: float(row["reading_value"]) for row in rows}
+
+async def fetch_latest_change_id() -> int:
+    """Highest change_id in the fleet_changes log (0 when empty)."""
+    rows = await db.query_raw("SELECT COALESCE(MAX(change_id), 0) AS change_id FROM fleet_changes")
+    return int(rows[0]["change_id"])
+
+async def fetch_change_log_position(window: int) -> Tuple[int, int]:
+    """
+    (highest change_id, number of entries among the last `window` ids) of the
+    fleet_changes log. The count still moves when a slow transaction commits
+    an id just below the highest one. Both are primary-key range reads, so
+    the cost does not grow with the log.
+    """
+    rows = await db.query_raw(
+        """
+        SELECT COALESCE(MAX(change_id), 0) AS change_id, COUNT(*) AS recent_changes
+        FROM fleet_changes
+        WHERE change_id > (SELECT COALESCE(MAX(change_id), 0) FROM fleet_changes) - $1
+        """,
+        window
+    )
+    return int(rows[0]["change_id"]), int(rows[0]["recent_changes"])
+
+async def prune_fleet_changes(retention_days: int, keep_last: int) -> int:
+    """
+    Delete fleet_changes entries older than `retention_days`, except the last
+    `keep_last` ids, which incremental refreshes re-read. Returns the number
+    of rows deleted. Old entries are found through idx_fleet_changes_changed_at.
+    """
+    return await db.execute_raw(
+        """
+        DELETE FROM fleet_changes
+        WHERE changed_at < now() - make_interval(days => $1)
+          AND change_id <= (SELECT COALESCE(MAX(change_id), 0) FROM fleet_changes) - $2
+        """,
+        retention_days,
+        keep_last
+    )
+
+async def fetch_fleet_changes(after_change_id: int) -> List[Tuple[int, str]]:
+    """(change_id, asset_id) for every fleet_changes entry above `after_change_id`, oldest first."""
+    rows = await db.query_raw(
+        """
+        SELECT change_id, asset_id
+        FROM fleet_changes
+        WHERE change_id > $1
+        ORDER BY change_id
+        """,
+        after_change_id
+    )
+    return [(int(row["change_id"]), row["asset_id"]) for row in rows]
+
+async def fetch_first_certificate_expiries(start: date, nights: int) -> List[Dict]:
+    """
+    Earliest certificate expiring within [start, start + nights) for each asset,
+    via a range scan on idx_certificates_expiry.
+    """
+    return await db.query_raw(
+        """
+        SELECT DISTINCT ON (asset_id) asset_id, certificate_type, expiry_date
+        FROM asset_certificates
+        WHERE expiry_date >= $1::date
+          AND expiry_date < $1::date + $2::int
+        ORDER BY asset_id, expiry_date, cert_id
+        """,
+        start.isoformat(),
+        nights
+    )
+
+async def fetch_campaign_windows(start: date, end: date) -> List[Dict]:
+    """Branding campaigns whose [start_date, end_date] overlaps [start, end]."""
+    return await db.query_raw(
+        """
+        SELECT campaign_id, asset_id, advertiser_name, start_date, end_date
+        FROM branding_campaigns
+        WHERE start_date <= $2::date
+          AND end_date >= $1::date
+        """,
+        start.isoformat(),
+        end.isoformat()
+    )
+
+async def fetch_campaign_deficits(start: date, end: date) -> List[Dict]:
+    """Campaigns overlapping [start, end] that still owe branding hours, with their penalty."""
+    return await db.query_raw(
+        """
+        SELECT campaign_id, asset_id, advertiser_name, start_date, end_date,
+               COALESCE(minimum_hours_required, 0) - COALESCE(actual_hours_served, 0) AS deficit_hours,
+               COALESCE(penalty_amount, 0) AS penalty_amount
+        FROM branding_campaigns
+        WHERE start_date <= $2::date
+          AND end_date >= $1::date
+          AND COALESCE(actual_hours_served, 0) < COALESCE(minimum_hours_required, 0)
+        """,
+        start.isoformat(),
+        end.isoformat()
+    )
+
+LAYOUT_COLUMNS = "location_id, location_name, location_type, parent_location, depot_capacity, track_sequence, move_cost"
+
+async def fetch_locations() -> List[Dict]:
+    """All locations with their parent, stabling capacity and track layout fields."""
+    return await db.query_raw(f"SELECT {LAYOUT_COLUMNS} FROM locations ORDER BY location_id")
+
+async def fetch_layout_fingerprint() -> str:
+    """Hash of every layout field in the locations table; changes whenever the layout does."""
+    rows = await db.query_raw(
+        f"""
+        SELECT md5(COALESCE(string_agg(concat_ws('|', {LAYOUT_COLUMNS}), ',' ORDER BY location_id), '')) AS fingerprint
+        FROM locations
+        """
+    )
+    return rows[0]["fingerprint"]
+
+FLEET_FINGERPRINT_SQL = f"""
+SELECT md5(concat_ws('|',
+    (SELECT concat_ws(',', COUNT(*), MAX(created_date), MAX(modified_date)) FROM assets),
+    (SELECT concat_ws(',', COUNT(*), MAX(created_date), MAX(actual_start), MAX(actual_finish)) FROM work_orders),
+    (SELECT concat_ws(',', COUNT(*), MAX(created_date), MAX(expiry_date)) FROM asset_certificates),
+    (SELECT MAX(created_date)::text FROM meter_readings),
+    (SELECT concat_ws(',', COUNT(*), MAX(created_date), SUM(actual_hours_served)) FROM branding_campaigns),
+    (SELECT string_agg(concat_ws('|', {LAYOUT_COLUMNS}), ',' ORDER BY location_id) FROM locations)
+)) AS fingerprint
+"""
+
+async def fetch_fleet_fingerprint() -> str:
+    """
+    Hash of row counts and latest created/modified timestamps of every table
+    the schedule reads, plus the depot layout. In-place edits that leave no
+    timestamp (e.g. a work-order status or priority change) are caught by the
+    fleet_changes log instead (fetch_change_log_position).
+    MAX(created_date) on meter_readings is served by idx_meter_readings_created.
+    """
+    rows = await db.query_raw(FLEET_FINGERPRINT_SQL)
+    return rows[0]["fingerprint"]
@@ -41,7 +41,7 @@ class EnhancedMLPipeline(RiskPredictor):
             days_since_maint=train_data.get('days_since_maint', 0),
             current_mileage=train_data.get('current_mileage', 0.0),
             prediction_timestamp=datetime.now(),
-            model_version=getattr(self, 'model_version', '1.0')
+            model_version=self.current_bundle().version
         )
         
         if not self.ai_enabled:
@@ -59,7 +59,9 @@ class EnhancedMLPipeline(RiskPredictor):
             
             # Get historical context for refinement
             historical_context = await self._get_historical_context(train_data['asset_id'])
-            asset_specs = train_data.get('asset_specifications', [])
+            asset_specs = train_data.get('asset_specifications')
+            if asset_specs is None:
+                asset_specs = await self._get_asset_specifications(train_data['asset_id'])
             
             # Apply AI refinement
             refined_prediction = await self.ollama_client.refine_prediction(
@@ -108,6 +110,17 @@ class EnhancedMLPipeline(RiskPredictor):
             logger.error(f"Error getting historical context: {e}")
             return []
     
+    async def _get_asset_specifications(self, asset_id: str) -> List:
+        """Fetch component specifications for AI context (not carried in fleet state)."""
+        try:
+            from app.db.client import db
+            
+            return await db.asset_specifications.find_many(where={"asset_id": asset_id})
+            
+        except Exception as e:
+            logger.error(f"Error getting asset specifications: {e}")
+            return []
+    
     def _calculate_priority(self, risk_score: float) -> str:
         """Calculate priority level based on risk score."""
         if risk_score >= 0.8:
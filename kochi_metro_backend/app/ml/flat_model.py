@@ -0,0 +1,265 @@
+"""
+Array-based serving form of the gradient-boosting risk model.
+
+export_risk_model() flattens a trained binary GradientBoostingClassifier and
+its StandardScaler into contiguous NumPy arrays. The trees are concatenated
+into one node table (feature, threshold, left, right, value) with a root
+offset per tree. Leaves point to themselves, so every sample can take
+exactly `depth` steps. The learning rate is folded into the leaf values, and
+the model's initial raw prediction is kept as one offset.
+
+FlatRiskModel evaluates every tree for every sample at once: one gather per
+level, then a sum over trees and the logistic link. Samples are cast to
+float32 before the threshold comparisons, as sklearn's trees do, so each
+sample reaches the same leaves as in sklearn. Exports are checked against
+predict_proba (MATCH_TOLERANCE) before they are saved.
+
+The saved .npz needs only NumPy to load, so serving works even when the
+joblib artifacts were written by a different sklearn version. arrays() also
+includes the evaluator's exit tables, so from_arrays() can serve straight
+from memory-mapped files without rebuilding them (see model_registry).
+"""
+import os
+import tempfile
+import warnings
+from typing import Dict, Optional
+import numpy as np
+from scipy.special import expit
+
+MATCH_TOLERANCE = 1e-9
+BLOCK_BYTES = 128 * 1024  # Size of the (samples x trees) masks per evaluation block; keeps them in cache
+
+# Check grid for exports: mileage (km) x days since maintenance
+CHECK_MILEAGE = np.linspace(0, 300000, 61)
+CHECK_DAYS = np.arange(0, 731, 5, dtype=float)
+
+def engineered_matrix(mileage: np.ndarray, days_since_maint: np.ndarray) -> np.ndarray:
+    """Model features in training column order, as RiskPredictor.engineer_features derives them."""
+    return np.column_stack([
+        mileage,
+        days_since_maint,
+        mileage / (days_since_maint + 1),
+        np.square(mileage),
+        np.square(days_since_maint),
+        mileage * days_since_maint
+    ])
+
+def atomic_savez(path: str, arrays: Dict[str, np.ndarray]):
+    """Write `arrays` to an .npz file atomically, so readers never see a partial file."""
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz.tmp")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+class FlatRiskModel:
+    """Scaler plus boosted trees as flat arrays, with a batched pure-NumPy evaluator."""
+
+    ARRAYS = ('mean', 'scale', 'feature', 'threshold', 'left', 'right', 'value', 'roots', 'init_raw', 'depth')
+
+    def __init__(self, mean, scale, feature, threshold, left, right, value, roots, init_raw, depth,
+                 exit_tables: Optional[Dict[str, np.ndarray]] = None):
+        self.mean = np.ascontiguousarray(mean, dtype=np.float64)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float64)
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.intp)
+        self.right = np.ascontiguousarray(right, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.init_raw = float(init_raw)
+        self.depth = int(depth)
+        if exit_tables is None:
+            self._build_exit_tables()
+        else:
+            self._use_exit_tables(exit_tables)
+
+    def _build_exit_tables(self):
+        """
+        Leaf bitmasks for the evaluator. Leaves of each tree are numbered left
+        to right; a split a sample fails (goes right) rules out the leaves
+        of its left subtree, and the sample exits at the leftmost leaf left.
+        Per feature, splits are sorted by threshold, so the splits a value
+        fails are a prefix, and the AND of their masks per tree is one
+        precomputed row found by searchsorted.
+        """
+        trees = len(self.roots)
+        leaf_values = [[] for _ in range(trees)]
+        split_tree, split_mask = np.zeros(len(self.feature), dtype=np.intp), np.zeros(len(self.feature), dtype=np.uint64)
+        internal = np.zeros(len(self.feature), dtype=bool)
+        for tree, root in enumerate(self.roots.tolist()):
+            # Post-order walk: returns the (first, last) leaf numbers under a node
+            def walk(node):
+                if self.left[node] == node:
+                    leaf_values[tree].append(self.value[node])
+                    return len(leaf_values[tree]) - 1, len(leaf_values[tree]) - 1
+                first, middle = walk(self.left[node])
+                _, last = walk(self.right[node])
+                if middle >= 64:
+                    raise ValueError("Trees with more than 64 leaves cannot be flattened")
+                internal[node] = True
+                split_tree[node] = tree
+                split_mask[node] = ((1 << 64) - 1) ^ ((1 << (middle + 1)) - 1) ^ ((1 << first) - 1)
+                return first, last
+            walk(root)
+            if len(leaf_values[tree]) > 64:
+                raise ValueError("Trees with more than 64 leaves cannot be flattened")
+
+        self._leaf_values = np.zeros((trees, max(len(values) for values in leaf_values)))
+        for tree, values in enumerate(leaf_values):
+            self._leaf_values[tree, :len(values)] = values
+        self._leaf_offsets = np.arange(trees) * self._leaf_values.shape[1]
+
+        # 32-bit masks halve the memory traffic whenever every tree fits
+        self._mask_dtype = np.uint32 if self._leaf_values.shape[1] <= 32 else np.uint64
+        self._float_dtype = np.float32 if self._mask_dtype is np.uint32 else np.float64
+        all_leaves = np.iinfo(self._mask_dtype).max
+        self._splits = []  # per feature: (sorted thresholds, exit mask rows)
+        for feature in range(len(self.mean)):
+            nodes = np.flatnonzero(internal & (self.feature == feature))
+            nodes = nodes[np.argsort(self.threshold[nodes], kind='stable')]
+            masks = np.full((len(nodes) + 1, trees), all_leaves, dtype=self._mask_dtype)
+            masks[np.arange(1, len(nodes) + 1), split_tree[nodes]] = split_mask[nodes].astype(self._mask_dtype)
+            self._splits.append((self.threshold[nodes], np.bitwise_and.accumulate(masks, axis=0)))
+
+    def _use_exit_tables(self, tables: Dict[str, np.ndarray]):
+        """Adopt tables from arrays() as they are, without copying (they may be read-only maps)."""
+        self._leaf_values = tables['leaf_values']
+        self._leaf_offsets = np.arange(len(self.roots)) * self._leaf_values.shape[1]
+        self._splits = [
+            (tables[f'split_thresholds_{feature}'], tables[f'split_masks_{feature}']) for feature in range(len(self.mean))
+        ]
+        self._mask_dtype = self._splits[0][1].dtype.type
+        self._float_dtype = np.float32 if self._mask_dtype is np.uint32 else np.float64
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Every array of the model, the exit tables included."""
+        arrays = {name: np.asarray(getattr(self, name)) for name in self.ARRAYS}
+        arrays['leaf_values'] = self._leaf_values
+        for feature, (thresholds, masks) in enumerate(self._splits):
+            arrays[f'split_thresholds_{feature}'] = thresholds
+            arrays[f'split_masks_{feature}'] = masks
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "FlatRiskModel":
+        """Model from arrays(), reusing its exit tables."""
+        tables = {name: array for name, array in arrays.items() if name not in cls.ARRAYS}
+        return cls(**{name: arrays[name] for name in cls.ARRAYS}, exit_tables=tables)
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None) -> "FlatRiskModel":
+        """Flatten a fitted binary GradientBoostingClassifier and optional StandardScaler."""
+        if model.estimators_.shape[1] != 1:
+            raise ValueError("Only binary gradient-boosting models can be flattened")
+        n_features = model.n_features_in_
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            roots.append(offset)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(offset + np.where(leaf, nodes, tree.children_left))
+            rights.append(offset + np.where(leaf, nodes, tree.children_right))
+            values.append(model.learning_rate * tree.value[:, 0, 0])
+            depth = max(depth, tree.max_depth)
+            offset += tree.node_count
+
+        flat = cls(
+            mean=np.zeros(n_features) if mean is None else mean,
+            scale=np.ones(n_features) if scale is None else scale,
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots),
+            init_raw=0.0,
+            depth=depth
+        )
+        # The initial raw prediction is whatever the trees leave unexplained
+        # (the probe is the feature mean, which scales to the origin)
+        probe = flat.mean[np.newaxis, :]
+        scaled_probe = (probe - flat.mean) / flat.scale
+        flat.init_raw = (
+            float(model.decision_function(_model_input(model, scaled_probe))[0]) - float(flat.decision_function(probe)[0])
+        )
+        return flat
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Raw (log-odds) scores for unscaled feature rows."""
+        # Trees compare float32 features against float64 thresholds
+        scaled = ((np.asarray(X, dtype=np.float64) - self.mean) / self.scale).astype(np.float32).astype(np.float64)
+        block = max(64, BLOCK_BYTES // (len(self.roots) * np.dtype(self._mask_dtype).itemsize))
+        if len(scaled) <= block:
+            return self._raw_block(scaled)
+        return np.concatenate([
+            self._raw_block(scaled[start:start + block]) for start in range(0, len(scaled), block)
+        ])
+
+    def _raw_block(self, scaled: np.ndarray) -> np.ndarray:
+        remaining = None
+        for feature, (thresholds, masks) in enumerate(self._splits):
+            # Splits with threshold < x send the sample right
+            rows = masks.take(np.searchsorted(thresholds, scaled[:, feature], side='left'), axis=0)
+            remaining = rows if remaining is None else np.bitwise_and(remaining, rows, out=remaining)
+        # Lowest set bit, then its position (exact: a power of two has a bare exponent)
+        lowest = remaining & (~remaining + self._mask_dtype(1))
+        leaf = np.frexp(lowest.astype(self._float_dtype))[1] - 1
+        return self.init_raw + self._leaf_values.ravel().take(leaf + self._leaf_offsets).sum(axis=1)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Failure probability (positive class) for unscaled feature rows."""
+        return expit(self.decision_function(X))
+
+    def save(self, path: str):
+        atomic_savez(path, {name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path: str) -> "FlatRiskModel":
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in cls.ARRAYS})
+
+def _model_input(model, scaled: np.ndarray):
+    """Scaled rows in the form the model was fitted on (a named frame if it was fitted on one)."""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        return scaled
+    import pandas as pd
+    return pd.DataFrame(scaled, columns=names)
+
+def max_deviation(flat: FlatRiskModel, model, scaler, X: np.ndarray) -> float:
+    """Largest |flat - sklearn| positive-class probability over the rows of X."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        scaled = scaler.transform(X) if scaler is not None else X
+        expected = model.predict_proba(_model_input(model, scaled))[:, 1]
+    return float(np.max(np.abs(flat.predict_proba(X) - expected), initial=0.0))
+
+def export_risk_model(model, scaler, path: Optional[str] = None, X: Optional[np.ndarray] = None) -> FlatRiskModel:
+    """
+    Flatten the model, check it against predict_proba on a mileage x days
+    grid (plus X, the training features, if given) and save it to `path`
+    if one is given.
+    """
+    flat = FlatRiskModel.from_sklearn(model, scaler)
+    mileage, days = np.meshgrid(CHECK_MILEAGE, CHECK_DAYS)
+    check = engineered_matrix(mileage.ravel(), days.ravel())
+    if X is not None:
+        check = np.vstack([check, np.asarray(X, dtype=np.float64)])
+    deviation = max_deviation(flat, model, scaler, check)
+    if deviation > MATCH_TOLERANCE:
+        raise ValueError(f"Flattened model deviates from predict_proba by {deviation:.3g}")
+    if path is not None:
+        flat.save(path)
+    return flat
@@ -0,0 +1,351 @@
+"""
+Versioned model registry.
+
+Every trained model is published as an immutable version directory:
+
+    versions/<version>/manifest.json     source, metrics, file sizes and SHA-256 digests
+    versions/<version>/risk_model.joblib, scaler.joblib
+    versions/<version>/flat/*.npy        FlatRiskModel arrays, exit tables included
+    versions/<version>/surface/*.npy     RiskSurface, when one was exported
+    CURRENT                              {"version", "previous", "promoted_at"}
+    LEGACY_IMPORT                        outcome of the last import of pre-registry files
+
+A version is written to a staging directory, made read-only and renamed into
+versions/, so it is either complete or absent. Promotion checks the digests
+and replaces CURRENT with os.replace, which is atomic; rolling back promotes
+"previous" again, with no retraining.
+
+Arrays are loaded with mmap_mode='r', so worker processes share one copy of
+them through the page cache. Within a process each version is loaded once
+and the ModelBundle is shared by every RiskPredictor. Predictors look at
+CURRENT at most every POINTER_TTL_S. A newly promoted version that is not
+loaded yet is loaded on a background thread, and requests keep using the
+old bundle until it is ready, so inference never waits on a promotion.
+
+Pre-registry model files are imported once per registry, not once per
+process: the first process takes a file lock, publishes and promotes them,
+so other workers find CURRENT and only read. A failed import is recorded in
+LEGACY_IMPORT (see status()) and retried on the next start.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+import joblib
+import numpy as np
+from app.ml.flat_model import FlatRiskModel
+from app.ml.risk_surface import RISK_SERVING, RiskSurface
+
+REGISTRY_DIR = os.getenv(
+    "KMRL_MODEL_REGISTRY", os.path.join(os.path.dirname(__file__), "models", "registry")
+)
+POINTER_TTL_S = float(os.getenv("KMRL_MODEL_POINTER_TTL_S", "1.0"))
+LOADED_VERSIONS = 2  # Bundles kept per process: the current one and the one it replaced
+
+MODEL_FILE = "risk_model.joblib"
+SCALER_FILE = "scaler.joblib"
+FLAT_DIR = "flat"
+SURFACE_DIR = "surface"
+MANIFEST_FILE = "manifest.json"
+
+class ModelBundle(NamedTuple):
+    """Serving artifacts of one registry version; replaced as a whole, never mutated."""
+    version: Optional[str]
+    model: object = None
+    scaler: object = None
+    flat_model: Optional[FlatRiskModel] = None
+    risk_surface: Optional[RiskSurface] = None
+    manifest: Dict = {}
+
+EMPTY_BUNDLE = ModelBundle(None)
+
+def _save_arrays(directory: str, arrays: Dict[str, np.ndarray]):
+    os.makedirs(directory)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+
+def _load_arrays(directory: str) -> Dict[str, np.ndarray]:
+    """Read-only memory maps of every array in `directory` (as plain ndarrays)."""
+    return {
+        name[:-len(".npy")]: np.asarray(np.load(os.path.join(directory, name), mmap_mode='r'))
+        for name in os.listdir(directory) if name.endswith(".npy")
+    }
+
+def _digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def _files(directory: str) -> List[str]:
+    """Artifact paths relative to a version directory, manifest excluded."""
+    return sorted(
+        os.path.relpath(os.path.join(root, name), directory)
+        for root, _, names in os.walk(directory) for name in names if name != MANIFEST_FILE
+    )
+
+def _write_json(path: str, content: Dict):
+    """Replace `path` atomically."""
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".json.tmp")
+    try:
+        with os.fdopen(handle, "w") as f:
+            json.dump(content, f, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+class ModelRegistry:
+    def __init__(self, root: str = REGISTRY_DIR):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+        self.pointer_path = os.path.join(root, "CURRENT")
+        self.import_path = os.path.join(root, "LEGACY_IMPORT")
+        os.makedirs(self.versions_dir, exist_ok=True)
+        self._opened: Optional[ModelBundle] = None  # Bundle loaded by the first open() in this process
+        self._open_lock = threading.Lock()
+        self._loaded: "OrderedDict[str, ModelBundle]" = OrderedDict()
+        self._loading = set()  # Versions being loaded on a background thread
+        self._failed = set()  # Versions that could not be loaded; not retried
+        self._lock = threading.Lock()
+
+    def _version_dir(self, version: str) -> str:
+        if not version or os.sep in version or version.startswith("."):
+            raise KeyError(version)
+        return os.path.join(self.versions_dir, version)
+
+    def publish(self, model, scaler, flat_model: Optional[FlatRiskModel] = None,
+                risk_surface: Optional[RiskSurface] = None, source: str = "", metrics: Optional[Dict] = None) -> str:
+        """Write a new immutable version and return its id. Does not promote it."""
+        version = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        staging = tempfile.mkdtemp(dir=self.versions_dir, prefix=".staging-")
+        try:
+            if model is not None:
+                joblib.dump(model, os.path.join(staging, MODEL_FILE))
+            if scaler is not None:
+                joblib.dump(scaler, os.path.join(staging, SCALER_FILE))
+            if flat_model is not None:
+                _save_arrays(os.path.join(staging, FLAT_DIR), flat_model.arrays())
+            if risk_surface is not None:
+                _save_arrays(os.path.join(staging, SURFACE_DIR), risk_surface.arrays())
+            files = {
+                name: {"bytes": os.path.getsize(os.path.join(staging, name)), "sha256": _digest(os.path.join(staging, name))}
+                for name in _files(staging)
+            }
+            _write_json(os.path.join(staging, MANIFEST_FILE), {
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "source": source,
+                "metrics": metrics,
+                "model_class": type(model).__name__ if model is not None else None,
+                "flat_model": flat_model is not None,
+                "risk_surface": None if risk_surface is None else {
+                    "quantile_error": risk_surface.quantile_error, "max_error": risk_surface.max_error
+                },
+                "files": files
+            })
+            for name in files:
+                os.chmod(os.path.join(staging, name), 0o444)
+            os.chmod(os.path.join(staging, MANIFEST_FILE), 0o444)
+            os.rename(staging, self._version_dir(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return version
+
+    def manifest(self, version: str) -> Dict:
+        try:
+            with open(os.path.join(self._version_dir(version), MANIFEST_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(version)
+
+    def versions(self) -> List[Dict]:
+        """Manifests of every published version, oldest first."""
+        return [
+            self.manifest(name) for name in sorted(os.listdir(self.versions_dir)) if not name.startswith(".")
+        ]
+
+    def verify(self, version: str):
+        """Raise ValueError unless every artifact matches the manifest."""
+        directory = self._version_dir(version)
+        files = self.manifest(version)["files"]
+        if set(files) != set(_files(directory)):
+            raise ValueError(f"Model version {version} does not match its manifest")
+        for name, expected in files.items():
+            if _digest(os.path.join(directory, name)) != expected["sha256"]:
+                raise ValueError(f"Model version {version}: {name} is corrupted")
+
+    def current(self) -> Optional[Dict]:
+        """The CURRENT pointer, or None before the first promotion."""
+        try:
+            with open(self.pointer_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def promote(self, version: str) -> Dict:
+        """Make `version` current. Requests pick it up without waiting for it to load."""
+        self.verify(version)
+        with self._lock:
+            current = self.current()
+            pointer = {
+                "version": version,
+                "previous": current["version"] if current else None,
+                "promoted_at": datetime.now().isoformat()
+            }
+            _write_json(self.pointer_path, pointer)
+        return pointer
+
+    def rollback(self) -> Dict:
+        """Promote the version that the current one replaced."""
+        current = self.current()
+        if not current or not current.get("previous"):
+            raise ValueError("No previous model version to roll back to")
+        return self.promote(current["previous"])
+
+    def status(self) -> Dict:
+        """The CURRENT pointer, every published version and the last pre-registry import attempt."""
+        pointer = self.current() or {}
+        try:
+            with open(self.import_path) as f:
+                legacy_import = json.load(f)
+        except FileNotFoundError:
+            legacy_import = None
+        return {
+            "current": pointer.get("version"),
+            "previous": pointer.get("previous"),
+            "promoted_at": pointer.get("promoted_at"),
+            "versions": self.versions(),
+            "legacy_import": legacy_import
+        }
+
+    def import_once(self, importer: Callable[[], Optional[str]]):
+        """
+        Before the first promotion, run `importer` (which may publish a
+        version and return its id, or None when there is nothing to import)
+        and promote what it returns. Other processes wait on the file lock,
+        then find CURRENT and skip it. Failures are recorded in LEGACY_IMPORT
+        and, as long as nothing is promoted, the import runs again next start.
+        """
+        with open(os.path.join(self.root, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self.current() is not None:
+                    return
+                try:
+                    version = importer()
+                    if version is None:
+                        return
+                    self.promote(version)
+                    outcome = {"version": version, "error": None}
+                except (OSError, ValueError, KeyError, ImportError) as e:
+                    print(f"Importing pre-registry model files failed ({e}). Retrying on the next start.")
+                    outcome = {"version": None, "error": str(e)}
+                _write_json(self.import_path, {**outcome, "attempted_at": datetime.now().isoformat()})
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def open(self, importer: Callable[[], Optional[str]]) -> ModelBundle:
+        """
+        The bundle to start serving with. The first call in a process runs
+        import_once(importer) and loads the current version; later calls
+        (other RiskPredictor instances) share the loaded bundle.
+        """
+        with self._open_lock:
+            if self._opened is None:
+                self.import_once(importer)
+                self._opened = self._open_current()
+        return self.current_bundle() or self._opened
+
+    def _open_current(self) -> ModelBundle:
+        pointer = self.current()
+        if pointer is None:
+            print("No model in the registry. Train one to enable ML risk.")
+            return EMPTY_BUNDLE
+        try:
+            bundle = self.load(pointer["version"])
+            print(f"Risk model version {pointer['version']} loaded.")
+            return bundle
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Model loading failed ({e}). Train a new model or roll back.")
+            return EMPTY_BUNDLE
+
+    def load(self, version: str) -> ModelBundle:
+        """The bundle for `version`, loaded once per process."""
+        with self._lock:
+            bundle = self._loaded.get(version)
+            if bundle is not None:
+                self._loaded.move_to_end(version)
+                return bundle
+        bundle = self._read(version)
+        with self._lock:
+            bundle = self._loaded.setdefault(version, bundle)
+            self._loaded.move_to_end(version)
+            while len(self._loaded) > LOADED_VERSIONS:
+                self._loaded.popitem(last=False)
+        return bundle
+
+    def current_bundle(self) -> Optional[ModelBundle]:
+        """
+        The bundle of the current version if it is loaded. Otherwise starts
+        loading it in the background and returns None (keep serving the old one).
+        """
+        pointer = self.current()
+        if pointer is None:
+            return None
+        version = pointer["version"]
+        with self._lock:
+            bundle = self._loaded.get(version)
+            if bundle is not None or version in self._loading or version in self._failed:
+                return bundle
+            self._loading.add(version)
+        threading.Thread(target=self._load_in_background, args=(version,), daemon=True).start()
+        return None
+
+    def _load_in_background(self, version: str):
+        try:
+            self.load(version)
+        except Exception as e:
+            print(f"Loading model version {version} failed ({e}). Keeping the previous version.")
+            with self._lock:
+                self._failed.add(version)
+        finally:
+            with self._lock:
+                self._loading.discard(version)
+
+    def _read(self, version: str) -> ModelBundle:
+        directory = self._version_dir(version)
+        manifest = self.manifest(version)
+        model = scaler = None
+        try:
+            if os.path.exists(os.path.join(directory, MODEL_FILE)):
+                model = joblib.load(os.path.join(directory, MODEL_FILE), mmap_mode='r')
+            if os.path.exists(os.path.join(directory, SCALER_FILE)):
+                scaler = joblib.load(os.path.join(directory, SCALER_FILE), mmap_mode='r')
+        except (ValueError, ImportError, AttributeError) as e:
+            # Written by another sklearn version; the flattened model still serves
+            print(f"Model version {version}: sklearn artifacts not loadable ({e}).")
+            model = scaler = None
+
+        flat_model = None
+        if os.path.isdir(os.path.join(directory, FLAT_DIR)):
+            flat_model = FlatRiskModel.from_arrays(_load_arrays(os.path.join(directory, FLAT_DIR)))
+        risk_surface = None
+        if RISK_SERVING == "surface":
+            if os.path.isdir(os.path.join(directory, SURFACE_DIR)):
+                risk_surface = RiskSurface(**_load_arrays(os.path.join(directory, SURFACE_DIR)))
+            else:
+                print(f"Model version {version} has no risk surface. Serving with the model.")
+        return ModelBundle(version, model, scaler, flat_model, risk_surface, manifest)
+
+# Create a single, reusable instance
+model_registry = ModelRegistry()
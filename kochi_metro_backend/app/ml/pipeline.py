@@ -1,44 +1,144 @@
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
-from sklearn.preprocessing import StandardScaler
-from imblearn.over_sampling import SMOTE
-from imblearn.combine import SMOTETomek
-from imblearn.pipeline import Pipeline as ImbPipeline
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
+import asyncio
 import os
+import time
 from app.db.client import db
 from app.core.task_manager import update_task_status
+from app.core.snapshot import FleetSnapshot
+from app.ml.flat_model import FlatRiskModel, engineered_matrix, export_risk_model
+from app.ml.model_registry import EMPTY_BUNDLE, POINTER_TTL_S, ModelBundle, model_registry
+from app.ml.training import TrainingCancelled, training_jobs
 
+# Pre-registry artifacts, imported into the model registry on first start
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "models")
 MODEL_PATH = os.path.join(MODEL_DIR, "risk_model.joblib")
 SCALER_PATH = os.path.join(MODEL_DIR, "scaler.joblib")
+FLAT_MODEL_PATH = os.path.join(MODEL_DIR, "risk_model_flat.npz")
+
+# Columns produced by the risk stage
+RISK_COLUMNS = ('ml_risk_score', 'combined_risk_score', 'risk_score', 'risk_category', 'risk_explanation')
+
+# (lower bound on combined risk, category, explanation when nothing more specific applies)
+RISK_LEVELS = (
+    (0.8, 'Critical', "Multiple high-risk indicators"),
+    (0.6, 'High', "Elevated risk indicators"),
+    (0.4, 'Moderate', "Some risk factors present"),
+    (float('-inf'), 'Low', None),
+)
+
+def risk_explanation(level: int, high_rules_risk: bool, high_ml_risk: bool, risk_factors: Sequence[str] = ()) -> str:
+    """Explanation text for a RISK_LEVELS index, the two high-risk flags and the rules' risk factors."""
+    explanations = []
+    
+    # Analyze ML vs Rules contribution
+    if high_rules_risk:
+        explanations.append("High operational risk factors")
+    if high_ml_risk:
+        explanations.append("ML model indicates failure pattern")
+    
+    # Add specific risk factors
+    if risk_factors:
+        explanations.extend(risk_factors[:2])  # Limit to top 2 factors
+
+    fallback = RISK_LEVELS[level][2]
+    if fallback is None:
+        explanations.append("Normal operational parameters")
+    elif not explanations:
+        explanations.append(fallback)
+    return "; ".join(explanations) if explanations else "Standard risk assessment"
+
+# Explanations without risk factors, indexed by level * 4 + high_rules_risk * 2 + high_ml_risk
+RISK_EXPLANATIONS = tuple(
+    risk_explanation(key // 4, bool(key & 2), bool(key & 1)) for key in range(len(RISK_LEVELS) * 4)
+)
+
+def _numeric_column(values: Sequence) -> np.ndarray:
+    """Float column with NaN where a value is missing or not a number."""
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+def _bundle_field(name: str) -> property:
+    """Attribute of the serving bundle; assigning it swaps in a copy of the bundle with that field replaced."""
+    return property(
+        lambda self: getattr(self.bundle, name),
+        lambda self, value: self._install(self.bundle._replace(**{name: value}))
+    )
 
 class RiskPredictor:
+    # Read from the serving bundle; see model_registry
+    model = _bundle_field('model')
+    scaler = _bundle_field('scaler')
+    flat_model = _bundle_field('flat_model')  # Array evaluator used for serving; sklearn is kept for training
+    risk_surface = _bundle_field('risk_surface')  # Interpolated lookup table, only with KMRL_RISK_SERVING=surface
+
     def __init__(self):
-        self.model = None
-        self.scaler = None
-        os.makedirs(MODEL_DIR, exist_ok=True)
+        self.bundle = EMPTY_BUNDLE  # Serving artifacts, replaced as a whole by one assignment
+        self._generation = 0
+        self._pointer_checked_at = float('-inf')
         self.load_model()
 
     def load_model(self):
-        """Loads the trained model and scaler from disk."""
+        """Serve the registry's current version; pre-registry artifacts are imported on first start."""
+        self._install(model_registry.open(self._import_legacy_artifacts))
+
+    def _import_legacy_artifacts(self) -> Optional[str]:
+        """
+        Publish the model files written before the registry existed and return
+        the version, or None if there are none. Raises ValueError if they
+        cannot be loaded, so model_registry.import_once records the failure.
+        """
+        if not os.path.exists(MODEL_PATH):
+            return None
         try:
-            self.model = joblib.load(MODEL_PATH)
-            print("Pre-trained model loaded successfully.")
-            
-            try:
-                self.scaler = joblib.load(SCALER_PATH)
-            except FileNotFoundError:
-                print("Scaler not found. Will be created during training.")
-                self.scaler = None
-        except (FileNotFoundError, ValueError, ImportError) as e:
-            print(f"Model loading failed ({e}). Creating a new model.")
-            self.model = None
-            self.scaler = None
+            model = joblib.load(MODEL_PATH)
+            scaler = joblib.load(SCALER_PATH) if os.path.exists(SCALER_PATH) else None
+            flat_model = self._export_flat_model(model, scaler)
+        except (ValueError, ImportError) as e:
+            if not os.path.exists(FLAT_MODEL_PATH):
+                raise ValueError(f"{MODEL_PATH} could not be loaded: {e}") from e
+            print(f"Model loading failed ({e}). Importing the flattened model only.")
+            model = scaler = None
+            flat_model = FlatRiskModel.load(FLAT_MODEL_PATH)
+        return model_registry.publish(model, scaler, flat_model, source=f"import of {MODEL_PATH}")
+
+    def _install(self, bundle: ModelBundle):
+        if bundle is not self.bundle:
+            self.bundle = bundle
+            self._generation += 1
+
+    def current_bundle(self) -> ModelBundle:
+        """
+        The bundle to answer a request with. Promotions, including those made
+        by other workers, are picked up within POINTER_TTL_S.
+        """
+        now = time.monotonic()
+        if now - self._pointer_checked_at >= POINTER_TTL_S:
+            self._pointer_checked_at = now
+            bundle = model_registry.current_bundle()
+            if bundle is not None and bundle.version != self.bundle.version:
+                self._install(bundle)
+        return self.bundle
+
+    @property
+    def model_version(self) -> int:
+        """Bumped whenever the serving model changes."""
+        self.current_bundle()
+        return self._generation
+
+    def _export_flat_model(self, model, scaler, X=None) -> Optional[FlatRiskModel]:
+        """Flatten a model for serving, checked against it (and on the training features X, if given)."""
+        try:
+            return export_risk_model(model, scaler, X=X)
+        except ValueError as e:
+            print(f"Model flattening failed ({e}). Serving with sklearn.")
+            return None
+
+    def has_model(self, bundle: Optional[ModelBundle] = None) -> bool:
+        """Whether risk requests are answered by the ML model (flattened or sklearn)."""
+        bundle = bundle or self.current_bundle()
+        return bundle.flat_model is not None or bundle.model is not None
             
     async def get_training_data(self):
         """Fetch historical data for training from the database."""
@@ -85,305 +185,173 @@ class RiskPredictor:
         Trains the model on all available data without evaluation.
         This is a faster option when you just want to update the model.
         """
-        try:
-            update_task_status(task_id, "Fetching training data...", 10)
-            data = await self.get_training_data()
-            
-            update_task_status(task_id, "Preparing data...", 20)
-            features = [
-                'mileage_at_event', 
-                'days_since_last_maint', 
-                'mileage_to_days_ratio',
-                'mileage_squared',
-                'days_squared',
-                'interaction'
-            ]
-            target = 'failure_occurred'
-            X = data[features]
-            y = data[target]
-            
-            update_task_status(task_id, "Scaling features...", 30)
-            self.scaler = StandardScaler()
-            X_scaled = self.scaler.fit_transform(X)
-            X_scaled_df = pd.DataFrame(X_scaled, columns=features)
-            
-            update_task_status(task_id, "Balancing classes with SMOTETomek...", 40)
-            smote_tomek = SMOTETomek(random_state=42)
-            X_resampled, y_resampled = smote_tomek.fit_resample(X_scaled_df, y)
-            print(f"Original dataset size: {len(X)}. Resampled size: {len(X_resampled)}")
-            
-            # Class weights to further address imbalance
-            class_counts = np.bincount(y)
-            class_weights = {0: 1, 1: class_counts[0]/class_counts[1] * 2}  # Boost minority class
-            
-            update_task_status(task_id, "Training model with optimized parameters...", 60)
-            self.model = GradientBoostingClassifier(
-                n_estimators=200, 
-                learning_rate=0.1, 
-                max_depth=5,
-                min_samples_split=10,
-                min_samples_leaf=4,
-                subsample=0.8,
-                random_state=42
-            )
-            self.model.fit(X_resampled, y_resampled)
-            
-            update_task_status(task_id, "Saving model and scaler...", 90)
-            joblib.dump(self.model, MODEL_PATH)
-            joblib.dump(self.scaler, SCALER_PATH)
-            
-            update_task_status(task_id, "Completed", 100, result={"message": "Model trained successfully"})
-            
-        except Exception as e:
-            print(f"An error occurred during training for task {task_id}: {e}")
-            update_task_status(task_id, f"Error: {e}", 100, result={"error": str(e)})
+        await self._train(task_id, "train")
 
     async def train_and_evaluate(self, task_id: str):
         """
         Trains and evaluates the model, using advanced techniques to handle imbalanced data,
         and reports progress with detailed metrics.
         """
+        await self._train(task_id, "evaluate")
+
+    async def _train(self, task_id: str, kind: str):
+        """
+        Fetch the training data, fit and publish in the training worker process
+        (see training), then load, promote and serve the new version.
+        """
         try:
             update_task_status(task_id, "Fetching historical data...", 10)
             data = await self.get_training_data()
-            
-            update_task_status(task_id, "Preparing data with feature engineering...", 20)
-            features = [
-                'mileage_at_event', 
-                'days_since_last_maint', 
-                'mileage_to_days_ratio',
-                'mileage_squared',
-                'days_squared',
-                'interaction'
-            ]
-            target = 'failure_occurred'
-            X = data[features]
-            y = data[target]
-            
-            # Use stratified split to maintain class distribution
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=y
-            )
-            
-            # Scale features for better model performance
-            update_task_status(task_id, "Scaling features...", 30)
-            self.scaler = StandardScaler()
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-            
-            # Apply SMOTETomek for better class balance (combines SMOTE with Tomek Links)
-            update_task_status(task_id, "Balancing minority class with SMOTETomek...", 40)
-            smote_tomek = SMOTETomek(random_state=42)
-            X_train_resampled, y_train_resampled = smote_tomek.fit_resample(
-                X_train_scaled, y_train
-            )
-            print(f"Original training set size: {len(X_train)}. Resampled size: {len(X_train_resampled)}")
-
-            # Count class distribution in training data
-            pos_count = sum(y_train)
-            total_count = len(y_train)
-            print(f"Original class distribution - Positive: {pos_count}/{total_count} ({pos_count/total_count*100:.1f}%)")
-            
-            # Define class weights based on class distribution
-            class_weights = {
-                0: 1.0,
-                1: (total_count - pos_count) / pos_count * 2  # More weight to minority class
-            }
-            print(f"Using class weights: {class_weights}")
-
-            update_task_status(task_id, "Training evaluation model...", 60)
-            # Use GradientBoostingClassifier which often performs better on imbalanced data
-            eval_model = GradientBoostingClassifier(
-                n_estimators=200, 
-                learning_rate=0.1, 
-                max_depth=5,
-                min_samples_split=10,
-                min_samples_leaf=4,
-                subsample=0.8,
-                random_state=42
-            )
-            eval_model.fit(X_train_resampled, y_train_resampled)
-            
-            update_task_status(task_id, "Calculating performance scores...", 80)
-            # Get probability predictions for better threshold tuning
-            y_proba = eval_model.predict_proba(X_test_scaled)[:, 1]
-            
-            # Find optimal threshold for F1 score
-            thresholds = np.arange(0.1, 0.9, 0.05)
-            best_f1 = 0
-            best_threshold = 0.5
-            
-            for threshold in thresholds:
-                y_pred_threshold = (y_proba >= threshold).astype(int)
-                f1 = f1_score(y_test, y_pred_threshold)
-                if f1 > best_f1:
-                    best_f1 = f1
-                    best_threshold = threshold
-            
-            print(f"Best threshold: {best_threshold:.2f} with F1: {best_f1:.4f}")
-            
-            # Get predictions with optimal threshold
-            y_pred = (y_proba >= best_threshold).astype(int)
-            
-            # Calculate and print confusion matrix
-            conf_matrix = confusion_matrix(y_test, y_pred)
-            print(f"Confusion Matrix:\n{conf_matrix}")
-            
-            scores = {
-                "records_used_for_test": len(X_test),
-                "accuracy": round(accuracy_score(y_test, y_pred), 3),
-                "precision": round(precision_score(y_test, y_pred), 3),
-                "recall": round(recall_score(y_test, y_pred), 3),
-                "f1_score": round(f1_score(y_test, y_pred), 3),
-                "threshold_used": round(best_threshold, 2),
-                "confusion_matrix": conf_matrix.tolist()
-            }
-            
-            # Retrain the final model on ALL data
-            update_task_status(task_id, "Retraining final model on all data...", 90)
-            X_scaled_full = self.scaler.transform(X)
-            X_resampled_full, y_resampled_full = smote_tomek.fit_resample(X_scaled_full, y)
-            
-            self.model = GradientBoostingClassifier(
-                n_estimators=200, 
-                learning_rate=0.1, 
-                max_depth=5,
-                min_samples_split=10,
-                min_samples_leaf=4,
-                subsample=0.8,
-                random_state=42
-            )
-            self.model.fit(X_resampled_full, y_resampled_full)
-            
-            # Save both model and scaler
-            joblib.dump(self.model, MODEL_PATH)
-            joblib.dump(self.scaler, SCALER_PATH)
+            result = await training_jobs.run(task_id, kind, data)
 
-            update_task_status(task_id, "Completed", 100, result=scores)
+            update_task_status(task_id, "Loading new model version...", 95)
+            version = result["model_version"]
+            bundle = await asyncio.to_thread(model_registry.load, version)
+            await asyncio.to_thread(model_registry.promote, version)
+            self._install(bundle)
 
+            update_task_status(task_id, "Completed", 100, result=result)
+
+        except TrainingCancelled:
+            update_task_status(task_id, "Cancelled", 100, result={"error": "Training cancelled"})
         except Exception as e:
-            print(f"An error occurred during evaluation for task {task_id}: {e}")
+            print(f"An error occurred during {kind} task {task_id}: {e}")
             update_task_status(task_id, f"Error: {e}", 100, result={"error": str(e)})
     
     def predict_risk(self, assets: List[Dict]) -> List[Dict]:
         """
         Hybrid risk prediction combining ML model with hard rules.
         Implements KMRL's requirement for explainable, multi-factor risk assessment.
+        Annotates the given asset dicts in place (see score_snapshot for the non-mutating path).
         """
-        if self.model is None:
+        if not self.has_model():
             print("Warning: Model not available/trained. Using rules-based assessment only.")
-            
-        for asset in assets:
-            try:
-                # Get ML-based risk prediction if model is available
-                if self.model is not None:
-                    ml_risk = self._get_ml_risk_prediction(asset)
-                else:
-                    ml_risk = 0.5  # Neutral score when ML unavailable
-                
-                # Get rules-based risk (already calculated in rules.py)
-                rules_risk = asset.get('rules_risk_score', 0.0)
-                
-                # Hybrid risk calculation with configurable weights
-                # Prioritize rules for safety-critical decisions
-                ml_weight = 0.4
-                rules_weight = 0.6
-                
-                combined_risk = (ml_weight * ml_risk) + (rules_weight * rules_risk)
-                
-                # Update asset with all risk scores
-                asset['ml_risk_score'] = round(ml_risk, 3)
-                asset['combined_risk_score'] = round(combined_risk, 3)
-                asset['risk_score'] = asset['combined_risk_score']  # For backward compatibility
-                
-                # Enhanced risk categorization
-                risk_category, risk_explanation = self._categorize_risk(
-                    combined_risk, ml_risk, rules_risk, asset
-                )
-                
-                asset['risk_category'] = risk_category
-                asset['risk_explanation'] = risk_explanation
-                
-            except Exception as e:
-                print(f"Error predicting risk for asset {asset.get('asset_num', 'unknown')}: {e}")
-                # Fallback to conservative risk assessment
-                asset['ml_risk_score'] = 0.5
-                asset['combined_risk_score'] = max(0.7, asset.get('rules_risk_score', 0.5))
-                asset['risk_score'] = asset['combined_risk_score']
-                asset['risk_category'] = 'High'
-                asset['risk_explanation'] = 'Error in risk calculation - using conservative estimate'
+
+        columns = self.risk_columns(
+            [asset.get('current_mileage') for asset in assets],
+            [asset.get('days_since_maint', 15) for asset in assets],
+            [asset.get('rules_risk_score', 0.0) for asset in assets],
+            [asset.get('risk_factors') for asset in assets]
+        )
+        for index, asset in enumerate(assets):
+            asset.update({name: columns[name][index] for name in RISK_COLUMNS})
         
         return assets
     
-    def _get_ml_risk_prediction(self, asset: Dict) -> float:
-        """Get ML model prediction for a single asset."""
+    def score_snapshot(self, snapshot: FleetSnapshot) -> Dict[str, List]:
+        """
+        Risk stage over an immutable FleetSnapshot.
+        Returns new columns aligned with snapshot.eligible instead of mutating it.
+        """
+        if not self.has_model():
+            print("Warning: Model not available/trained. Using rules-based assessment only.")
+        
+        return self.risk_columns(
+            snapshot.column('current_mileage'),
+            snapshot.column('days_since_maint'),
+            snapshot.column('rules_risk_score'),
+            [asset.risk_factors for asset in snapshot.eligible]
+        )
+
+    def risk_columns(self, mileage: Sequence, days_since_maint: Sequence, rules_risk: Sequence,
+                     risk_factors: Sequence[Optional[Sequence[str]]]) -> Dict[str, List]:
+        """
+        Risk scores, category and explanation for a whole fleet at once:
+        one feature matrix, one scaler call and one model call.
+        Assets whose rules risk is not a number get the conservative fallback.
+        """
+        mileage, days_since_maint, rules_risk = (
+            _numeric_column(mileage), _numeric_column(days_since_maint), _numeric_column(rules_risk)
+        )
+        # Hybrid risk calculation with configurable weights
+        # Prioritize rules for safety-critical decisions
+        ml_weight = 0.4
+        rules_weight = 0.6
+
+        bundle = self.current_bundle()  # One model version for the whole request
+        ml_risk = self._ml_risk_batch(bundle, mileage, days_since_maint) if self.has_model(bundle) \
+            else np.full(len(mileage), 0.5)  # Neutral score when ML unavailable
+        combined_risk = (ml_weight * ml_risk) + (rules_weight * rules_risk)
+        categories, explanations = self._categorize_risk_batch(combined_risk, ml_risk, rules_risk, risk_factors)
+
+        ml_scores = np.round(ml_risk, 3)
+        combined_scores = np.round(combined_risk, 3)
+        failed = np.isnan(rules_risk)
+        if failed.any():
+            # Fallback to conservative risk assessment
+            print(f"Error predicting risk for {int(failed.sum())} assets: rules risk score missing")
+            ml_scores[failed] = 0.5
+            combined_scores[failed] = 0.7
+            for index in np.flatnonzero(failed).tolist():
+                categories[index] = 'High'
+                explanations[index] = 'Error in risk calculation - using conservative estimate'
+
+        combined_scores = combined_scores.tolist()
+        return {
+            'ml_risk_score': ml_scores.tolist(),
+            'combined_risk_score': combined_scores,
+            'risk_score': list(combined_scores),  # For backward compatibility
+            'risk_category': categories,
+            'risk_explanation': explanations
+        }
+    
+    def _ml_risk_batch(self, bundle: ModelBundle, mileage: np.ndarray, days_since_maint: np.ndarray) -> np.ndarray:
+        """ML failure probability for every asset; assets with missing inputs get a neutral 0.5."""
+        ml_risk = np.full(len(mileage), 0.5)
+        valid = np.isfinite(mileage) & np.isfinite(days_since_maint)
+        if not valid.any():
+            return ml_risk
         try:
-            # Check if model is available
-            if self.model is None:
-                print("ML model not available, using conservative risk estimate")
-                return 0.6  # Conservative risk estimate when model unavailable
-                
-            # Prepare features for ML model
-            features_df = pd.DataFrame({
-                'mileage_at_event': [asset['current_mileage']],
-                'days_since_last_maint': [asset.get('days_since_maint', 15)]
-            })
-            
-            # Apply feature engineering
-            features_df['mileage_to_days_ratio'] = features_df['mileage_at_event'] / (features_df['days_since_last_maint'] + 1)
-            features_df['mileage_squared'] = np.square(features_df['mileage_at_event'])
-            features_df['days_squared'] = np.square(features_df['days_since_last_maint'])
-            features_df['interaction'] = features_df['mileage_at_event'] * features_df['days_since_last_maint']
-            
-            # Scale features if scaler is available
-            if self.scaler:
-                features_scaled = self.scaler.transform(features_df)
-                ml_probability = self.model.predict_proba(features_scaled)[0, 1]
-            else:
-                ml_probability = self.model.predict_proba(features_df)[0, 1]
-            
-            return ml_probability
-            
+            if bundle.risk_surface is not None:
+                # Assets inside the surface's grid are answered from it; the rest go to the model
+                surface_risk, inside = bundle.risk_surface.lookup(mileage, days_since_maint)
+                ml_risk[inside] = surface_risk[inside]
+                valid &= ~inside
+                if not valid.any():
+                    return ml_risk
+            ml_risk[valid] = self._model_probability(bundle, mileage[valid], days_since_maint[valid])
         except Exception as e:
             print(f"Error in ML prediction: {e}")
-            return 0.5  # Neutral score on error
+        return ml_risk
+
+    def _model_probability(self, bundle: ModelBundle, mileage: np.ndarray, days_since_maint: np.ndarray) -> np.ndarray:
+        """Failure probability from the flattened evaluator, or from sklearn when there is none."""
+        if bundle.flat_model is not None:
+            return bundle.flat_model.predict_proba(engineered_matrix(mileage, days_since_maint))
+        return self._sklearn_probability(bundle, mileage, days_since_maint)
+
+    def _sklearn_probability(self, bundle: ModelBundle, mileage: np.ndarray, days_since_maint: np.ndarray) -> np.ndarray:
+        """Failure probability from the sklearn model itself."""
+        # Prepare features for ML model
+        features_df = self.engineer_features(pd.DataFrame({
+            'mileage_at_event': mileage,
+            'days_since_last_maint': days_since_maint
+        }))
+
+        # Scale features if scaler is available
+        if bundle.scaler:
+            features_df = bundle.scaler.transform(features_df)
+        return bundle.model.predict_proba(features_df)[:, 1]
     
-    def _categorize_risk(self, combined_risk: float, ml_risk: float, rules_risk: float, asset: Dict) -> Tuple[str, str]:
+    @staticmethod
+    def _categorize_risk_batch(combined_risk: np.ndarray, ml_risk: np.ndarray, rules_risk: np.ndarray,
+                               risk_factors: Sequence[Optional[Sequence[str]]]) -> Tuple[List[str], List[str]]:
         """
         Categorize risk with explainable reasoning based on KMRL requirements.
+        Levels and flags are computed for the whole fleet; the explanation
+        text is looked up, and only assets with risk factors build their own.
         """
-        explanations = []
-        
-        # Analyze ML vs Rules contribution
-        if rules_risk > 0.7:
-            explanations.append("High operational risk factors")
-        if ml_risk > 0.7:
-            explanations.append("ML model indicates failure pattern")
-        
-        # Add specific risk factors
-        risk_factors = asset.get('risk_factors', [])
-        if risk_factors:
-            explanations.extend(risk_factors[:2])  # Limit to top 2 factors
-        
-        # Categorize based on combined risk
-        if combined_risk >= 0.8:
-            category = 'Critical'
-            if not explanations:
-                explanations.append("Multiple high-risk indicators")
-        elif combined_risk >= 0.6:
-            category = 'High'
-            if not explanations:
-                explanations.append("Elevated risk indicators")
-        elif combined_risk >= 0.4:
-            category = 'Moderate'
-            if not explanations:
-                explanations.append("Some risk factors present")
-        else:
-            category = 'Low'
-            explanations.append("Normal operational parameters")
-        
-        explanation = "; ".join(explanations) if explanations else "Standard risk assessment"
-        return category, explanation
+        level = np.select(
+            [combined_risk >= bound for bound, _, _ in RISK_LEVELS[:-1]], range(len(RISK_LEVELS) - 1),
+            len(RISK_LEVELS) - 1
+        )
+        keys = (level * 4 + (rules_risk > 0.7) * 2 + (ml_risk > 0.7)).tolist()
+        categories = [RISK_LEVELS[key // 4][1] for key in keys]
+        explanations = [
+            risk_explanation(key // 4, bool(key & 2), bool(key & 1), factors) if factors else RISK_EXPLANATIONS[key]
+            for key, factors in zip(keys, risk_factors)
+        ]
+        return categories, explanations
 
 # Create a single, reusable instance
 risk_predictor = RiskPredictor()
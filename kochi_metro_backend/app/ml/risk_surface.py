@@ -0,0 +1,126 @@
+"""
+Precomputed risk surface: optional O(1) serving mode for the risk model.
+
+The model reads only current_mileage and days_since_maint; every other
+feature is derived from these two. With KMRL_RISK_SERVING=surface, saving a
+model also tabulates its failure probability on a dense grid: one column per
+day up to SURFACE_MAX_DAYS, and an even mileage grid up to
+SURFACE_MAX_MILEAGE. Requests are then answered by bilinear interpolation,
+which is four array lookups per asset with no sklearn involved. Assets
+outside the grid are still sent to the model.
+
+A boosted-tree model is a step function, so right next to a split no
+interpolation is exact, however fine the grid. The export bound is therefore
+a quantile of the absolute error: SURFACE_ERROR_QUANTILE (1.0 means the
+maximum), over CHECK_POINTS random points, measured against the real model.
+The mileage grid is refined through MILEAGE_CELLS until the bound holds. If
+it never holds, no surface is exported and the model keeps serving.
+"""
+import logging
+import os
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+from app.ml.flat_model import atomic_savez
+
+logger = logging.getLogger(__name__)
+
+RISK_SERVING = os.getenv("KMRL_RISK_SERVING", "model")  # "model" or "surface"
+SURFACE_MAX_ERROR = float(os.getenv("KMRL_RISK_SURFACE_MAX_ERROR", "0.05"))
+SURFACE_ERROR_QUANTILE = float(os.getenv("KMRL_RISK_SURFACE_ERROR_QUANTILE", "0.99"))
+
+SURFACE_MAX_MILEAGE = 300000.0
+SURFACE_MAX_DAYS = 730
+MILEAGE_CELLS = (1024, 2048, 4096, 8192)  # tried in order until the error bound holds
+CHECK_POINTS = 100000
+
+# (mileage, days_since_maint) -> failure probability
+Predictor = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+class RiskSurface:
+    """Failure probability on an even (mileage x days) grid, read by bilinear interpolation."""
+
+    def __init__(self, probability: np.ndarray, max_mileage: float, max_days: float,
+                 quantile_error: float = float("nan"), max_error: float = float("nan")):
+        self.probability = np.ascontiguousarray(probability, dtype=np.float64)
+        self.max_mileage = float(max_mileage)
+        self.max_days = float(max_days)
+        self.mileage_step = self.max_mileage / (self.probability.shape[0] - 1)
+        self.days_step = self.max_days / (self.probability.shape[1] - 1)
+        self.quantile_error = float(quantile_error)
+        self.max_error = float(max_error)
+
+    @classmethod
+    def tabulate(cls, predict: Predictor, mileage_cells: int,
+                 max_mileage: float = SURFACE_MAX_MILEAGE, max_days: int = SURFACE_MAX_DAYS) -> "RiskSurface":
+        mileage, days = np.meshgrid(
+            np.linspace(0, max_mileage, mileage_cells + 1), np.arange(max_days + 1, dtype=float), indexing='ij'
+        )
+        return cls(predict(mileage.ravel(), days.ravel()).reshape(mileage.shape), max_mileage, max_days)
+
+    def lookup(self, mileage: np.ndarray, days_since_maint: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Interpolated probabilities, and which assets fall inside the grid (others are not valid)."""
+        inside = (
+            (mileage >= 0) & (mileage <= self.max_mileage) &
+            (days_since_maint >= 0) & (days_since_maint <= self.max_days)
+        )
+        x = np.where(inside, mileage, 0.0) / self.mileage_step
+        y = np.where(inside, days_since_maint, 0.0) / self.days_step
+        i = np.minimum(x.astype(np.intp), self.probability.shape[0] - 2)
+        j = np.minimum(y.astype(np.intp), self.probability.shape[1] - 2)
+        t, u = x - i, y - j
+
+        table = self.probability.ravel()
+        corner = i * self.probability.shape[1] + j
+        row = self.probability.shape[1]
+        value = (
+            (1 - t) * (1 - u) * table.take(corner) + t * (1 - u) * table.take(corner + row) +
+            (1 - t) * u * table.take(corner + 1) + t * u * table.take(corner + row + 1)
+        )
+        return value, inside
+
+    def check(self, reference: Predictor, quantile: float, points: int = CHECK_POINTS, seed: int = 42):
+        """Record the quantile and maximum absolute error against `reference` at random points."""
+        rng = np.random.default_rng(seed)
+        mileage = rng.uniform(0, self.max_mileage, points)
+        days = rng.integers(0, int(self.max_days) + 1, points).astype(float)
+        error = np.abs(self.lookup(mileage, days)[0] - reference(mileage, days))
+        self.quantile_error = float(np.quantile(error, quantile))
+        self.max_error = float(error.max())
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """The grid and its metadata, as RiskSurface(**arrays) takes them back."""
+        return {
+            "probability": self.probability, "max_mileage": np.float64(self.max_mileage),
+            "max_days": np.float64(self.max_days), "quantile_error": np.float64(self.quantile_error),
+            "max_error": np.float64(self.max_error)
+        }
+
+    def save(self, path: str):
+        atomic_savez(path, self.arrays())
+
+    @classmethod
+    def load(cls, path: str) -> "RiskSurface":
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+def export_risk_surface(evaluate: Predictor, reference: Predictor, path: Optional[str] = None,
+                        max_error: float = SURFACE_MAX_ERROR, quantile: float = SURFACE_ERROR_QUANTILE) -> RiskSurface:
+    """
+    Tabulate `evaluate` on successively finer grids until the error against
+    `reference` (the real model) is within `max_error` at `quantile`, then
+    save the surface to `path` if one is given. Raises ValueError if no grid in MILEAGE_CELLS is
+    accurate enough.
+    """
+    for cells in MILEAGE_CELLS:
+        surface = RiskSurface.tabulate(evaluate, cells)
+        surface.check(reference, quantile)
+        logger.info(f"Risk surface {cells} x {SURFACE_MAX_DAYS} cells: "
+                    f"q{quantile:g} error {surface.quantile_error:.4f}, max {surface.max_error:.4f}")
+        if surface.quantile_error <= max_error:
+            if path is not None:
+                surface.save(path)
+            return surface
+    raise ValueError(
+        f"Risk surface error {surface.quantile_error:.4f} at q{quantile:g} exceeds {max_error} "
+        f"even with {MILEAGE_CELLS[-1]} mileage cells"
+    )
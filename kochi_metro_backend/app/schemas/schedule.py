@@ -1,5 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, Any, Literal
+
+# Per-train explanation detail for the schedule endpoints (see app.core.explanations)
+ExplainMode = Literal["none", "summary", "full"]
 
 # --- Input Schema ---
 class ScheduleRequest(BaseModel):
@@ -8,17 +11,229 @@ class ScheduleRequest(BaseModel):
         gt=0, 
         description="The number of trains required for revenue service."
     )
+    solver: Literal["greedy", "exact"] = Field(
+        "greedy",
+        description="'greedy' takes the top trains by composite score; 'exact' solves the constrained selection."
+    )
+    time_budget_ms: int = Field(
+        2000,
+        gt=0,
+        le=60000,
+        description="Exact solver time budget; on expiry the greedy plan is returned with an optimality-gap report."
+    )
+    enforce_depot_capacity: bool = Field(
+        True,
+        description="Exact solver: standby trains at each depot may not exceed its depot_capacity."
+    )
+    min_trains_per_advertiser: int = Field(
+        0,
+        ge=0,
+        description="Exact solver: minimum in-service trains carrying each active advertiser."
+    )
+    max_high_mileage_in_service: Optional[int] = Field(
+        None,
+        ge=0,
+        description="Exact solver: cap on in-service trains over the maintenance mileage threshold."
+    )
+
+class ParetoRequest(BaseModel):
+    num_trains_for_service: int = Field(
+        ...,
+        gt=0,
+        description="The number of trains required for revenue service."
+    )
+    time_budget_ms: int = Field(2000, gt=0, le=60000, description="Wall-clock budget for the NSGA-II search.")
+    population_size: int = Field(60, ge=8, le=1000)
+    max_plans: int = Field(20, ge=1, le=200, description="Maximum number of Pareto plans returned.")
+    seed: Optional[int] = Field(None, description="Random seed for reproducible fronts.")
+
+class ObjectiveWeights(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    reliability: Optional[float] = Field(None, ge=0)
+    risk: Optional[float] = Field(None, ge=0)
+    branding: Optional[float] = Field(None, ge=0)
+    efficiency: Optional[float] = Field(None, ge=0)
+
+class Scenario(BaseModel):
+    num_trains_for_service: int = Field(..., gt=0)
+    weights: Optional[ObjectiveWeights] = Field(
+        None,
+        description="Overrides for the default objective weights; omitted objectives keep their default."
+    )
+
+class ScenarioRequest(BaseModel):
+    scenarios: List[Scenario] = Field(..., min_length=1, max_length=1000)
+
+class HorizonRequest(BaseModel):
+    num_trains_for_service: int = Field(
+        ...,
+        gt=0,
+        description="The number of trains required for revenue service each day."
+    )
+    days: int = Field(7, ge=1, le=28, description="Planning horizon in days, starting today.")
+    warm_start: bool = Field(True, description="Re-plan from the previous horizon plan when one exists.")
 
 # --- Output Schemas ---
+class ExplanationItem(BaseModel):
+    code: str
+    params: Dict[str, Any]
+
 class TrainDetail(BaseModel):
     asset_num: str
-    reason: str
+    reason: Optional[str] = None
     risk_score: Optional[float] = None
+    explanation: Optional[List[ExplanationItem]] = None
+
+class StablingAssignment(BaseModel):
+    asset_num: str
+    role: str
+    departure_rank: int
+    depot: str
+    track: str
+    position: int
+
+class StablingPlan(BaseModel):
+    assignments: List[StablingAssignment]
+    unassigned: List[str]
+    summary: Dict[str, Any]
+
+class DepartureSlot(BaseModel):
+    slot: int
+    asset_num: str
+    track: Optional[str] = None
+    position: Optional[int] = None
+    blocking_moves: int
+    blockers: List[str]
+
+class DepartureSequence(BaseModel):
+    order: List[DepartureSlot]
+    summary: Dict[str, Any]
 
 class ScheduleResponse(BaseModel):
     service: List[TrainDetail]
     standby: List[TrainDetail]
     maintenance: List[TrainDetail]
+    stabling: Optional[StablingPlan] = None
+    departure_sequence: Optional[DepartureSequence] = None
+    optimization_summary: Optional[Dict[str, Any]] = None
+
+class ParetoPlan(BaseModel):
+    service: List[str]
+    objectives: Dict[str, float]
+    composite_score: float
+
+class ParetoResponse(BaseModel):
+    plans: List[ParetoPlan]
+    maintenance: List[TrainDetail]
+    optimization_summary: Dict[str, Any]
+
+class ScenarioTrain(BaseModel):
+    asset_num: str
+    composite_score: float
+
+class ScenarioPlan(BaseModel):
+    num_trains_for_service: int
+    weights: Dict[str, float]
+    service: List[ScenarioTrain]
+    standby: List[str]
+    objective_means: Dict[str, float]
+    total_composite: float
+
+class ScenarioResponse(BaseModel):
+    scenarios: List[ScenarioPlan]
+    maintenance: List[TrainDetail]
+    optimization_summary: Dict[str, Any]
+
+class HorizonDay(BaseModel):
+    date: str
+    service: List[str]
+    shortfall: int
+
+class HorizonTrain(BaseModel):
+    asset_num: str
+    service_days: int
+    projected_mileage: List[float]
+    branding_hours_planned: float
+    branding_deficit_hours: float
+
+class HorizonResponse(BaseModel):
+    start_date: str
+    days: List[HorizonDay]
+    trains: List[HorizonTrain]
+    maintenance: List[TrainDetail]
+    summary: Dict[str, Any]
+
+class CampaignAllocation(BaseModel):
+    campaign_id: str
+    asset_id: str
+    advertiser: str
+    deficit_hours: float
+    due_hours: float
+    planned_hours: float
+    tonight_hours: float
+    expected_penalty: float
+
+class BrandingPlanResponse(BaseModel):
+    start_date: Optional[str] = None
+    nights: int
+    campaigns: List[CampaignAllocation]
+    summary: Dict[str, Any]
+
+class CounterfactualChange(BaseModel):
+    lever: str
+    field: str
+    current: float
+    required: Optional[float] = None
+    change: Optional[float] = None
+    new_composite: Optional[float] = None
+    cutoff: Optional[float] = Field(
+        None, description="Cutoff new_composite is compared against; below service_cutoff when the change lowers the fleet maximum mileage."
+    )
+    feasible: bool
+
+class StandbyCounterfactual(BaseModel):
+    asset_num: str
+    composite_score: float
+    gap: float = Field(..., description="Composite score short of the service cutoff.")
+    changes: List[CounterfactualChange]
+
+class CounterfactualResponse(BaseModel):
+    service_cutoff: Optional[float] = None
+    cutoff_asset_num: Optional[str] = None
+    standby: List[StandbyCounterfactual]
+    summary: Dict[str, Any]
+
+class ScheduleCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    fingerprint_refreshes: int
+    size: int
+    capacity: int
+    fingerprint_ttl_s: float
+
+# --- Model Registry Schemas ---
+class ModelVersion(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    version: str
+    created_at: str
+    source: str
+    metrics: Optional[Dict[str, Any]] = None
+    model_class: Optional[str] = None
+    flat_model: bool = Field(..., description="Whether the version has the flattened serving form.")
+    risk_surface: Optional[Dict[str, float]] = Field(None, description="Error of the exported risk surface, if any.")
+
+class ModelRegistryStatus(BaseModel):
+    current: Optional[str] = None
+    previous: Optional[str] = Field(None, description="Version a rollback would promote.")
+    promoted_at: Optional[str] = None
+    versions: List[ModelVersion]
+    legacy_import: Optional[Dict[str, Any]] = Field(
+        None, description="Last attempt to import pre-registry model files, with its error if it failed."
+    )
 
 # --- ML Task Schemas ---
 class TaskResponse(BaseModel):
@@ -52,3 +267,41 @@ class AllEvaluationsResponse(BaseModel):
     latest_evaluation: Optional[EvaluationSummary] = None
     completed_tasks: Dict[str, TaskStatus] = {}
 
+
+
+# --- Eligibility Forecast Schemas ---
+class ForecastDrop(BaseModel):
+    asset_num: str
+    reason: str
+
+class ForecastCampaignEnd(BaseModel):
+    asset_num: str
+    advertiser: str
+
+class NightForecast(BaseModel):
+    date: str
+    eligible_count: int
+    eligible: List[str]
+    dropped: List[ForecastDrop]
+    active_campaigns: int
+    campaigns_ended: List[ForecastCampaignEnd]
+
+class EligibilityForecastResponse(BaseModel):
+    start_date: str
+    nights: List[NightForecast]
+
+# --- Rules Admin Schemas ---
+class RuleStats(BaseModel):
+    id: str
+    group: Optional[str] = None
+    score: float
+    explanation: str
+    hits: int
+    evaluations: int
+    total_time_ms: float
+    avg_time_us: float
+
+class RuleSetStats(BaseModel):
+    source: str
+    loaded_at: str
+    rules: List[RuleStats]
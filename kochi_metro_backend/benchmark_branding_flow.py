@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Branding hour allocation benchmark for KMRL Metro Backend.
+
+Times the min-cost flow allocation of service hours to branding campaigns
+over a 30-night horizon on synthetic fleets, from the KMRL fleet size up to
+a few hundred trains. No database is needed.
+
+Usage: python benchmark_branding_flow.py
+"""
+
+import random
+import time
+from datetime import date, timedelta
+from app.core.branding import PLANNING_NIGHTS, allocate_branding_hours, campaigns_from_rows
+
+FLEETS = [(25, 30), (100, 150), (500, 700)]  # (trains, campaigns)
+SERVICE_FRACTION = 0.7
+REPEATS = 5
+
+def synthetic_campaigns(trains: int, campaigns: int, start: date, seed: int = 42):
+    rnd = random.Random(seed)
+    return [
+        {
+            "campaign_id": f"C{i:04d}",
+            "asset_id": f"KMRL_T{rnd.randrange(trains):05d}",
+            "advertiser_name": f"Advertiser {i % 12}",
+            "start_date": start - timedelta(days=rnd.randint(0, 60)),
+            "end_date": start + timedelta(days=rnd.randint(1, 90)),
+            "deficit_hours": rnd.randint(10, 600),
+            "penalty_amount": rnd.choice([0, 5000, 20000, 50000]),
+        }
+        for i in range(campaigns)
+    ]
+
+def main():
+    start = date(2026, 1, 1)
+    print(f"🚀 Branding hour allocation benchmark ({PLANNING_NIGHTS} nights)")
+    print(f"{'trains':>7} | {'campaigns':>9} | {'median (ms)':>11} | {'expected penalty':>16} | {'if unserved':>12}")
+    print("-" * 70)
+    for trains, count in FLEETS:
+        campaigns = campaigns_from_rows(synthetic_campaigns(trains, count, start), start, PLANNING_NIGHTS)
+        available = {f"KMRL_T{i:05d}": PLANNING_NIGHTS for i in range(trains)}
+        slots = max(1, int(trains * SERVICE_FRACTION))
+        timings = []
+        for _ in range(REPEATS):
+            began = time.perf_counter()
+            plan = allocate_branding_hours(campaigns, available, slots)
+            timings.append((time.perf_counter() - began) * 1000)
+        summary = plan.summary()["summary"]
+        print(f"{trains:>7} | {count:>9} | {sorted(timings)[REPEATS // 2]:>11.2f} | "
+              f"{summary['expected_penalty']:>16,.0f} | {summary['penalty_if_unserved']:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Eligibility benchmark for KMRL Metro Backend.
+
+Compares the include-based get_eligible_trains path against the aggregated
+SQL path at 25, 250 and 2,500 trains. Synthetic BENCH_ trainsets (with
+certificates, work orders, campaigns and meter readings) are added to reach
+each fleet size and removed again at the end.
+
+Usage: python benchmark_eligibility.py
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.db.client import db
+from app.core.rules import get_eligible_trains, get_eligible_trains_aggregated
+
+FLEET_SIZES = [25, 250, 2500]
+REPEATS = 5
+BENCH_PREFIX = "BENCH_"
+
+async def seed_trains(start: int, count: int):
+    """Create `count` synthetic trainsets with realistic related rows."""
+    now = datetime.now()
+    assets, certs, work_orders, campaigns, readings = [], [], [], [], []
+
+    for i in range(start, start + count):
+        asset_id = f"{BENCH_PREFIX}{i:05d}"
+        assets.append({
+            "asset_id": asset_id,
+            "asset_num": f"{BENCH_PREFIX}T{i:05d}",
+            "description": f"Benchmark Train Set {i}",
+            "asset_type": "TRAINSET",
+            "status": "OPERATING",
+            "location": random.choice(["ALUVA_DEPOT", "MUTTOM_DEPOT"]),
+            "total_distance_km": Decimal(random.uniform(20000, 180000)),
+        })
+        for cert_type in ["FITNESS", "SAFETY", "TELECOM", "SIGNALING", "BRAKING"]:
+            expiry = now + timedelta(days=random.randint(-30, 730))
+            certs.append({
+                "cert_id": f"{asset_id}_{cert_type}",
+                "asset_id": asset_id,
+                "certificate_type": cert_type,
+                "expiry_date": expiry,
+                "status": "ACTIVE" if expiry > now else "EXPIRED",
+            })
+        # Years of work order history per train
+        for j in range(40):
+            wo_status = random.choice(["APPROVED", "INPRG", "COMP", "CLOSE", "COMP", "CLOSE", "CLOSE"])
+            scheduled_start = now - timedelta(days=random.randint(1, 1500))
+            work_orders.append({
+                "wo_num": f"{asset_id}_{j:03d}",
+                "asset_id": asset_id,
+                "wo_type": random.choice(["PM", "CM", "INSPECTION"]),
+                "wo_status": wo_status,
+                "priority": random.randint(1, 5),
+                "description": "Benchmark work order",
+                "scheduled_start": scheduled_start,
+                "actual_finish": scheduled_start + timedelta(hours=8) if wo_status in ["COMP", "CLOSE"] else None,
+            })
+        for j in range(3):
+            start_date = now - timedelta(days=random.randint(0, 400))
+            campaigns.append({
+                "campaign_id": f"{asset_id}_C{j}",
+                "asset_id": asset_id,
+                "advertiser_name": "Benchmark Advertiser",
+                "start_date": start_date,
+                "end_date": start_date + timedelta(days=random.randint(90, 365)),
+                "minimum_hours_required": random.randint(1000, 3000),
+                "actual_hours_served": random.randint(500, 3000),
+            })
+        for j in range(30):
+            readings.append({
+                "reading_id": f"{asset_id}_R{j:03d}",
+                "asset_id": asset_id,
+                "meter_type": "DISTANCE_KM",
+                "reading_date": now - timedelta(days=j * 7),
+                "reading_value": Decimal(180000 - j * 1500),
+            })
+
+    await db.assets.create_many(data=assets)
+    await db.asset_certificates.create_many(data=certs)
+    await db.work_orders.create_many(data=work_orders)
+    await db.branding_campaigns.create_many(data=campaigns)
+    await db.meter_readings.create_many(data=readings)
+
+async def cleanup():
+    """Remove every synthetic BENCH_ row."""
+    where = {"asset_id": {"startswith": BENCH_PREFIX}}
+    await db.meter_readings.delete_many(where=where)
+    await db.branding_campaigns.delete_many(where=where)
+    await db.work_orders.delete_many(where=where)
+    await db.asset_certificates.delete_many(where=where)
+    await db.assets.delete_many(where=where)
+
+async def time_path(fn) -> float:
+    """Median wall time of `fn` in milliseconds."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+async def main():
+    print("🚀 Eligibility benchmark: include-based vs aggregated SQL")
+    await db.connect()
+    try:
+        await cleanup()
+        existing = await db.assets.count(where={"asset_type": "TRAINSET"})
+        seeded = 0
+
+        print(f"{'trains':>8} | {'include (ms)':>12} | {'aggregated (ms)':>15} | {'speedup':>7} | match")
+        print("-" * 62)
+        for size in FLEET_SIZES:
+            needed = size - existing - seeded
+            if needed > 0:
+                await seed_trains(seeded, needed)
+                seeded += needed
+
+            include_result = await get_eligible_trains()
+            aggregated_result = await get_eligible_trains_aggregated()
+            same_split = (
+                sorted(a["asset_id"] for a in include_result[0]) ==
+                sorted(a["asset_id"] for a in aggregated_result[0])
+            )
+
+            include_ms = await time_path(get_eligible_trains)
+            aggregated_ms = await time_path(get_eligible_trains_aggregated)
+            print(f"{existing + seeded:>8} | {include_ms:>12.1f} | {aggregated_ms:>15.1f} | "
+                  f"{include_ms / aggregated_ms:>6.1f}x | {'✅' if same_split else '❌'}")
+    finally:
+        await cleanup()
+        await db.disconnect()
+        print("👋 Benchmark data removed")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Latest-reading benchmark for KMRL Metro Backend.
+
+Builds an UNLOGGED copy of meter_readings holding 10M synthetic readings
+(2,500 trainsets x 2 meter types x 2,000 readings) and times the ways of
+fetching the latest DISTANCE_KM reading per asset:
+
+- per-parent row_number() window, the shape of Prisma's `take: 1` include
+- DISTINCT ON (asset_id) without an index (sort)
+- DISTINCT ON (asset_id) on (asset_id, meter_type, reading_date DESC, reading_value)
+- LATERAL ... LIMIT 1 per asset on the same index
+
+The table is dropped at the end.
+
+Usage: python benchmark_meter_readings.py
+"""
+
+import asyncio
+import time
+from app.db.client import db
+
+TABLE = "bench_meter_readings"
+ASSETS = 2500
+READINGS_PER_TYPE = 2000
+REPEATS = 5
+
+CREATE_SQL = f"""
+CREATE UNLOGGED TABLE {TABLE} (
+    reading_id    BIGINT,
+    asset_id      VARCHAR(20),
+    meter_type    VARCHAR(50),
+    reading_date  TIMESTAMP(6),
+    reading_value DECIMAL(12, 2)
+)
+"""
+
+# Readings are inserted in time order rather than asset order, like the real log
+POPULATE_SQL = f"""
+INSERT INTO {TABLE}
+SELECT row_number() OVER (),
+       'BENCH_' || lpad(a::text, 5, '0'),
+       t.meter_type,
+       TIMESTAMP '2020-01-01' + r * INTERVAL '1 day' + a * INTERVAL '1 second',
+       (r * t.step + a)::DECIMAL(12, 2)
+FROM generate_series(1, {READINGS_PER_TYPE}) r,
+     generate_series(1, {ASSETS}) a,
+     (VALUES ('DISTANCE_KM', 90), ('OPERATING_HOURS', 16)) AS t(meter_type, step)
+"""
+
+INDEX_SQL = f"""
+CREATE INDEX {TABLE}_latest
+ON {TABLE} (asset_id, meter_type, reading_date DESC, reading_value)
+"""
+
+ASSETS_CTE = f"""
+WITH bench_assets AS (
+    SELECT 'BENCH_' || lpad(a::text, 5, '0') AS asset_id FROM generate_series(1, {ASSETS}) a
+)
+"""
+
+QUERIES = {
+    "window (take: 1)": f"""
+        SELECT asset_id, reading_value FROM (
+            SELECT asset_id, reading_value,
+                   row_number() OVER (PARTITION BY asset_id ORDER BY reading_date DESC) AS rn
+            FROM {TABLE}
+            WHERE meter_type = 'DISTANCE_KM'
+        ) ranked
+        WHERE rn = 1
+        ORDER BY asset_id
+    """,
+    "DISTINCT ON": f"""
+        SELECT DISTINCT ON (asset_id) asset_id, reading_value
+        FROM {TABLE}
+        WHERE meter_type = 'DISTANCE_KM'
+        ORDER BY asset_id, reading_date DESC
+    """,
+    "LATERAL LIMIT 1": ASSETS_CTE + f"""
+        SELECT ba.asset_id, m.reading_value
+        FROM bench_assets ba
+        JOIN LATERAL (
+            SELECT reading_value
+            FROM {TABLE}
+            WHERE asset_id = ba.asset_id
+              AND meter_type = 'DISTANCE_KM'
+            ORDER BY reading_date DESC
+            LIMIT 1
+        ) m ON TRUE
+        ORDER BY ba.asset_id
+    """,
+}
+
+async def time_query(sql: str):
+    """Median wall time in milliseconds, plus the last result."""
+    timings = []
+    rows = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        rows = await db.query_raw(sql)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], rows
+
+def as_pairs(rows):
+    return [(row["asset_id"], float(row["reading_value"])) for row in rows]
+
+async def main():
+    total = ASSETS * READINGS_PER_TYPE * 2
+    print(f"🚀 Latest-reading benchmark on {total:,} synthetic readings")
+    await db.connect()
+    try:
+        await db.execute_raw(f"DROP TABLE IF EXISTS {TABLE}")
+        await db.execute_raw(CREATE_SQL)
+        start = time.perf_counter()
+        await db.execute_raw(POPULATE_SQL)
+        await db.execute_raw(f"VACUUM ANALYZE {TABLE}")
+        print(f"📦 Loaded in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        print(f"{'query':>28} | {'ms':>9} | rows")
+        print("-" * 48)
+        for name in ("window (take: 1)", "DISTINCT ON"):
+            ms, rows = await time_query(QUERIES[name])
+            results[f"{name}, no index"] = as_pairs(rows)
+            print(f"{name + ', no index':>28} | {ms:>9.1f} | {len(rows)}")
+
+        start = time.perf_counter()
+        await db.execute_raw(INDEX_SQL)
+        # Index-only scans need an up-to-date visibility map
+        await db.execute_raw(f"VACUUM ANALYZE {TABLE}")
+        print(f"🔧 Index built in {time.perf_counter() - start:.1f}s")
+
+        for name, sql in QUERIES.items():
+            ms, rows = await time_query(sql)
+            results[f"{name}, indexed"] = as_pairs(rows)
+            print(f"{name + ', indexed':>28} | {ms:>9.1f} | {len(rows)}")
+
+        reference = results["DISTINCT ON, indexed"]
+        expected = [(f"BENCH_{a:05d}", float(READINGS_PER_TYPE * 90 + a)) for a in range(1, ASSETS + 1)]
+        all_match = reference == expected and all(pairs == reference for pairs in results.values())
+        print(f"{'✅' if all_match else '❌'} All queries return the latest reading per asset")
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        await db.execute_raw(f"DROP TABLE IF EXISTS {TABLE}")
+        await db.disconnect()
+        print("👋 Benchmark table dropped")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Optimizer scoring benchmark for KMRL Metro Backend.
+
+Compares scoring the fleet asset by asset with the KMRLOptimizer static
+methods against KMRLOptimizer.score_batch on synthetic fleets of 25 to
+50,000 trains, and checks that both produce the same composite scores.
+No database is needed.
+
+Usage: python benchmark_optimizer.py
+"""
+
+import random
+import time
+import numpy as np
+from app.core.optimizer import WEIGHTS, KMRLOptimizer, objective_columns
+
+FLEET_SIZES = [25, 1000, 10000, 50000]
+REPEATS = 5
+
+def synthetic_fleet(size: int, seed: int = 42):
+    rnd = random.Random(seed)
+    fleet = []
+    for i in range(size):
+        fleet.append({
+            "asset_num": f"T{i:05d}",
+            "current_mileage": rnd.uniform(20000, 180000),
+            "days_since_maint": rnd.randint(1, 365),
+            "combined_risk_score": rnd.random(),
+            "branding_urgency_score": rnd.choice([0.0, rnd.random()]),
+            "shunting_cost": rnd.randint(1, 5),
+            "warnings": ["warning"] * rnd.choice([0, 0, 0, 1, 2]),
+            "open_work_orders": rnd.choice([0, 0, 1]),
+        })
+    return fleet
+
+def score_per_asset(fleet):
+    optimizer = KMRLOptimizer()
+    fleet_stats = {"max_mileage": max(asset["current_mileage"] for asset in fleet)}
+    composite = []
+    for asset in fleet:
+        reliability, _ = optimizer.calculate_reliability_score(asset)
+        branding, _ = optimizer.calculate_branding_priority(asset)
+        efficiency, _ = optimizer.calculate_efficiency_score(asset, fleet_stats)
+        composite.append(
+            WEIGHTS["reliability"] * reliability +
+            WEIGHTS["risk"] * (1 - asset["combined_risk_score"]) +
+            WEIGHTS["branding"] * branding +
+            WEIGHTS["efficiency"] * efficiency
+        )
+    return np.array(composite)
+
+def score_batch(fleet):
+    return KMRLOptimizer.score_batch(objective_columns(fleet))["composite"]
+
+def median_ms(fn, fleet) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(fleet)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def main():
+    print("🚀 Optimizer scoring benchmark: per-asset vs score_batch")
+    print(f"{'trains':>8} | {'per-asset (ms)':>14} | {'batch (ms)':>10} | {'speedup':>7} | match")
+    print("-" * 60)
+    for size in FLEET_SIZES:
+        fleet = synthetic_fleet(size)
+        same = np.array_equal(score_per_asset(fleet), score_batch(fleet))
+        per_asset_ms = median_ms(score_per_asset, fleet)
+        batch_ms = median_ms(score_batch, fleet)
+        print(f"{size:>8} | {per_asset_ms:>14.2f} | {batch_ms:>10.2f} | "
+              f"{per_asset_ms / batch_ms:>6.1f}x | {'✅' if same else '❌'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Risk inference benchmark for KMRL Metro Backend.
+
+Compares scoring the fleet one asset at a time (a one-row feature frame,
+scaler call and predict_proba per train, as predict_risk used to do) against
+RiskPredictor.risk_columns, which makes one scaler and one model call for the
+whole fleet, once through sklearn and once through the flattened evaluator
+that serves by default (see app.ml.flat_model). Checks that all three give
+the same ML risk scores. Then times the optional interpolated risk surface
+(KMRL_RISK_SERVING=surface, see app.ml.risk_surface) against the flattened
+evaluator and reports how far apart they are. Uses the saved
+model when it loads, otherwise a 200-tree model fitted on synthetic data.
+No database is needed.
+
+Usage: python benchmark_risk_inference.py
+"""
+
+import random
+import time
+from functools import partial
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.preprocessing import StandardScaler
+from app.ml.flat_model import FlatRiskModel
+from app.ml.risk_surface import MILEAGE_CELLS, SURFACE_ERROR_QUANTILE, RiskSurface
+from app.ml.pipeline import risk_predictor
+
+FLEET_SIZES = [25, 10000]
+REPEATS = 3  # The per-asset path runs once; at 10k assets it takes about half a minute
+
+def synthetic_fleet(size: int, seed: int = 42):
+    rnd = random.Random(seed)
+    return [
+        {
+            "asset_num": f"T{i:05d}",
+            "current_mileage": rnd.uniform(20000, 180000),
+            "days_since_maint": rnd.randint(1, 365),
+            "rules_risk_score": rnd.choice([0.0, 0.0, rnd.random()]),
+            "risk_factors": ["High mileage"] if rnd.random() < 0.2 else [],
+        }
+        for i in range(size)
+    ]
+
+def fit_stand_in_model(seed: int = 42):
+    """200-tree model on synthetic outcomes, for trees without a loadable saved model."""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        "mileage_at_event": rng.uniform(0, 250000, 5000),
+        "days_since_last_maint": rng.integers(0, 400, 5000).astype(float),
+    })
+    data = risk_predictor.engineer_features(data)
+    odds = data["mileage_at_event"] / 60000 + data["days_since_last_maint"] / 100 - 4
+    failed = (rng.random(len(data)) < 1 / (1 + np.exp(-odds))).astype(int)
+    scaler = StandardScaler().fit(data)
+    model = GradientBoostingClassifier(n_estimators=200, max_depth=4, random_state=seed)
+    return model.fit(scaler.transform(data), failed), scaler
+
+def score_per_asset(fleet):
+    ml_risk = []
+    for asset in fleet:
+        features = risk_predictor.engineer_features(pd.DataFrame({
+            "mileage_at_event": [asset["current_mileage"]],
+            "days_since_last_maint": [asset["days_since_maint"]],
+        }))
+        ml_risk.append(risk_predictor.model.predict_proba(risk_predictor.scaler.transform(features))[0, 1])
+    return np.round(ml_risk, 3).tolist()
+
+def score_batch(fleet):
+    return risk_predictor.risk_columns(
+        [asset["current_mileage"] for asset in fleet],
+        [asset["days_since_maint"] for asset in fleet],
+        [asset["rules_risk_score"] for asset in fleet],
+        [asset["risk_factors"] for asset in fleet],
+    )["ml_risk_score"]
+
+def score_sklearn_batch(fleet):
+    flat_model, risk_predictor.flat_model = risk_predictor.flat_model, None
+    try:
+        return score_batch(fleet)
+    finally:
+        risk_predictor.flat_model = flat_model
+
+def best_of(function, fleet, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(fleet)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+def main():
+    if risk_predictor.model is None or risk_predictor.scaler is None:
+        print("ℹ️  Saved model not loadable here; fitting a 200-tree stand-in model")
+        risk_predictor.model, risk_predictor.scaler = fit_stand_in_model()
+    if risk_predictor.flat_model is None:
+        risk_predictor.flat_model = FlatRiskModel.from_sklearn(risk_predictor.model, risk_predictor.scaler)
+
+    print("🚀 Risk inference benchmark: per-asset model calls vs one batched call")
+    print(f"{'assets':>7} | {'per-asset (ms)':>14} | {'sklearn batch (ms)':>18} | {'flattened (ms)':>14} | "
+          f"{'speedup':>8} | same scores")
+    print("-" * 90)
+    for size in FLEET_SIZES:
+        fleet = synthetic_fleet(size)
+        per_asset_ms, per_asset = best_of(score_per_asset, fleet, repeats=1)
+        sklearn_ms, sklearn_batch = best_of(score_sklearn_batch, fleet)
+        flat_ms, flat = best_of(score_batch, fleet)
+        print(f"{size:>7} | {per_asset_ms:>14.1f} | {sklearn_ms:>18.2f} | {flat_ms:>14.2f} | "
+              f"{per_asset_ms / flat_ms:>7.0f}x | {'✅' if per_asset == sklearn_batch == flat else '❌'}")
+
+    surface = risk_predictor.risk_surface
+    if surface is None:
+        print(f"\nℹ️  No exported risk surface; tabulating one with {MILEAGE_CELLS[0]} mileage cells")
+        surface = RiskSurface.tabulate(partial(risk_predictor._model_probability, risk_predictor.bundle), MILEAGE_CELLS[0])
+    print("\n🚀 Risk surface lookup vs flattened evaluator (ML risk only)")
+    print(f"{'assets':>7} | {'flattened (ms)':>14} | {'surface (ms)':>12} | {'speedup':>8} | "
+          f"q{SURFACE_ERROR_QUANTILE:g} / max difference")
+    print("-" * 80)
+    for size in FLEET_SIZES:
+        fleet = synthetic_fleet(size)
+        mileage = np.array([asset["current_mileage"] for asset in fleet], dtype=float)
+        days = np.array([asset["days_since_maint"] for asset in fleet], dtype=float)
+        flat_ms, flat = best_of(lambda _: risk_predictor._model_probability(risk_predictor.bundle, mileage, days), fleet)
+        surface_ms, (looked_up, _) = best_of(lambda _: surface.lookup(mileage, days), fleet)
+        difference = np.abs(looked_up - flat)
+        print(f"{size:>7} | {flat_ms:>14.3f} | {surface_ms:>12.3f} | {flat_ms / surface_ms:>7.0f}x | "
+              f"{np.quantile(difference, SURFACE_ERROR_QUANTILE):.4f} / {difference.max():.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Training isolation benchmark for KMRL Metro Backend.
+
+Measures how late the event loop wakes up from 10 ms sleeps, standing in for
+any request handled during training, in three cases: idle, while training
+inline (as train_model used to run inside the request coroutine), and while
+training in the worker process (app.ml.training). Trains on synthetic
+outcomes and publishes into a throwaway model registry.
+No database is needed.
+
+Usage: python benchmark_training_isolation.py
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("KMRL_MODEL_REGISTRY", tempfile.mkdtemp(prefix="kmrl-registry-"))
+
+import asyncio
+import random
+import time
+import numpy as np
+import pandas as pd
+from app.ml import training
+from app.ml.training import training_jobs
+
+RECORDS = 4000
+TICK_S = 0.01
+IDLE_S = 3.0
+
+def synthetic_outcomes(size: int = RECORDS, seed: int = 42) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    rows = []
+    for _ in range(size):
+        mileage, days = rnd.randint(5000, 150000), rnd.randint(5, 365)
+        failure_chance = ((mileage / 150000) * 0.5 + (days / 365) * 0.5) * 0.3
+        rows.append((mileage, days, int(rnd.random() < failure_chance)))
+    data = pd.DataFrame(rows, columns=['mileage_at_event', 'days_since_last_maint', 'failure_occurred'])
+    data['mileage_to_days_ratio'] = data['mileage_at_event'] / (data['days_since_last_maint'] + 1)
+    data['mileage_squared'] = np.square(data['mileage_at_event'])
+    data['days_squared'] = np.square(data['days_since_last_maint'])
+    data['interaction'] = data['mileage_at_event'] * data['days_since_last_maint']
+    return data
+
+async def measure_lag(work):
+    """Wake-up delays (ms) of 10 ms sleeps while `work()` runs, and the time it took."""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_S)
+            lags.append((time.perf_counter() - start - TICK_S) * 1000)
+
+    probe = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK_S * 5)
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe
+    return np.array(lags), elapsed
+
+async def main():
+    data = synthetic_outcomes()
+
+    async def idle():
+        await asyncio.sleep(IDLE_S)
+
+    async def inline():
+        training.train_model("benchmark-inline", data)
+
+    async def worker():
+        await training_jobs.run("benchmark-worker", "train", data)
+
+    await worker()  # Start the worker process outside the measurement
+
+    print(f"🚀 Event loop delay while training on {RECORDS} synthetic records")
+    print(f"{'mode':>8} | {'duration (s)':>12} | {'p50 (ms)':>8} | {'p99 (ms)':>8} | {'max (ms)':>9}")
+    print("-" * 58)
+    for name, work in (("idle", idle), ("inline", inline), ("worker", worker)):
+        lags, elapsed = await measure_lag(work)
+        print(f"{name:>8} | {elapsed:>12.1f} | {np.percentile(lags, 50):>8.2f} | "
+              f"{np.percentile(lags, 99):>8.2f} | {lags.max():>9.1f}")
+    training_jobs.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,6 +5,7 @@ from contextlib import asynccontextmanager
 from app.api.schedule import router as schedule_router
 from app.api.ai_enhanced import router as ai_router
 from app.db.client import db
+from app.ml.training import training_jobs
 import uvicorn
 
 @asynccontextmanager
@@ -15,6 +16,7 @@ async def lifespan(app: FastAPI):
     print("✅ Prisma Client connected successfully!")
     yield
     # On shutdown
+    training_jobs.shutdown()
     print("Disconnecting from the database...")
     await db.disconnect()
 
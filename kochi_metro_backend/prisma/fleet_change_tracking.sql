@@ -0,0 +1,52 @@
+-- Change tracking for incremental fleet-state recomputation.
+-- Every insert/update/delete on a table that feeds eligibility or the hard
+-- rules appends the affected asset_id to fleet_changes. Apply with
+-- `python setup_change_tracking.py` after `prisma db push`.
+-- Entries older than KMRL_CHANGE_LOG_RETENTION_DAYS are pruned by the
+-- fleet-state store on every full rebuild (app/core/fleet_state.py).
+
+CREATE TABLE IF NOT EXISTS fleet_changes (
+    change_id  BIGSERIAL PRIMARY KEY,
+    asset_id   VARCHAR(20) NOT NULL,
+    table_name VARCHAR(50) NOT NULL,
+    changed_at TIMESTAMP(6) DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_fleet_changes_changed_at ON fleet_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION record_fleet_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO fleet_changes (asset_id, table_name) VALUES (OLD.asset_id, TG_TABLE_NAME);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR NEW.asset_id IS DISTINCT FROM OLD.asset_id) THEN
+        INSERT INTO fleet_changes (asset_id, table_name) VALUES (NEW.asset_id, TG_TABLE_NAME);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_fleet_change ON assets;
+
+CREATE TRIGGER trg_fleet_change AFTER INSERT OR UPDATE OR DELETE ON assets
+    FOR EACH ROW EXECUTE FUNCTION record_fleet_change();
+
+DROP TRIGGER IF EXISTS trg_fleet_change ON work_orders;
+
+CREATE TRIGGER trg_fleet_change AFTER INSERT OR UPDATE OR DELETE ON work_orders
+    FOR EACH ROW EXECUTE FUNCTION record_fleet_change();
+
+DROP TRIGGER IF EXISTS trg_fleet_change ON asset_certificates;
+
+CREATE TRIGGER trg_fleet_change AFTER INSERT OR UPDATE OR DELETE ON asset_certificates
+    FOR EACH ROW EXECUTE FUNCTION record_fleet_change();
+
+DROP TRIGGER IF EXISTS trg_fleet_change ON meter_readings;
+
+CREATE TRIGGER trg_fleet_change AFTER INSERT OR UPDATE OR DELETE ON meter_readings
+    FOR EACH ROW EXECUTE FUNCTION record_fleet_change();
+
+DROP TRIGGER IF EXISTS trg_fleet_change ON branding_campaigns;
+
+CREATE TRIGGER trg_fleet_change AFTER INSERT OR UPDATE OR DELETE ON branding_campaigns
+    FOR EACH ROW EXECUTE FUNCTION record_fleet_change();
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Installs the fleet change-tracking triggers (prisma/fleet_change_tracking.sql).
+Once installed, the fleet-state store recomputes only changed assets.
+"""
+
+import asyncio
+import os
+from app.db.client import db
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prisma", "fleet_change_tracking.sql")
+
+def load_statements():
+    """Split the SQL file on blank lines, dropping comment-only chunks."""
+    with open(SQL_PATH) as f:
+        chunks = f.read().split("\n\n")
+    statements = []
+    for chunk in chunks:
+        lines = [line for line in chunk.splitlines() if not line.strip().startswith("--")]
+        statement = "\n".join(lines).strip()
+        if statement:
+            statements.append(statement)
+    return statements
+
+async def main():
+    print("🚀 Installing fleet change tracking...")
+    try:
+        await db.connect()
+        for statement in load_statements():
+            await db.execute_raw(statement)
+        print("✅ fleet_changes table and triggers installed")
+    except Exception as e:
+        print(f"❌ Error installing change tracking: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        await db.disconnect()
+        print("👋 Disconnected from database")
+
+if __name__ == "__main__":
+    asyncio.run(main())
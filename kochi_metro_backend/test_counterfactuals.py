@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Standby counterfactuals re-scored through the planner: applying each
+reported change to its train must take it into service in
+get_optimized_schedule, and one step less must not. No database is needed.
+
+Usage: python test_counterfactuals.py  (or pytest test_counterfactuals.py)
+"""
+
+import sys
+import os
+import random
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.counterfactuals import LEVERS, standby_counterfactuals
+from app.core.optimizer import get_optimized_schedule
+
+FLEET_SIZE = 25
+NUM_FOR_SERVICE = 15
+
+def synthetic_fleet(seed: int):
+    """Eligible scoring rows; the highest-mileage train is old and risky, so it ends up on standby."""
+    rnd = random.Random(seed)
+    fleet = [{
+        "asset_num": f"T{i + 1}",
+        "asset_id": f"KMRL_T{i + 1}",
+        "current_mileage": round(rnd.uniform(20000, 150000), 1),
+        "days_since_maint": rnd.randint(5, 300),
+        "open_work_orders": rnd.choice([0, 0, 0, 1, 2]),
+        "warnings": ["Approaching service limit"] * rnd.choice([0, 0, 1, 2]),
+        "shunting_cost": round(rnd.uniform(0.5, 5.0), 2),
+        "combined_risk_score": round(rnd.uniform(0.05, 0.6), 3),
+        "branding_urgency_score": round(rnd.uniform(0.0, 0.8), 3),
+    } for i in range(FLEET_SIZE)]
+    leader = fleet[4]
+    leader.update(current_mileage=199442.0, days_since_maint=280, combined_risk_score=0.7)
+    return fleet
+
+def with_value(asset, field, value):
+    moved = dict(asset)
+    if field == "warnings":
+        moved["warnings"] = asset["warnings"][:int(round(value))]
+    else:
+        moved[field] = value
+    return moved
+
+def in_service(fleet, asset_num, field, value) -> bool:
+    assets = [with_value(asset, field, value) if asset["asset_num"] == asset_num else asset for asset in fleet]
+    schedule = get_optimized_schedule(assets, [], NUM_FOR_SERVICE, explain="none")
+    return asset_num in {entry["asset_num"] for entry in schedule["service"]}
+
+def check_fleet(seed: int):
+    fleet = synthetic_fleet(seed)
+    result = standby_counterfactuals(fleet, NUM_FOR_SERVICE)
+    standby = {entry["asset_num"] for entry in result["standby"]}
+    assert "T5" in standby, "the fleet-max train should start on standby"
+
+    levers = {lever.name: lever for lever in LEVERS}
+    checked = 0
+    for entry in result["standby"]:
+        for change in entry["changes"]:
+            if not change["feasible"]:
+                continue
+            field, lever = change["field"], levers[change["lever"]]
+            assert in_service(fleet, entry["asset_num"], field, change["required"]), (entry["asset_num"], change)
+            one_step_less = change["required"] - lever.direction * lever.resolution
+            assert not in_service(fleet, entry["asset_num"], field, one_step_less), (entry["asset_num"], change)
+            checked += 1
+    return checked
+
+def test_counterfactuals_match_planner():
+    for seed in range(5):
+        assert check_fleet(seed) > 0
+
+def test_fleet_max_mileage_lever():
+    fleet = synthetic_fleet(1)
+    result = standby_counterfactuals(fleet, NUM_FOR_SERVICE)
+    leader = next(entry for entry in result["standby"] if entry["asset_num"] == "T5")
+    change = next(change for change in leader["changes"] if change["lever"] == "lower_mileage")
+    assert change["feasible"]
+    # Lowering the fleet maximum lowers every other train's efficiency, and with it the cutoff
+    assert change["cutoff"] < result["service_cutoff"]
+    assert change["cutoff"] <= change["new_composite"]  # Equal once rounded: the change is the smallest that passes
+    assert in_service(fleet, "T5", "current_mileage", change["required"])
+    assert not in_service(fleet, "T5", "current_mileage", change["required"] + 1)
+
+if __name__ == "__main__":
+    print("🧪 Standby counterfactuals against get_optimized_schedule")
+    test_counterfactuals_match_planner()
+    print("   ✅ Every reported change takes its train into service, one step less does not")
+    test_fleet_max_mileage_lever()
+    print("   ✅ Lowering the fleet-max train's mileage is scored against the re-scored fleet")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Fleet state store: incremental refresh against an in-memory fleet_changes log.
+
+Change ids come from a sequence and are assigned at insert time, so a slow
+transaction can commit a lower id after a higher one has been read. These
+tests replay that ordering and check that the incremental refresh ends up
+exactly where a full rebuild does. No database is needed.
+
+Usage: python test_fleet_state.py  (or pytest test_fleet_state.py)
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core import fleet_state as fleet_state_module
+from app.core.fleet_state import FleetStateStore
+
+def eligibility_row(asset_id: str, critical_work_orders=()):
+    return {
+        "asset_id": asset_id, "asset_num": asset_id, "description": f"Trainset {asset_id}",
+        "location": "MUTTOM", "status": "OPERATING", "manufacturer": "Alstom", "model": "Metropolis",
+        "installation_date": None, "operating_hours": 1000, "total_distance_km": 50000,
+        "certificates": [], "critical_work_orders": list(critical_work_orders),
+        "last_maintenance_date": None, "latest_distance_km": None, "active_campaigns": []
+    }
+
+class FakeFleetDatabase:
+    """Committed eligibility rows plus a fleet_changes log whose ids are handed out before commit."""
+
+    def __init__(self, asset_ids):
+        self.rows = {asset_id: eligibility_row(asset_id) for asset_id in asset_ids}
+        self.changes = {}  # committed change_id -> asset_id
+        self.next_change_id = 1
+
+    def begin(self, asset_id: str) -> int:
+        """Take a change id for `asset_id`, as the trigger does inside a still-open transaction."""
+        change_id = self.next_change_id
+        self.next_change_id += 1
+        return change_id
+
+    def commit(self, change_id: int, row):
+        self.rows[row["asset_id"]] = row
+        self.changes[change_id] = row["asset_id"]
+
+    async def fetch_eligibility_rows(self, as_of, asset_ids=None):
+        wanted = sorted(self.rows) if asset_ids is None else sorted(set(asset_ids) & set(self.rows))
+        return [dict(self.rows[asset_id]) for asset_id in wanted]
+
+    async def fetch_latest_change_id(self):
+        return max(self.changes, default=0)
+
+    async def fetch_fleet_changes(self, after_change_id):
+        return sorted((cid, asset_id) for cid, asset_id in self.changes.items() if cid > after_change_id)
+
+    async def prune_fleet_changes(self, retention_days, keep_last):
+        """Every entry counts as older than the retention period."""
+        floor = max(self.changes, default=0) - keep_last
+        old = [cid for cid in self.changes if cid <= floor]
+        for cid in old:
+            del self.changes[cid]
+        return len(old)
+
+def use_database(database: FakeFleetDatabase):
+    fleet_state_module.fetch_eligibility_rows = database.fetch_eligibility_rows
+    fleet_state_module.fetch_latest_change_id = database.fetch_latest_change_id
+    fleet_state_module.fetch_fleet_changes = database.fetch_fleet_changes
+    fleet_state_module.prune_fleet_changes = database.prune_fleet_changes
+
+async def rebuilt(database: FakeFleetDatabase):
+    """Eligible and ineligible dicts from a fresh store's full rebuild."""
+    store = FleetStateStore()
+    await store.refresh()
+    assert store.stats["full_rebuilds"] == 1
+    return (await store.get_snapshot()).to_dicts()
+
+async def out_of_order_commits():
+    database = FakeFleetDatabase([f"TS{n:02d}" for n in range(1, 11)])
+    use_database(database)
+    store = FleetStateStore()
+    await store.refresh()
+
+    # A slow transaction takes id 1 for a new priority-1 work order on TS03 ...
+    slow = database.begin("TS03")
+    # ... while a quick one takes id 2 on TS07 and commits first
+    quick = database.begin("TS07")
+    database.commit(quick, eligibility_row("TS07", [{"wo_status": "INPRG", "description": "Bogie inspection"}]))
+    await store.refresh()
+    assert await store.get_eligible_trains() == await rebuilt(database)
+
+    # The slow transaction commits after id 2 was read
+    database.commit(slow, eligibility_row("TS03", [{"wo_status": "APPROVED", "description": "Brake fault"}]))
+    await store.refresh()
+    assert store.stats["full_rebuilds"] == 1, "expected incremental refreshes only"
+    eligible, ineligible = await store.get_eligible_trains()
+    assert "TS03" in {asset["asset_id"] for asset in ineligible}
+    assert (eligible, ineligible) == await rebuilt(database)
+
+    # Applied ids are not recomputed again
+    recomputed = store.stats["assets_recomputed"]
+    await store.refresh()
+    assert store.stats["assets_recomputed"] == recomputed
+
+async def commit_during_rebuild():
+    database = FakeFleetDatabase([f"TS{n:02d}" for n in range(1, 6)])
+    use_database(database)
+    database.commit(database.begin("TS01"), eligibility_row("TS01"))
+    slow = database.begin("TS02")
+    database.commit(database.begin("TS04"), eligibility_row("TS04"))
+
+    store = FleetStateStore()
+    await store.refresh()
+    database.commit(slow, eligibility_row("TS02", [{"wo_status": "INPRG", "description": "Door fault"}]))
+    await store.refresh()
+    assert store.stats["full_rebuilds"] == 1
+    assert await store.get_eligible_trains() == await rebuilt(database)
+
+async def pruned_change_log():
+    database = FakeFleetDatabase([f"TS{n:02d}" for n in range(1, 6)])
+    use_database(database)
+    for _ in range(3 * fleet_state_module.CHANGE_LOG_WINDOW):
+        database.commit(database.begin("TS01"), eligibility_row("TS01"))
+    slow = database.begin("TS02")
+    database.commit(database.begin("TS04"), eligibility_row("TS04"))
+
+    store = FleetStateStore()
+    await store.refresh()
+    # The rebuild keeps only the ids incremental refreshes re-read
+    assert min(database.changes) == max(database.changes) - fleet_state_module.CHANGE_LOG_WINDOW + 1
+    database.commit(slow, eligibility_row("TS02", [{"wo_status": "INPRG", "description": "Door fault"}]))
+    await store.refresh()
+    assert store.stats["full_rebuilds"] == 1
+    assert await store.get_eligible_trains() == await rebuilt(database)
+
+def test_out_of_order_commits():
+    asyncio.run(out_of_order_commits())
+
+def test_commit_during_rebuild():
+    asyncio.run(commit_during_rebuild())
+
+def test_pruned_change_log():
+    window = fleet_state_module.CHANGE_LOG_WINDOW
+    fleet_state_module.CHANGE_LOG_WINDOW = 20
+    try:
+        asyncio.run(pruned_change_log())
+    finally:
+        fleet_state_module.CHANGE_LOG_WINDOW = window
+
+if __name__ == "__main__":
+    print("🧪 Fleet state incremental refresh")
+    test_out_of_order_commits()
+    print("   ✅ Out-of-order commits match a full rebuild")
+    test_commit_during_rebuild()
+    print("   ✅ Late commit after a full rebuild is picked up")
+    test_pruned_change_log()
+    print("   ✅ Pruning keeps the ids incremental refreshes re-read")
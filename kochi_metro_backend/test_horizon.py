@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Rolling-horizon inputs: certificate expiries arrive from raw SQL as dates,
+datetimes or ISO strings, and each must end a train's availability after
+the same horizon day. No database is needed.
+
+Usage: python test_horizon.py  (or pytest test_horizon.py)
+"""
+
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.horizon import build_inputs
+
+START = date(2026, 3, 2)
+DAYS = 7
+
+def fleet(size: int = 5):
+    return [{"asset_id": f"KMRL_T{i}", "asset_num": f"T{i}", "current_mileage": 50000 + 1000 * i} for i in range(size)]
+
+def availability(first_expiries):
+    return build_inputs(fleet(), START, DAYS, 3, first_expiries).available
+
+def test_expiry_date_forms():
+    expiry = START + timedelta(days=2)
+    forms = [expiry, datetime.combine(expiry, datetime.min.time()) + timedelta(hours=9),
+             expiry.isoformat(), f"{expiry.isoformat()}T09:00:00Z"]
+    expected = None
+    for form in forms:
+        available = availability([{"asset_id": "KMRL_T1", "certificate_type": "FITNESS", "expiry_date": form}])
+        # Still available on the expiry date itself, unavailable from the next day
+        assert available[1].tolist() == [True, True, True, False, False, False, False], form
+        assert available[[0, 2, 3, 4]].all()
+        if expected is not None:
+            assert (available == expected).all(), form
+        expected = available
+
+def test_expiry_on_start_date():
+    available = availability([{"asset_id": "KMRL_T3", "certificate_type": "FITNESS", "expiry_date": START.isoformat()}])
+    assert available[3].tolist() == [True] + [False] * (DAYS - 1)
+
+if __name__ == "__main__":
+    print("🧪 Rolling-horizon inputs")
+    test_expiry_date_forms()
+    print("   ✅ Dates, datetimes and ISO strings end availability on the same day")
+    test_expiry_on_start_date()
+    print("   ✅ A certificate expiring on the start date leaves only the first night")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Induction solver fallbacks: infeasible constraints, and a time budget that
+expires before the MIP finds an incumbent. No database is needed.
+
+Usage: python test_induction_solver.py  (or pytest test_induction_solver.py)
+"""
+
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from app.core import induction_solver
+from app.core.induction_solver import InductionConstraints, MIN_RELAXATION_TIME_S, solve_induction
+
+DEPOT = {"MUTTOM": ("MUTTOM", 2)}
+
+def fleet(size: int = 6, high_mileage: int = 3):
+    """Assets in descending composite order; the first `high_mileage` are over the mileage threshold."""
+    assets = [
+        {"asset_id": f"TS{i:02d}", "location": "MUTTOM",
+         "current_mileage": 150000 if i < high_mileage else 10000, "branding_campaigns": []}
+        for i in range(size)
+    ]
+    return assets, np.linspace(1.0, 0.5, size)
+
+def no_incumbent(spend_s: float = 0.0):
+    """Stand-in for _Model.solve: the MIP runs for `spend_s` and stops without a solution."""
+    calls = []
+    real_solve = induction_solver._Model.solve
+
+    def solve(self, objective, time_limit, relax=False):
+        calls.append((relax, time_limit))
+        if relax:
+            return real_solve(self, objective, time_limit, relax=True)
+        time.sleep(spend_s)
+        return SimpleNamespace(x=None, status=1, message="Time limit reached", mip_dual_bound=None)
+    return solve, calls
+
+def test_infeasible_constraints():
+    assets, composite = fleet()
+    # Six trains at a two-berth depot need four in service, but only three are wanted
+    service, report = solve_induction(assets, composite, 3, InductionConstraints(depot_capacity=DEPOT))
+    assert report["status"] == "infeasible_greedy_fallback"
+    assert list(service) == [True, True, True, False, False, False]
+    assert report["constraint_violations"] == ["depot MUTTOM capacity 2"]
+    assert report["upper_bound"] is None and report["optimality_gap"] is None
+
+def test_time_limit_greedy_fallback():
+    assets, composite = fleet()
+    constraints = InductionConstraints(max_high_mileage=1, time_budget_s=0.5)
+    solve, calls = no_incumbent()
+    real_solve, induction_solver._Model.solve = induction_solver._Model.solve, solve
+    try:
+        service, report = solve_induction(assets, composite, 3, constraints)
+    finally:
+        induction_solver._Model.solve = real_solve
+
+    assert report["status"] == "time_limit_greedy_fallback"
+    assert list(service) == [True, True, True, False, False, False]
+    assert report["constraint_violations"] == ["high mileage cap 1"]
+    # The relaxation bound is computed within what is left of the budget
+    relax, time_limit = calls[-1]
+    assert relax and time_limit <= constraints.time_budget_s
+    assert report["upper_bound"] is not None
+    assert report["optimality_gap"] < 0, "greedy breaks a constraint, so it scores above the bound"
+
+def test_time_limit_spent_skips_relaxation():
+    assets, composite = fleet()
+    constraints = InductionConstraints(max_high_mileage=1, time_budget_s=0.2)
+    solve, calls = no_incumbent(spend_s=constraints.time_budget_s)
+    real_solve, induction_solver._Model.solve = induction_solver._Model.solve, solve
+    try:
+        service, report = solve_induction(assets, composite, 3, constraints)
+    finally:
+        induction_solver._Model.solve = real_solve
+
+    assert report["status"] == "time_limit_greedy_fallback"
+    assert [relax for relax, _ in calls] == [False], "no relaxation once the budget is spent"
+    assert report["upper_bound"] is None
+    assert report["solve_time_ms"] < (constraints.time_budget_s + MIN_RELAXATION_TIME_S) * 1000
+
+def test_feasible_constraints_are_solved():
+    assets, composite = fleet()
+    service, report = solve_induction(assets, composite, 3, InductionConstraints(max_high_mileage=1))
+    assert report["status"] == "optimal"
+    assert report["constraint_violations"] == []
+    assert list(service) == [True, False, False, True, True, False]
+
+if __name__ == "__main__":
+    print("🧪 Induction solver fallbacks")
+    test_infeasible_constraints()
+    print("   ✅ Infeasible constraints fall back to greedy")
+    test_time_limit_greedy_fallback()
+    print("   ✅ Time limit without incumbent falls back to greedy with a relaxation bound")
+    test_time_limit_spent_skips_relaxation()
+    print("   ✅ No relaxation once the time budget is spent")
+    test_feasible_constraints_are_solved()
+    print("   ✅ Feasible constraints are solved to optimality")
@@ -41,15 +41,13 @@ except ImportError:
 try:
     from app.db.client import db
     from app.core.task_manager import get_latest_evaluation, get_all_completed_tasks
+    from app.ml.model_registry import model_registry
 except ImportError:
     print("Error: Could not import required modules.")
     print("Make sure you're running this script from the project root directory.")
     print("Try: cd /path/to/kochi_metro_backend && ./view_model_metrics.py")
     sys.exit(1)
 
-# Path to the model file
-MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app/ml/models/risk_model.joblib")
-
 def color_metric(value, thresholds):
     """Add color to metrics based on thresholds."""
     if value >= thresholds[0]:
@@ -93,16 +91,20 @@ async def view_model_metrics():
         print(f"{Fore.YELLOW}To run evaluation: curl -X POST http://localhost:8000/api/v1/evaluate-model{Style.RESET_ALL}")
         
     # Get model info
-    if os.path.exists(MODEL_PATH):
-        model_size = os.path.getsize(MODEL_PATH) / (1024 * 1024)  # Size in MB
-        model_modified = datetime.fromtimestamp(os.path.getmtime(MODEL_PATH))
+    status = model_registry.status()
+    if status["current"]:
+        manifest = model_registry.manifest(status["current"])
+        model_size = sum(entry["bytes"] for entry in manifest["files"].values()) / (1024 * 1024)  # Size in MB
         
         print(f"\n{Fore.CYAN}Model Information:{Style.RESET_ALL}")
-        print(f"Model Path: {MODEL_PATH}")
+        print(f"Model Version: {status['current']} (promoted {status['promoted_at']})")
+        print(f"Source: {manifest['source']}")
         print(f"Model Size: {model_size:.2f} MB")
-        print(f"Last Modified: {model_modified}")
+        print(f"Created: {manifest['created_at']}")
+        print(f"Rollback Target: {status['previous'] or 'none'}")
+        print(f"Published Versions: {len(status['versions'])}")
     else:
-        print(f"\n{Fore.YELLOW}No model file found at {MODEL_PATH}{Style.RESET_ALL}")
+        print(f"\n{Fore.YELLOW}No model version in the registry at {model_registry.root}{Style.RESET_ALL}")
     
     # List completed tasks
     completed_tasks = get_all_completed_tasks()